@@ -0,0 +1,317 @@
+"""
+按静音切分长录音，分块并行转录后拼接
+Silence-aware chunking with parallel chunk transcription and timestamp stitching
+
+长会议录音整段串行交给 Whisper 时只能用到一个模型实例。这里先用 ffmpeg 的 silencedetect
+找出停顿，在停顿处把录音切成若干块，分给多个转录进程并行处理，再把各块的片段按块的起始时间
+平移回原录音的时间轴：
+- 讲话区间跨过停顿合并，直到块内的音频达到 target 秒；切分点都落在静音中，不会切断词句，块之间不需要重叠
+- 超过 max_gap 秒的长静音在截取时从块中去掉（不消耗转录计算）：块由若干讲话片段（parts）拼接而成，
+  拼接时按各片段的偏移把时间映射回原录音，因此跳过静音不会把块切碎
+- 没有停顿的连续讲话超过 max_length 秒时只能硬切，相邻两块重叠 overlap 秒；
+  拼接时以重叠区的中点为界，每个片段只保留中点落在本块保留范围内的那一份，避免词句丢失或重复
+
+需要 ffmpeg / ffprobe（FFMPEG_PATH、FFPROBE_PATH）；不可用时调用方整段转录。
+
+命令行（查看切分计划）：
+    python audio_chunking.py plan FILE [--target-seconds N]
+"""
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# 切块使用的音频格式（Whisper 的输入采样率）
+SAMPLE_RATE = 16000
+
+_SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end:\s*(-?[\d.]+)")
+_DURATION = re.compile(r"Duration:\s*(\d+):(\d+):([\d.]+)")
+
+
+class ChunkingError(Exception):
+    pass
+
+
+def probe_duration(file_path, ffprobe="ffprobe"):
+    """返回媒体时长（秒）；ffprobe 不可用或无法识别时返回 None"""
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", file_path],
+            capture_output=True, text=True, timeout=60
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def detect_silences(file_path, noise_db=-35.0, min_silence=0.5, ffmpeg="ffmpeg"):
+    """
+    用 ffmpeg silencedetect 找出静音区间
+
+    Args:
+        file_path (str): 音频/视频文件
+        noise_db (float): 低于该音量（dB）视为静音
+        min_silence (float): 最短静音时长（秒）
+
+    Returns:
+        tuple: ([(静音开始, 静音结束)], 时长)
+    """
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-hide_banner", "-nostats", "-i", file_path, "-vn",
+             "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+            capture_output=True, text=True, encoding="utf-8", errors="replace"
+        )
+    except OSError as e:
+        raise ChunkingError(f"无法运行 ffmpeg: {e}")
+    if result.returncode != 0:
+        raise ChunkingError(f"静音检测失败: {result.stderr.strip()[-500:]}")
+
+    duration = None
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = _DURATION.search(line)
+        if match and duration is None:
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if duration is None:
+        raise ChunkingError("无法确定录音时长")
+    if start is not None:
+        # 录音以静音结束
+        silences.append((start, duration))
+    return silences, duration
+
+
+def speech_regions(silences, duration, padding=0.2):
+    """静音区间的补集（前后各留 padding 秒，避免切掉词的开头和结尾）"""
+    regions = []
+    position = 0.0
+    for start, end in sorted(silences):
+        if start > position:
+            regions.append((position, start))
+        position = max(position, end)
+    if position < duration:
+        regions.append((position, duration))
+    return [(max(0.0, start - padding), min(duration, end + padding)) for start, end in regions]
+
+
+def plan_chunks(silences, duration, target=300.0, max_length=600.0, max_gap=2.0, overlap=2.0, padding=0.2):
+    """
+    把讲话区间合并成转录块
+
+    Args:
+        silences (list): 静音区间
+        duration (float): 录音时长
+        target (float): 块的目标时长（去掉长静音后的音频时长），超过后在下一个停顿处切分
+        max_length (float): 没有停顿的连续讲话超过该时长时硬切
+        max_gap (float): 块内保留的最长静音，更长的静音在截取时去掉
+        overlap (float): 硬切时相邻块的重叠时长
+        padding (float): 讲话区间前后保留的静音
+
+    Returns:
+        list: [{"start", "end", "parts", "keep_start", "keep_end"}]，parts 为块内依次拼接的 (开始, 结束)，
+              保留范围为 None 表示不限
+    """
+    if overlap >= target:
+        raise ValueError("overlap 必须小于 target")
+    chunks = []
+    current = None
+    length = 0.0
+    for start, end in speech_regions(silences, duration, padding):
+        if current is not None:
+            gap = start - current["end"]
+            added = end - current["end"] if gap <= max_gap else end - start
+            if length + added <= target:
+                if gap <= max_gap:
+                    current["parts"][-1] = (current["parts"][-1][0], end)
+                else:
+                    current["parts"].append((start, end))
+                current["end"] = end
+                length += added
+                continue
+            chunks.append(current)
+            current = None
+        if end - start <= max_length:
+            current = {"start": start, "end": end, "parts": [(start, end)], "keep_start": None, "keep_end": None}
+            length = end - start
+            continue
+        # 连续讲话：按 target 硬切，相邻块重叠 overlap 秒，以重叠区中点为界
+        step = target - overlap
+        piece_start = start
+        keep_start = None
+        while True:
+            piece_end = min(end, piece_start + target)
+            last = piece_end >= end
+            keep_end = None if last else piece_start + step + overlap / 2
+            chunks.append({"start": piece_start, "end": piece_end, "parts": [(piece_start, piece_end)],
+                           "keep_start": keep_start, "keep_end": keep_end})
+            if last:
+                break
+            keep_start = keep_end
+            piece_start += step
+    if current is not None:
+        chunks.append(current)
+    return chunks
+
+
+def covered_seconds(chunks):
+    """块覆盖的总时长（重叠部分只计一次）"""
+    covered = 0.0
+    position = 0.0
+    for part_start, part_end in sorted(part for chunk in chunks for part in chunk["parts"]):
+        start = max(part_start, position)
+        if part_end > start:
+            covered += part_end - start
+            position = part_end
+    return covered
+
+
+def source_time(parts, offset):
+    """块内时间（拼接后的音频）对应的原录音时间"""
+    for start, end in parts:
+        if offset <= end - start:
+            return start + offset
+        offset -= end - start
+    return parts[-1][1]
+
+
+def stitch(chunks, chunk_segments):
+    """
+    把各块的片段映射到原录音的时间轴并按保留范围去掉重叠部分的重复
+
+    Args:
+        chunks (list): plan_chunks 的结果
+        chunk_segments (list): 与 chunks 对应的片段列表（时间相对于块的开头）
+
+    Returns:
+        list: [{"start", "end", "text"}]
+    """
+    segments = []
+    for chunk, items in zip(chunks, chunk_segments):
+        for item in items:
+            if not item["text"].strip():
+                continue
+            start = source_time(chunk["parts"], item["start"])
+            end = max(start, source_time(chunk["parts"], item["end"]))
+            middle = (start + end) / 2
+            if chunk["keep_start"] is not None and middle < chunk["keep_start"]:
+                continue
+            if chunk["keep_end"] is not None and middle >= chunk["keep_end"]:
+                continue
+            segments.append({"start": round(start, 3), "end": round(end, 3), "text": item["text"]})
+    return segments
+
+
+def extract_chunk(file_path, parts, output_path, ffmpeg="ffmpeg"):
+    """把 parts 中的各段 [开始, 结束) 依次拼接，截取为 16kHz 单声道 wav"""
+    start, end = parts[0][0], parts[-1][1]
+    command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+               "-i", file_path, "-vn"]
+    if len(parts) > 1:
+        # 输入定位后时间从 0 开始；只保留各讲话片段，时间戳按采样重新编号
+        selected = "+".join(f"between(t,{a - start:.3f},{b - start:.3f})" for a, b in parts)
+        command += ["-af", f"aselect='{selected}',asetpts=N/SR/TB"]
+    try:
+        subprocess.run(command + ["-ac", "1", "-ar", str(SAMPLE_RATE), output_path], capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ChunkingError(f"截取音频失败: {start:.1f}-{end:.1f}s: {e}")
+
+
+def transcribe_chunked(file_path, transcribers, tmp_dir=None, stats=None, ffmpeg="ffmpeg", **options):
+    """
+    按静音切块，用多个转录器并行转录，拼接为整段录音的片段
+
+    Args:
+        file_path (str): 音频/视频文件
+        transcribers (list): 转录器（有 transcribe(path) -> 片段列表 方法），每个同时只处理一块
+        tmp_dir (str): 可选，存放音频块的目录
+        stats (dict): 可选，写入块数、转录的时长和跳过的静音时长
+        **options: 传给 plan_chunks 的参数，以及 detect_silences 的 noise_db / min_silence
+
+    Returns:
+        list: [{"start", "end", "text"}]
+    """
+    silence_options = {key: options.pop(key) for key in ("noise_db", "min_silence") if key in options}
+    silences, duration = detect_silences(file_path, ffmpeg=ffmpeg, **silence_options)
+    chunks = plan_chunks(silences, duration, **options)
+
+    idle = queue.Queue()
+    for transcriber in transcribers:
+        idle.put(transcriber)
+    work_dir = tempfile.mkdtemp(prefix="chunks_", dir=tmp_dir)
+
+    def run(number, chunk):
+        chunk_path = os.path.join(work_dir, f"{number:05d}.wav")
+        extract_chunk(file_path, chunk["parts"], chunk_path, ffmpeg)
+        transcriber = idle.get()
+        try:
+            return transcriber.transcribe(chunk_path)
+        finally:
+            idle.put(transcriber)
+            os.remove(chunk_path)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(transcribers))) as executor:
+            chunk_segments = list(executor.map(run, range(len(chunks)), chunks))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if stats is not None:
+        covered = covered_seconds(chunks)
+        stats.update({
+            "duration": round(duration, 1),
+            "chunks": len(chunks),
+            "transcribed_seconds": round(covered, 1),
+            "skipped_seconds": round(max(0.0, duration - covered), 1)
+        })
+    return stitch(chunks, chunk_segments)
+
+
+def _srt_time(seconds):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def write_srt(segments, output_path):
+    """按 SRT 字幕格式写入带时间戳的片段"""
+    with open(output_path, "w", encoding="utf-8") as f:
+        for number, segment in enumerate(segments, start=1):
+            f.write(f"{number}\n{_srt_time(segment['start'])} --> {_srt_time(segment['end'])}\n"
+                    f"{segment['text']}\n\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="按静音切分录音（查看切分计划）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    plan_parser = subparsers.add_parser("plan", help="显示静音检测和切块结果")
+    plan_parser.add_argument("file")
+    plan_parser.add_argument("--target-seconds", type=float, default=300.0, help="块的目标时长")
+    plan_parser.add_argument("--noise-db", type=float, default=-35.0, help="静音的音量阈值（dB）")
+    args = parser.parse_args()
+
+    silences, duration = detect_silences(args.file, noise_db=args.noise_db,
+                                         ffmpeg=os.getenv("FFMPEG_PATH", "ffmpeg"))
+    chunks = plan_chunks(silences, duration, target=args.target_seconds,
+                         max_length=max(args.target_seconds * 2, 600.0))
+    covered = covered_seconds(chunks)
+    print(f"时长 {duration:.1f}s，{len(silences)} 段静音，{len(chunks)} 块，跳过 {duration - covered:.1f}s")
+    for number, chunk in enumerate(chunks, start=1):
+        print(f"  {number:3d}. {chunk['start']:8.1f} - {chunk['end']:8.1f}s（{len(chunk['parts'])} 段讲话）")
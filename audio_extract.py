@@ -0,0 +1,169 @@
+"""
+音视频上传的音频提取与规范化
+One-pass audio extraction and normalization stage with a reusable cache
+
+MP4 等上传文件在转录前只解码一次：用 ffmpeg 提取音轨并重采样为 16kHz 单声道（Whisper 的输入格式），
+以无损 FLAC 保存为按源文件内容 SHA-256 命名的缓存文件。之后的静音检测、切块和转录都只读这个文件，
+重试或重新转录不再解码视频容器。
+
+缓存条目（时长、大小、源文件大小）记录在数据库 audio_cache 表中；
+缓存目录总大小超过上限时按最近使用时间淘汰最旧的文件；
+任务使用中（prepare(pin=True) 到 release 之间）的文件和刚生成的文件不会被淘汰。
+
+环境变量：AUDIO_CACHE_DIR、AUDIO_CACHE_MAX_MB、FFMPEG_PATH、FFPROBE_PATH
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Optional
+
+from audio_chunking import SAMPLE_RATE, probe_duration
+from sentence_cache import file_sha256
+
+AUDIO_EXTENSION = ".flac"
+
+
+class AudioExtractionError(Exception):
+    pass
+
+
+def extract_audio(file_path, output_path, ffmpeg="ffmpeg"):
+    """提取音轨并重采样为 16kHz 单声道 16 位 FLAC"""
+    try:
+        subprocess.run(
+            [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", file_path, "-vn", "-sn", "-dn",
+             "-ac", "1", "-ar", str(SAMPLE_RATE), "-sample_fmt", "s16", "-c:a", "flac", "-f", "flac", output_path],
+            capture_output=True, check=True
+        )
+    except OSError as e:
+        raise AudioExtractionError(f"无法运行 ffmpeg: {e}")
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode("utf-8", "replace").strip() if e.stderr else ""
+        raise AudioExtractionError(f"音频提取失败: {file_path}: {stderr[-500:]}")
+
+
+class AudioStore:
+    def __init__(self, db, cache_dir: str = "results/audio", max_bytes: int = 10 * 1024 ** 3,
+                 ffmpeg: str = "ffmpeg", ffprobe: str = "ffprobe"):
+        self.db = db
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 内容哈希 -> 正在使用该音频的任务数
+        self._pins = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def prepare(self, file_path: str, content_hash: Optional[str] = None, pin: bool = False):
+        """
+        返回 file_path 对应的规范化音频（缓存命中时不再解码）
+
+        Args:
+            file_path (str): 上传的音频/视频文件
+            content_hash (str): 可选，已算好的源文件 SHA-256
+            pin (bool): 为 True 时在调用 release(content_hash) 之前不淘汰这个音频（任务使用期间）
+
+        Returns:
+            dict: {"content_hash", "audio_path", "duration", "size", "source_size"}
+
+        Raises:
+            AudioExtractionError: ffmpeg 不可用或无法解码（此时不会固定）
+        """
+        content_hash = content_hash or file_sha256(file_path)
+        if not pin:
+            return self._prepare(file_path, content_hash)
+        # 先固定再查缓存，查到的文件不会在返回前被其他任务淘汰
+        with self._lock:
+            self._pins[content_hash] = self._pins.get(content_hash, 0) + 1
+        try:
+            return self._prepare(file_path, content_hash)
+        except BaseException:
+            self.release(content_hash)
+            raise
+
+    def release(self, content_hash: Optional[str]):
+        """解除 prepare(pin=True) 的固定"""
+        if content_hash is None:
+            return
+        with self._lock:
+            count = self._pins.get(content_hash, 0) - 1
+            if count > 0:
+                self._pins[content_hash] = count
+            else:
+                self._pins.pop(content_hash, None)
+
+    def _prepare(self, file_path, content_hash):
+        entry = self.db.get_audio_cache(content_hash)
+        if entry and os.path.exists(entry["audio_path"]):
+            with self._lock:
+                self.hits += 1
+            self.db.touch_audio_cache(content_hash)
+            os.utime(entry["audio_path"])
+            return entry
+        with self._lock:
+            self.misses += 1
+
+        audio_path = os.path.join(self.cache_dir, content_hash + AUDIO_EXTENSION)
+        # 临时文件不用 .flac 后缀，淘汰时不会被当作缓存条目
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            extract_audio(file_path, tmp_path, self.ffmpeg)
+            os.replace(tmp_path, audio_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        entry = {
+            "content_hash": content_hash,
+            "audio_path": audio_path,
+            "duration": probe_duration(audio_path, self.ffprobe),
+            "size": os.path.getsize(audio_path),
+            "source_size": os.path.getsize(file_path)
+        }
+        self.db.save_audio_cache(entry["content_hash"], entry["audio_path"], entry["duration"],
+                                 entry["size"], entry["source_size"])
+        self.evict(keep=content_hash)
+        return entry
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        总大小超过 max_bytes 时删除最久未使用的音频及其记录
+
+        固定中的音频和 keep（刚生成的条目，即使它本身超过上限）不会被删除。
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(AUDIO_EXTENSION):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path, name in entries:
+            if total <= self.max_bytes:
+                break
+            content_hash = name[:-len(AUDIO_EXTENSION)]
+            if content_hash == keep:
+                continue
+            with self._lock:
+                if content_hash in self._pins:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    continue
+            self.db.delete_audio_cache(content_hash)
+
+    def stats(self):
+        """返回累计的命中/未命中次数"""
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,235 @@
+"""
+批量 N 路比较：多个文档两两比较，输出一个汇总工作簿
+Batch N-way comparison with parallel pairwise scheduling
+
+- 每个文档只解析一次（可使用句子缓存）；zip 文件中的 .docx 会被解压后参与比较
+- 文档对按 (a, b) 顺序分发到进程池，每个进程为用到的文档建一次候选索引并在后续文档对中复用
+- 汇总工作簿：相似度矩阵 + 句子对列表 + 每对文档一个明细工作表（只写模式流式写入）
+
+文档对的相似度为双方参与匹配的句子占两文档句子总数的比例。
+每对文档的明细与 doc_checker.iter_match_sentences(backend="sequence") 的结果相同。
+"""
+
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+import doc_checker
+import report_writer
+import sentence_matcher
+import sentence_segmenter
+
+# 每个工作进程持有的全部文档句子和已建好的索引，由 _init_worker 初始化
+_worker_documents = None
+_worker_indexes = {}
+_worker_options = None
+
+
+def expand_inputs(paths, extract_dir):
+    """
+    将输入路径展开为 .docx 文件列表，zip 中的 .docx 解压到 extract_dir
+
+    Returns:
+        list: 文档路径（按输入顺序，zip 内按名称排序）
+    """
+    files = []
+    number = 0
+    for path in paths:
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                names = sorted(name for name in archive.namelist()
+                               if name.lower().endswith(".docx") and not os.path.basename(name).startswith("~$"))
+                for name in names:
+                    # 不同压缩包或同一压缩包内可能有同名文件，序号在全部压缩包间连续编号避免覆盖；
+                    # 不使用包内路径，防止写到目录之外
+                    target = os.path.join(extract_dir, f"{number:03d}_{os.path.basename(name)}")
+                    number += 1
+                    with archive.open(name) as src, open(target, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    files.append(target)
+        else:
+            files.append(path)
+    return files
+
+
+def iter_pair_matches(sentences1, sentences2, index2, threshold, top_k=None, exact_first=True):
+    """
+    用预先建好的文档2索引比较一对文档，结果与 iter_match_sentences 相同
+
+    精确匹配的句子对记为相似度 1.0，这些句子与其他句子的模糊匹配照常保留；
+    重复出现的文档1句子只打一次分。同一个索引可以被多对文档复用。
+
+    Yields:
+        tuple: (i, j, 匹配项)
+    """
+    texts1 = [s["sentence"] for s in sentences1]
+    texts2 = index2.texts
+    exact = {}
+    rows = {}
+    if exact_first:
+        for i, j in sentence_matcher.exact_matches(texts1, texts2):
+            exact.setdefault(i, []).append(j)
+    for i, text in enumerate(texts1):
+        row = rows.get(text)
+        if row is None:
+            row = sentence_matcher.match_sentence(index2, text, threshold, top_k)
+            if exact_first:
+                rows[text] = row
+        pairs = sentence_matcher.combine_exact(exact.get(i, ()), row, top_k)
+        for j, similarity, stage in pairs:
+            yield i, j, {
+                "sentence1": text,
+                "sentence2": texts2[j],
+                "para1": sentences1[i]["paragraph_index"],
+                "para2": sentences2[j]["paragraph_index"],
+                "similarity": round(similarity, 3),
+                "stage": stage
+            }
+
+
+def _init_worker(documents, threshold, top_k, exact_first):
+    global _worker_documents, _worker_indexes, _worker_options
+    _worker_documents = documents
+    _worker_indexes = {}
+    _worker_options = (threshold, top_k, exact_first)
+
+
+def _compare_pair(pair):
+    a, b = pair
+    threshold, top_k, exact_first = _worker_options
+    index = _worker_indexes.get(b)
+    if index is None:
+        index = sentence_matcher.SentenceIndex([s["sentence"] for s in _worker_documents[b]], threshold)
+        _worker_indexes[b] = index
+    matched1, matched2, matches = set(), set(), []
+    for i, j, match in iter_pair_matches(_worker_documents[a], _worker_documents[b], index, threshold,
+                                         top_k, exact_first):
+        matched1.add(i)
+        matched2.add(j)
+        matches.append(match)
+    total = len(_worker_documents[a]) + len(_worker_documents[b])
+    # 双方参与匹配的句子占两文档句子总数的比例
+    similarity = round((len(matched1) + len(matched2)) / total, 3) if total else 0.0
+    return a, b, similarity, matches
+
+
+def iter_pair_results(documents, threshold=0.9, workers=1, top_k=None, exact_first=True):
+    """
+    按 (a, b) 顺序生成全部文档对的比较结果
+
+    Args:
+        documents (list): 每个文档的句子列表
+        threshold (float): 相似度阈值
+        workers (int): 进程数（1 为单进程）
+        top_k (int): 可选，每个文档1句子最多保留的匹配数
+        exact_first (bool): 是否先做精确匹配
+
+    Yields:
+        tuple: (a, b, 文档对相似度, 匹配项列表)
+    """
+    pairs = list(combinations(range(len(documents)), 2))
+    if workers <= 1 or len(pairs) <= 1:
+        _init_worker(documents, threshold, top_k, exact_first)
+        try:
+            for pair in pairs:
+                yield _compare_pair(pair)
+        finally:
+            _init_worker(None, threshold, top_k, exact_first)
+        return
+
+    # 每个进程缓存自己用到的文档索引，N 个文档在每个进程中最多各建一次
+    chunksize = max(1, len(pairs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(documents, threshold, top_k, exact_first)) as executor:
+        yield from executor.map(_compare_pair, pairs, chunksize=chunksize)
+
+
+def _bold_row(ws, values):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    ws.append(cells)
+
+
+def main(files, output_excel="批量比较报告.xlsx", similarity_threshold=0.9, workers=1, sentence_cache=None,
+         segmenter=sentence_segmenter.DEFAULT_SEGMENTER, exact_first=True, top_k=None, stats=None, names=None):
+    """
+    两两比较多个文档并输出汇总工作簿
+
+    Args:
+        files (list): 文档路径（不少于 2 个）
+        output_excel (str): 汇总工作簿路径
+        similarity_threshold (float): 句子相似度阈值
+        workers (int): 并行比较的进程数
+        sentence_cache (SentenceCache): 可选，句子缓存
+        segmenter (str): 分句器
+        exact_first (bool): 是否先做精确匹配
+        top_k (int): 可选，每个文档1句子最多保留的匹配数
+        stats (dict): 可选，写入文档数、文档对数、匹配数和句子缓存命中数
+        names (dict): 可选，文档路径 -> 报告中显示的名称（默认为文件名）
+
+    Returns:
+        bool: 比较成功返回 True
+    """
+    doc_checker.check_top_k(top_k)
+    missing = [f for f in files if not os.path.exists(f)]
+    if missing:
+        print(f"文件不存在：{'、'.join(missing)}")
+        return False
+    if len(files) < 2:
+        print("至少需要两个文档。")
+        return False
+
+    documents = [doc_checker.load_sentences(f, sentence_cache, segmenter, stats) for f in files]
+    names = [(names or {}).get(f) or os.path.basename(f) for f in files]
+    matrix = [[1.0 if a == b else None for b in range(len(files))] for a in range(len(files))]
+
+    wb = Workbook(write_only=True)
+    matrix_ws = wb.create_sheet("相似度矩阵")
+    pairs_ws = wb.create_sheet("文档对")
+    _bold_row(pairs_ws, ["文档1", "文档2", "相似度", "匹配句子数", "明细工作表"])
+    pair_rows = []
+    total_matches = 0
+    for a, b, similarity, matches in iter_pair_results(documents, similarity_threshold, workers, top_k, exact_first):
+        matrix[a][b] = matrix[b][a] = similarity
+        total_matches += len(matches)
+        # 工作表名最长 31 个字符，使用文档序号命名
+        title = f"{a + 1}-{b + 1}"
+        pair_rows.append([names[a], names[b], similarity, len(matches), title])
+        detail = wb.create_sheet(title)
+        detail.append(["文档 1:", names[a]])
+        detail.append(["文档 2:", names[b]])
+        _bold_row(detail, report_writer.HEADERS)
+        rows = 3
+        for number, match in enumerate(matches, start=1):
+            if rows >= report_writer.EXCEL_MAX_ROWS:
+                # 超过单表行数上限时截断，完整结果可用 doc_checker 单独比较这一对文档
+                detail.append([f"结果过多，仅列出前 {number - 1} 条"])
+                break
+            detail.append(report_writer.match_row(number, match))
+            rows += 1
+
+    _bold_row(matrix_ws, [""] + [f"{k + 1}. {name}" for k, name in enumerate(names)])
+    for a, name in enumerate(names):
+        matrix_ws.append([f"{a + 1}. {name}"] + matrix[a])
+    for row in sorted(pair_rows, key=lambda row: -row[2]):
+        pairs_ws.append(row)
+    wb.save(output_excel)
+
+    if stats is not None:
+        stats.update({
+            "documents": len(files),
+            "pairs": len(pair_rows),
+            "matches": total_matches
+        })
+    print(f"批量比较完成！{len(files)} 个文档，{len(pair_rows)} 对，共 {total_matches} 个相似句子。"
+          f"报告已生成：{output_excel}")
+    return True
@@ -0,0 +1,268 @@
+"""
+批量转录目录中的音视频文件（可中断、可续跑）
+Resumable batch transcription with a manifest, concurrent workers and per-file retries
+
+- 递归查找音视频文件（扩展名不区分大小写：.mp4 / .MP4 / .Mp3 ...）；源文件只读，不重命名也不移动
+- 每个文件单独转录，输出到 output_dir 下与源文件相同的相对路径（扩展名改为 .txt）；
+  先写入 .part 文件，完成后再改名，中断时不会留下不完整的输出
+- 清单文件（默认 output_dir/transcribe_manifest.json）记录每个文件的状态、尝试次数、耗时和错误，
+  每次状态变化后原子写入；进程崩溃后重新运行同一命令即从断点继续
+- 输出已存在、且源文件大小和修改时间与清单一致的文件直接跳过
+- workers 个文件同时转录（常驻转录进程时每个 worker 使用自己的进程，否则各自调用 whisper 命令），
+  失败的文件单独重试 retries 次，不影响其他文件
+
+命令行：
+    python batch_transcribe.py INPUT_DIR OUTPUT_DIR [--workers N] [--retries N] [--manifest PATH]
+"""
+
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+import video_transcription
+import whisper_server
+
+MEDIA_EXTENSIONS = (".mp4", ".mp3", ".wav", ".m4a", ".mov", ".mkv", ".flac")
+MANIFEST_NAME = "transcribe_manifest.json"
+
+
+class BatchError(Exception):
+    pass
+
+
+def find_media_files(input_dir, extensions=MEDIA_EXTENSIONS):
+    """递归查找音视频文件（扩展名不区分大小写），按路径排序"""
+    extensions = {extension.lower() for extension in extensions}
+    return sorted(str(path) for path in Path(input_dir).rglob("*")
+                  if path.is_file() and path.suffix.lower() in extensions)
+
+
+def plan_outputs(files, input_dir, output_dir):
+    """
+    每个源文件对应的清单键（相对路径）和输出文件
+
+    同一目录下只有扩展名不同的文件（a.mp3 与 a.mp4）保留扩展名（a.mp3.txt），避免互相覆盖。
+
+    Returns:
+        list: [(键, 源文件, 输出文件)]
+    """
+    keys = [Path(os.path.relpath(file_path, input_dir)).as_posix() for file_path in files]
+    stems = [os.path.splitext(key)[0].lower() for key in keys]
+    plan = []
+    for key, stem, file_path in zip(keys, stems, files):
+        name = key if stems.count(stem) > 1 else os.path.splitext(key)[0]
+        plan.append((key, file_path, os.path.join(output_dir, *(name + ".txt").split("/"))))
+    return plan
+
+
+class Manifest:
+    """每个源文件的转录状态，保存为 JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def get(self, key):
+        return self.files.get(key)
+
+    def update(self, key, save=True, **fields):
+        with self._lock:
+            self.files.setdefault(key, {}).update(fields, updated_at=time.time())
+            if save:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        # 先写临时文件再替换，崩溃时清单不会损坏
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def _up_to_date(entry, output_path, stat):
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return False
+    # 没有清单记录的已有输出（例如旧版批量转录的结果）也视为已完成
+    return entry is None or (entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime)
+
+
+def _transcribe_with_cli(file_path, output_path):
+    # whisper 命令按源文件名命名输出；每个文件使用单独的临时目录，不需要改源文件的名字
+    work_dir = tempfile.mkdtemp(prefix="whisper_", dir=os.path.dirname(output_path))
+    try:
+        cmd = video_transcription.whisper_command(work_dir, [file_path])
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+        if result.returncode != 0:
+            raise BatchError(f"whisper 返回 {result.returncode}: {result.stderr.strip()[-500:]}")
+        produced = os.path.join(work_dir, Path(file_path).stem + ".txt")
+        if not os.path.exists(produced):
+            raise BatchError(f"未找到 whisper 的输出文件: {produced}")
+        shutil.move(produced, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def transcribe_file(file_path, output_path, server=None):
+    """
+    转录一个文件到 output_path
+
+    Args:
+        server (WhisperServer): 常驻转录进程，None 时调用 whisper 命令
+
+    Raises:
+        WorkerError / BatchError / OSError: 转录失败
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    part_path = output_path + ".part"
+    try:
+        if server is not None:
+            server.transcribe(file_path, part_path)
+        else:
+            _transcribe_with_cli(file_path, part_path)
+        os.replace(part_path, output_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def run_batch(input_dir, output_dir, workers=1, retries=2, manifest_path=None, extensions=MEDIA_EXTENSIONS,
+              retry_delay=2.0, verbose=False):
+    """
+    转录 input_dir 下的全部音视频文件
+
+    Args:
+        workers (int): 同时转录的文件数
+        retries (int): 每个文件失败后的重试次数
+        manifest_path (str): 清单文件，默认 output_dir/transcribe_manifest.json
+        retry_delay (float): 第一次重试前的等待时间（秒），之后每次翻倍
+
+    Returns:
+        dict: {"total", "done", "skipped", "failed", "manifest"}
+    """
+    files = find_media_files(input_dir, extensions)
+    manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+    manifest = Manifest(manifest_path)
+    summary = {"total": len(files), "done": 0, "skipped": 0, "failed": 0, "manifest": manifest_path}
+
+    pending = []
+    for key, file_path, output_path in plan_outputs(files, input_dir, output_dir):
+        stat = os.stat(file_path)
+        entry = manifest.get(key)
+        if _up_to_date(entry, output_path, stat):
+            summary["skipped"] += 1
+            if entry is None or entry.get("status") != "done":
+                manifest.update(key, save=False, status="done", output=output_path, size=stat.st_size,
+                                mtime=stat.st_mtime)
+            continue
+        manifest.update(key, save=False, status="pending", output=output_path, size=stat.st_size,
+                        mtime=stat.st_mtime, attempts=0, error=None)
+        pending.append((key, file_path, output_path))
+    manifest.save()
+    if verbose:
+        for key, _, output_path in pending:
+            print(f"  - {key} -> {output_path}")
+    if not pending:
+        return summary
+
+    backend = whisper_server.resolve_backend(video_transcription.WHISPER_BACKEND)
+    if backend == "cli" and shutil.which(video_transcription.WHISPER_CLI) is None:
+        raise BatchError(f"找不到 {video_transcription.WHISPER_CLI}，且未安装 faster-whisper 或 openai-whisper")
+    # 每个 worker 独占一个转录进程（使用 whisper 命令时为 None）
+    workers = max(1, min(workers, len(pending)))
+    stack = ExitStack()
+    idle = queue.Queue()
+    for slot in range(workers):
+        # 整批转录期间租用这些进程，不会被其他任务切换模型时关闭
+        idle.put(stack.enter_context(video_transcription.leased_server(slot)))
+    counter = {"finished": 0}
+    counter_lock = threading.Lock()
+
+    def run(item):
+        key, file_path, output_path = item
+        server = idle.get()
+        try:
+            for attempt in range(1, retries + 2):
+                manifest.update(key, status="running", attempts=attempt)
+                started = time.monotonic()
+                try:
+                    transcribe_file(file_path, output_path, server)
+                except (whisper_server.WorkerError, BatchError, OSError) as e:
+                    manifest.update(key, error=f"{type(e).__name__}: {e}")
+                    if attempt <= retries:
+                        print(f"✗ {key}（第 {attempt} 次）: {e}，稍后重试")
+                        time.sleep(retry_delay * 2 ** (attempt - 1))
+                        continue
+                    manifest.update(key, status="failed")
+                    ok = False
+                    break
+                manifest.update(key, status="done", error=None, seconds=round(time.monotonic() - started, 1))
+                ok = True
+                break
+        finally:
+            idle.put(server)
+        with counter_lock:
+            counter["finished"] += 1
+            print(f"[{counter['finished']}/{len(pending)}] {'✓' if ok else '✗'} {key}")
+        return ok
+
+    with stack, ThreadPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(run, pending):
+            summary["done" if ok else "failed"] += 1
+    return summary
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="批量转录文件夹中的音视频文件（可中断后继续）")
+    parser.add_argument("input_dir", help="输入音视频文件所在的文件夹")
+    parser.add_argument("output_dir", help="输出文本文件的文件夹")
+    parser.add_argument("--workers", "-j", type=int, default=video_transcription.CHUNK_WORKERS,
+                        help="同时转录的文件数（GPU 上默认 1）")
+    parser.add_argument("--retries", type=int, default=2, help="每个文件失败后的重试次数")
+    parser.add_argument("--manifest", help=f"清单文件（默认 OUTPUT_DIR/{MANIFEST_NAME}）")
+    parser.add_argument("--extensions", nargs="+", default=list(MEDIA_EXTENSIONS), help="要转录的扩展名")
+    parser.add_argument("--verbose", "-v", action="store_true", help="显示详细信息")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        raise SystemExit(f"错误: 输入目录不存在: {args.input_dir}")
+    os.makedirs(args.output_dir, exist_ok=True)
+    extensions = [e if e.startswith(".") else "." + e for e in args.extensions]
+
+    print(f"正在扫描目录: {args.input_dir}")
+    try:
+        summary = run_batch(args.input_dir, args.output_dir, args.workers, args.retries, args.manifest,
+                            extensions, verbose=args.verbose)
+    except BatchError as e:
+        raise SystemExit(f"错误: {e}")
+
+    print(f"\n转录完成!")
+    print(f"共 {summary['total']} 个文件：新转录 {summary['done']}，已有输出跳过 {summary['skipped']}，"
+          f"失败 {summary['failed']}")
+    print(f"输出目录: {args.output_dir}")
+    print(f"清单文件: {summary['manifest']}")
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -70,6 +70,82 @@ class Database:
             )
         """)
         
+        # Paragraph hashes seen on each side of a comparison (for incremental re-comparison)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS doc_comparison_paragraphs (
+                comparison_id VARCHAR(36) PRIMARY KEY,
+                settings_key VARCHAR(64),
+                paragraph_hashes1 LONGTEXT,
+                paragraph_hashes2 LONGTEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_settings_key (settings_key)
+            )
+        """)
+        
+        # Sentence matches between two paragraphs, keyed by both paragraph hashes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS paragraph_match_results (
+                comparison_id VARCHAR(36),
+                para_hash1 CHAR(32),
+                para_hash2 CHAR(32),
+                matches MEDIUMTEXT,
+                INDEX idx_comparison_id (comparison_id)
+            )
+        """)
+        
+        # Uploaded file contents, stored once per content hash
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS upload_blobs (
+                blob_path VARCHAR(255) PRIMARY KEY,
+                content_hash CHAR(64),
+                size BIGINT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # One row per upload: original filename and the record it belongs to (references a blob)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS upload_files (
+                id VARCHAR(36) PRIMARY KEY,
+                blob_path VARCHAR(255),
+                original_filename TEXT,
+                owner_type VARCHAR(20),
+                owner_id VARCHAR(36),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_blob_path (blob_path),
+                INDEX idx_owner_id (owner_id)
+            )
+        """)
+        
+        # Transcription outputs keyed by media content hash + transcription settings
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transcription_cache (
+                cache_key CHAR(64) PRIMARY KEY,
+                media_hash CHAR(64),
+                settings TEXT,
+                raw_text_path TEXT,
+                processed_text_path TEXT,
+                hit_count INT DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_hit_at TIMESTAMP NULL DEFAULT NULL,
+                INDEX idx_media_hash (media_hash)
+            )
+        """)
+        
+        # 16 kHz mono audio extracted once per uploaded media file (keyed by the upload's content hash)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS audio_cache (
+                content_hash CHAR(64) PRIMARY KEY,
+                audio_path VARCHAR(255),
+                duration DOUBLE,
+                size BIGINT,
+                source_size BIGINT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
         conn.commit()
         cursor.close()
         conn.close()
@@ -108,6 +184,330 @@ class Database:
         
         return results
     
+    def save_paragraph_results(self, comparison_id: str, settings_key: str, paragraph_hashes1: str,
+                               paragraph_hashes2: str, results: List[tuple]):
+        """Save paragraph hashes and per-paragraph-pair match results of a comparison"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO doc_comparison_paragraphs (comparison_id, settings_key, paragraph_hashes1, paragraph_hashes2)
+            VALUES (%s, %s, %s, %s)
+        """, (comparison_id, settings_key, paragraph_hashes1, paragraph_hashes2))
+        if results:
+            cursor.executemany("""
+                INSERT INTO paragraph_match_results (comparison_id, para_hash1, para_hash2, matches)
+                VALUES (%s, %s, %s, %s)
+            """, [(comparison_id, h1, h2, matches) for h1, h2, matches in results])
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def get_paragraph_hash_sets(self, settings_key: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Retrieve paragraph hashes of the most recent comparisons made with the given settings"""
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute("""
+            SELECT comparison_id, paragraph_hashes1, paragraph_hashes2 FROM doc_comparison_paragraphs
+            WHERE settings_key = %s
+            ORDER BY created_at DESC
+            LIMIT %s
+        """, (settings_key, limit))
+        
+        results = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        return results  # type: ignore
+    
+    def get_paragraph_results(self, comparison_id: str) -> Dict[str, Any]:
+        """
+        Retrieve paragraph hashes and per-paragraph-pair match results of a comparison
+
+        Both are read from one consistent snapshot, so a concurrent delete_old_paragraph_results
+        either removes the whole comparison (empty dict) or none of it.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        conn.start_transaction(consistent_snapshot=True, isolation_level="REPEATABLE READ", readonly=True)
+        cursor.execute("""
+            SELECT paragraph_hashes1, paragraph_hashes2 FROM doc_comparison_paragraphs
+            WHERE comparison_id = %s
+        """, (comparison_id,))
+        record = cursor.fetchone()
+        if record:
+            cursor.execute("""
+                SELECT para_hash1, para_hash2, matches FROM paragraph_match_results
+                WHERE comparison_id = %s
+            """, (comparison_id,))
+            record["results"] = cursor.fetchall()
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return record if record else {}  # type: ignore
+    
+    def delete_old_paragraph_results(self, settings_key: str, keep: int) -> int:
+        """Delete paragraph results of all but the most recent `keep` comparisons with the given settings"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT comparison_id FROM doc_comparison_paragraphs
+            WHERE settings_key = %s
+            ORDER BY created_at DESC
+            LIMIT 18446744073709551615 OFFSET %s
+        """, (settings_key, keep))
+        stale = [(row[0],) for row in cursor.fetchall()]
+        if stale:
+            cursor.executemany("DELETE FROM paragraph_match_results WHERE comparison_id = %s", stale)
+            cursor.executemany("DELETE FROM doc_comparison_paragraphs WHERE comparison_id = %s", stale)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return len(stale)
+    
+    def save_upload_blob(self, blob_path: str, content_hash: str, size: int):
+        """Register a stored blob, or refresh its last upload time if it already exists"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO upload_blobs (blob_path, content_hash, size)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE last_uploaded_at = CURRENT_TIMESTAMP
+        """, (blob_path, content_hash, size))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def save_upload_file(self, file_id: str, blob_path: str, original_filename: str, owner_type: str, owner_id: str):
+        """Save an upload reference (original filename and owning record) to a blob"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO upload_files (id, blob_path, original_filename, owner_type, owner_id)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (file_id, blob_path, original_filename, owner_type, owner_id))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def get_upload_file(self, file_id: str) -> Dict[str, Any]:
+        """Retrieve an upload reference by ID"""
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute("SELECT * FROM upload_files WHERE id = %s", (file_id,))
+        
+        result = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        
+        return result if result else {}  # type: ignore
+    
+    def get_upload_files(self, owner_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retrieve the upload references of the given records"""
+        if not owner_ids:
+            return []
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        placeholders = ", ".join(["%s"] * len(owner_ids))
+        cursor.execute(f"SELECT * FROM upload_files WHERE owner_id IN ({placeholders})", tuple(owner_ids))
+        
+        results = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        return results  # type: ignore
+    
+    def delete_upload_files_before(self, cutoff: datetime) -> int:
+        """Release upload references created before cutoff; returns the number released"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM upload_files WHERE created_at < %s", (cutoff,))
+        count = cursor.rowcount
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return count
+    
+    def get_unreferenced_blobs(self, uploaded_before: datetime) -> List[Dict[str, Any]]:
+        """Retrieve blobs with no upload references that were last uploaded before the given time"""
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute("""
+            SELECT b.blob_path, b.size FROM upload_blobs b
+            LEFT JOIN upload_files f ON f.blob_path = b.blob_path
+            WHERE f.id IS NULL AND b.last_uploaded_at < %s
+        """, (uploaded_before,))
+        
+        results = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        return results  # type: ignore
+    
+    def delete_upload_blob(self, blob_path: str):
+        """Delete a blob record"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM upload_blobs WHERE blob_path = %s", (blob_path,))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def save_transcription_cache(self, cache_key: str, media_hash: str, settings: str,
+                                 raw_text_path: str, processed_text_path: str):
+        """Save (or replace) a transcription cache entry"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO transcription_cache (cache_key, media_hash, settings, raw_text_path, processed_text_path)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE raw_text_path = VALUES(raw_text_path),
+                processed_text_path = VALUES(processed_text_path), created_at = CURRENT_TIMESTAMP
+        """, (cache_key, media_hash, settings, raw_text_path, processed_text_path))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def get_transcription_cache(self, cache_key: str) -> Dict[str, Any]:
+        """Retrieve a transcription cache entry by key"""
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute("SELECT * FROM transcription_cache WHERE cache_key = %s", (cache_key,))
+        
+        result = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        
+        return result if result else {}  # type: ignore
+    
+    def record_transcription_cache_hit(self, cache_key: str):
+        """Count a hit on a transcription cache entry"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE transcription_cache SET hit_count = hit_count + 1, last_hit_at = CURRENT_TIMESTAMP
+            WHERE cache_key = %s
+        """, (cache_key,))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def delete_transcription_cache(self, cache_key: Optional[str] = None, media_hash: Optional[str] = None,
+                                   raw_text_path: Optional[str] = None) -> int:
+        """Delete transcription cache entries matching the given fields (all entries if none given)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        conditions = []
+        params = []
+        for column, value in (("cache_key", cache_key), ("media_hash", media_hash), ("raw_text_path", raw_text_path)):
+            if value is not None:
+                conditions.append(f"{column} = %s")
+                params.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"DELETE FROM transcription_cache{where}", tuple(params))
+        count = cursor.rowcount
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return count
+    
+    def get_transcription_cache_stats(self) -> Dict[str, Any]:
+        """Number of transcription cache entries and their total hits"""
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(hit_count), 0) AS total_hits FROM transcription_cache")
+        
+        result = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        
+        return {"entries": int(result["entries"]), "total_hits": int(result["total_hits"])}  # type: ignore
+    
+    def save_audio_cache(self, content_hash: str, audio_path: str, duration: Optional[float], size: int,
+                         source_size: int):
+        """Save (or replace) the extracted audio of a media file"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO audio_cache (content_hash, audio_path, duration, size, source_size)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE audio_path = VALUES(audio_path), duration = VALUES(duration),
+                size = VALUES(size), source_size = VALUES(source_size), last_used_at = CURRENT_TIMESTAMP
+        """, (content_hash, audio_path, duration, size, source_size))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def get_audio_cache(self, content_hash: str) -> Dict[str, Any]:
+        """Retrieve the extracted audio of a media file by content hash"""
+        conn = self._get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute("""
+            SELECT content_hash, audio_path, duration, size, source_size FROM audio_cache
+            WHERE content_hash = %s
+        """, (content_hash,))
+        
+        result = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        
+        return result if result else {}  # type: ignore
+    
+    def touch_audio_cache(self, content_hash: str):
+        """Mark extracted audio as recently used"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("UPDATE audio_cache SET last_used_at = CURRENT_TIMESTAMP WHERE content_hash = %s",
+                       (content_hash,))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
+    def delete_audio_cache(self, content_hash: str):
+        """Delete the record of evicted audio"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM audio_cache WHERE content_hash = %s", (content_hash,))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+    
     def save_meeting_transcription(self, transcription_id: str, audio_path: str, video_path: str, 
                                   raw_text_path: str, processed_text_path: str, user_id: Optional[str] = None):
         """Save meeting transcription record to database"""
@@ -0,0 +1,242 @@
+"""
+按顺序对齐的修订比较（类似 Word 的修订/红线对比）
+Order-aware alignment diff for doc_checker
+
+1. 段落级：按段落内容哈希做 patience 对齐（唯一段落作锚点 + 最长递增子序列，近似线性）
+2. 句子级：只在两侧未对齐的段落区间（gap）内做模糊匹配，并按顺序选出相似度之和最大的一一对应句子对
+3. 输出 unchanged / modified / inserted / deleted 四类片段，连续未变更的段落合并为一个片段
+"""
+
+import bisect
+import hashlib
+from collections import Counter
+
+import sentence_matcher
+
+OPS = ("unchanged", "modified", "inserted", "deleted")
+
+
+def paragraph_hash(sentences):
+    """段落内容哈希：规范化后的句子逐行拼接再取 BLAKE2b（16 字节）"""
+    text = "\n".join(sentence_matcher.normalize_sentence(s) for s in sentences)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def group_paragraphs(sentences_info):
+    """
+    将句子列表按段落编号分组
+
+    Returns:
+        list: [(paragraph_index, [sentence, ...])]，按文档顺序，不含空段落
+    """
+    paragraphs = []
+    for item in sentences_info:
+        if paragraphs and paragraphs[-1][0] == item["paragraph_index"]:
+            paragraphs[-1][1].append(item["sentence"])
+        else:
+            paragraphs.append((item["paragraph_index"], [item["sentence"]]))
+    return paragraphs
+
+
+def _unique_anchors(keys1, keys2, alo, ahi, blo, bhi):
+    # 两侧各只出现一次的段落作为候选锚点，再取 j 的最长递增子序列
+    counts1 = Counter(keys1[alo:ahi])
+    counts2 = Counter(keys2[blo:bhi])
+    position2 = {keys2[j]: j for j in range(blo, bhi) if counts2[keys2[j]] == 1}
+    candidates = [(i, position2[keys1[i]]) for i in range(alo, ahi)
+                  if counts1[keys1[i]] == 1 and keys1[i] in position2]
+    if not candidates:
+        return []
+
+    tails = []       # tails[k]：长度为 k+1 的递增子序列的最小结尾 j
+    tail_index = []  # 对应的 candidates 下标
+    previous = [-1] * len(candidates)
+    for idx, (_, j) in enumerate(candidates):
+        k = bisect.bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_index.append(idx)
+        else:
+            tails[k] = j
+            tail_index[k] = idx
+        previous[idx] = tail_index[k - 1] if k > 0 else -1
+
+    anchors = []
+    idx = tail_index[-1]
+    while idx >= 0:
+        anchors.append(candidates[idx])
+        idx = previous[idx]
+    anchors.reverse()
+    return anchors
+
+
+def align_paragraphs(keys1, keys2):
+    """
+    patience 方式对齐两个段落哈希序列
+
+    Returns:
+        list: 按顺序排列的相同段落下标对 [(i, j)]
+    """
+    pairs = []
+    stack = [(0, len(keys1), 0, len(keys2))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        while alo < ahi and blo < bhi and keys1[alo] == keys2[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and keys1[ahi - 1] == keys2[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+        if alo >= ahi or blo >= bhi:
+            continue
+        prev_i, prev_j = alo, blo
+        for i, j in _unique_anchors(keys1, keys2, alo, ahi, blo, bhi):
+            stack.append((prev_i, i, prev_j, j))
+            pairs.append((i, j))
+            prev_i, prev_j = i + 1, j + 1
+        if (prev_i, prev_j) != (alo, blo):
+            stack.append((prev_i, ahi, prev_j, bhi))
+    pairs.sort()
+    return pairs
+
+
+def _ordered_pairs(texts1, texts2, threshold):
+    """
+    在候选句子对中选出一一对应、i 和 j 都严格递增、相似度之和最大的匹配（加权 LCS）
+
+    按 i 顺序处理候选对，树状数组维护“以 j' < j 结尾的最优链”，复杂度 O(m log n)（m 为候选对数）。
+    总分相同时取先找到的链。
+    """
+    candidates = list(sentence_matcher.iter_matches(texts1, texts2, threshold))
+    if not candidates:
+        return []
+    size = len(texts2)
+    tree = [(0.0, -1)] * (size + 1)  # tree[k]：j < k 范围内某一段的最优 (总分, 链尾候选下标)
+
+    def best_before(j):
+        best = (0.0, -1)
+        while j > 0:
+            if tree[j][0] > best[0]:
+                best = tree[j]
+            j -= j & -j
+        return best
+
+    def update(j, value):
+        j += 1
+        while j <= size:
+            if value[0] > tree[j][0]:
+                tree[j] = value
+            j += j & -j
+
+    scores = [0.0] * len(candidates)
+    previous = [-1] * len(candidates)
+    start = 0
+    while start < len(candidates):
+        # 同一个 i 的候选只能选一个：先全部查询，再统一更新
+        end = start
+        while end < len(candidates) and candidates[end][0] == candidates[start][0]:
+            end += 1
+        for idx in range(start, end):
+            _, j, similarity = candidates[idx]
+            score, previous[idx] = best_before(j)
+            scores[idx] = score + similarity
+        for idx in range(start, end):
+            update(candidates[idx][1], (scores[idx], idx))
+        start = end
+
+    selected = []
+    idx = max(range(len(candidates)), key=lambda k: (scores[k], -k))
+    while idx >= 0:
+        selected.append(candidates[idx])
+        idx = previous[idx]
+    selected.reverse()
+    return selected
+
+
+def _diff_gap(gap1, gap2, threshold, stats):
+    # gap1/gap2: [(paragraph_index, sentence)]
+    texts1 = [s for _, s in gap1]
+    texts2 = [s for _, s in gap2]
+    stats["sentence_pairs_compared"] += len(texts1) * len(texts2)
+    rows = []
+    i = j = 0
+    for mi, mj, similarity in _ordered_pairs(texts1, texts2, threshold):
+        for k in range(i, mi):
+            rows.append(_row("deleted", gap1[k][0], "", gap1[k][1], "", None))
+        for k in range(j, mj):
+            rows.append(_row("inserted", "", gap2[k][0], "", gap2[k][1], None))
+        op = "unchanged" if similarity >= 1.0 else "modified"
+        rows.append(_row(op, gap1[mi][0], gap2[mj][0], gap1[mi][1], gap2[mj][1], round(similarity, 3)))
+        i, j = mi + 1, mj + 1
+    for k in range(i, len(gap1)):
+        rows.append(_row("deleted", gap1[k][0], "", gap1[k][1], "", None))
+    for k in range(j, len(gap2)):
+        rows.append(_row("inserted", "", gap2[k][0], "", gap2[k][1], None))
+    return rows
+
+
+def _row(op, para1, para2, text1, text2, similarity):
+    return {"op": op, "para1": para1, "para2": para2, "text1": text1, "text2": text2, "similarity": similarity}
+
+
+def _span(paragraphs, start, end):
+    first, last = paragraphs[start][0], paragraphs[end - 1][0]
+    return str(first) if first == last else f"{first}-{last}"
+
+
+def align_documents(sentences1, sentences2, threshold=0.9, stats=None):
+    """
+    对两个文档做顺序对齐比较
+
+    Args:
+        sentences1 (list): 文档1的 read_docx_sentences_with_paragraph_index 结果
+        sentences2 (list): 文档2的句子列表
+        threshold (float): gap 内句子模糊匹配的相似度阈值
+        stats (dict): 可选，写入对齐统计
+
+    Returns:
+        list: 按文档顺序排列的片段 {"op", "para1", "para2", "text1", "text2", "similarity"}
+    """
+    paragraphs1 = group_paragraphs(sentences1)
+    paragraphs2 = group_paragraphs(sentences2)
+    keys1 = [paragraph_hash(sents) for _, sents in paragraphs1]
+    keys2 = [paragraph_hash(sents) for _, sents in paragraphs2]
+    aligned = align_paragraphs(keys1, keys2)
+
+    counters = {"sentence_pairs_compared": 0}
+    rows = []
+    prev_i = prev_j = 0
+    run_start = None  # 当前连续未变更段落区间的起点 (i, j)
+    end = (len(paragraphs1), len(paragraphs2))
+    for i, j in aligned + [end]:
+        contiguous = i == prev_i and j == prev_j and (i, j) != end
+        if run_start is not None and not contiguous:
+            # 结束上一段连续未变更的段落
+            ri, rj = run_start
+            count = prev_i - ri
+            rows.append(_row("unchanged", _span(paragraphs1, ri, prev_i), _span(paragraphs2, rj, prev_j),
+                             f"（共 {count} 段相同）", f"（共 {count} 段相同）", 1.0))
+            run_start = None
+        if i > prev_i or j > prev_j:
+            gap1 = [(p, s) for p, sents in paragraphs1[prev_i:i] for s in sents]
+            gap2 = [(p, s) for p, sents in paragraphs2[prev_j:j] for s in sents]
+            rows.extend(_diff_gap(gap1, gap2, threshold, counters))
+        if (i, j) != end:
+            if run_start is None:
+                run_start = (i, j)
+            prev_i, prev_j = i + 1, j + 1
+
+    if stats is not None:
+        total1 = sum(len(sents) for _, sents in paragraphs1)
+        total2 = sum(len(sents) for _, sents in paragraphs2)
+        stats.update({op: sum(1 for row in rows if row["op"] == op) for op in OPS})
+        stats.update({
+            "paragraphs_aligned": len(aligned),
+            "paragraphs1": len(paragraphs1),
+            "paragraphs2": len(paragraphs2),
+            "sentence_pairs_total": total1 * total2,
+            "sentence_pairs_compared": counters["sentence_pairs_compared"]
+        })
+    return rows
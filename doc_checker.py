@@ -57,62 +57,184 @@ Document checker module for comparing Word documents
 
 # 安装依赖：
 # pip install python-docx nltk openpyxl
+# 默认使用内置的 cjk 分句器，不需要 NLTK 数据；选用 punkt 分句器时需预先下载模型：
 # 环境变量：NLTK_DATA = d:\nltk_data
 # d:\> python
 # >>> import nltk
-# >>> nltk.download()
+# >>> nltk.download('punkt_tab')
 #
 
 import os
-from docx import Document
-import nltk
-from nltk.tokenize import sent_tokenize
-import difflib
+import time
+import incremental_compare
+import doc_alignment
+import doc_convert
+import docx_stream
+import sentence_matcher
+import sentence_segmenter
+import shingle_scoring
+import streaming_compare
 import openpyxl
-from openpyxl.styles import Font
+from openpyxl.styles import Font, PatternFill
+import report_writer
 
-# 下载 punkt 分句模型（只需一次）
-nltk.download('punkt', quiet=True)
+# 解析器版本号：分句方式变化时修改，使句子缓存中的旧条目失效
+# （缓存键还会带上分句器名称）
+PARSER_VERSION = "docx-stream-2"
 
-def read_docx_sentences_with_paragraph_index(file_path):
-    """返回句子列表和对应段落编号"""
-    doc = Document(file_path)
-    sentences_info = []
-    for i, para in enumerate(doc.paragraphs):
-        sentences = sent_tokenize(para.text)
+def iter_docx_sentences(file_path, include_tables=False, include_headers_footers=False,
+                        segmenter=sentence_segmenter.DEFAULT_SEGMENTER):
+    """逐条生成句子和对应段落编号（流式读取 document.xml，不构建 python-docx 对象树；.doc 先转换为 .docx）"""
+    file_path = doc_convert.ensure_docx(file_path)
+    split = sentence_segmenter.get_segmenter(segmenter)
+    paragraphs = docx_stream.iter_paragraphs(file_path, include_tables=include_tables,
+                                             include_headers_footers=include_headers_footers)
+    for i, text in enumerate(paragraphs):
+        sentences = split(text)
         for sent in sentences:
             clean_sent = sent.strip()
             if clean_sent:
-                sentences_info.append({
+                yield {
                     "sentence": clean_sent,
                     "paragraph_index": i + 1  # 段落从1开始
-                })
-    return sentences_info
-
-def fuzzy_match_sentences(sentences1, sentences2, threshold=0.9):
-    """返回两个句子列表中相似度高于阈值的匹配项"""
-    matches = []
-    for s1 in sentences1:
-        for s2 in sentences2:
-            similarity = difflib.SequenceMatcher(None, s1["sentence"], s2["sentence"]).ratio()
-            if similarity >= threshold:
-                matches.append({
-                    "sentence1": s1["sentence"],
-                    "sentence2": s2["sentence"],
-                    "para1": s1["paragraph_index"],
-                    "para2": s2["paragraph_index"],                    
-                    "similarity": round(similarity, 3)
-                })
-    return matches
+                }
+
+def read_docx_sentences_with_paragraph_index(file_path, include_tables=False, include_headers_footers=False,
+                                             segmenter=sentence_segmenter.DEFAULT_SEGMENTER):
+    """返回句子列表和对应段落编号"""
+    return list(iter_docx_sentences(file_path, include_tables=include_tables,
+                                    include_headers_footers=include_headers_footers, segmenter=segmenter))
+
+def load_sentences(file_path, sentence_cache=None, segmenter=sentence_segmenter.DEFAULT_SEGMENTER, stats=None):
+    """读取文档句子，提供 sentence_cache 时优先使用按内容哈希缓存的结果（命中数累加到 stats）"""
+    def parse(path):
+        return read_docx_sentences_with_paragraph_index(path, segmenter=segmenter)
+
+    if sentence_cache is None:
+        return parse(file_path)
+    return sentence_cache.get_or_parse(file_path, parse, variant=segmenter, stats=stats)
+
+# 可选的打分后端：sequence 为逐对 SequenceMatcher（候选剪枝），shingle 为稀疏矩阵批量打分
+BACKENDS = ("sequence", "shingle")
+
+
+def _iter_fuzzy_pairs(texts1, texts2, threshold, workers, backend, metric, rescore, top_k=None):
+    if backend == "shingle":
+        return shingle_scoring.iter_matches_vectorized(texts1, texts2, threshold, metric=metric, rescore=rescore,
+                                                       top_n=top_k)
+    if backend == "sequence":
+        return sentence_matcher.iter_matches_parallel(texts1, texts2, threshold, workers=workers, top_k=top_k)
+    raise ValueError(f"未知的打分后端: {backend}")
+
+
+def fuzzy_match_sentences(sentences1, sentences2, threshold=0.9, **options):
+    """返回两个句子列表中相似度高于阈值的匹配项（列表形式，参数同 iter_match_sentences）"""
+    return list(iter_match_sentences(sentences1, sentences2, threshold, **options))
+
+
+def iter_match_sentences(sentences1, sentences2, threshold=0.9, workers=1,
+                         backend="sequence", metric="cosine", rescore=True,
+                         exact_first=True, stats=None, reuse_store=None, top_k=None):
+    """
+    按文档顺序逐条生成两个句子列表中相似度高于阈值的匹配项
+
+    exact_first 为 True 时先按规范化文本哈希连接，完全相同的句子对直接记为相似度 1.0（stage 为 exact）；
+    模糊匹配阶段只给每个不重复的句子文本打一次分，结果复制给重复出现的句子。
+    这些句子与其他句子之间的模糊匹配照常保留，匹配集合与 exact_first=False（逐对比较）相同。
+    提供 reuse_store（incremental_compare.ParagraphResultStore）时按段落对复用历史结果，
+    结果与不复用时相同。
+    top_k 为每个文档1句子最多保留的匹配数（按相似度从高到低，堆 + 上界提前终止）。
+    提供 stats 字典时在生成结束后写入各阶段耗时和节省的句子对数。
+    """
+    texts1 = [s["sentence"] for s in sentences1]
+    texts2 = [s["sentence"] for s in sentences2]
+    start = time.perf_counter()
+
+    exact = {}
+    if exact_first:
+        for i, j in sentence_matcher.exact_matches(texts1, texts2):
+            exact.setdefault(i, []).append(j)
+        unique1, groups1 = sentence_matcher.unique_texts(texts1)
+        unique2, groups2 = sentence_matcher.unique_texts(texts2)
+    else:
+        unique1, groups1 = texts1, [[i] for i in range(len(texts1))]
+        unique2, groups2 = texts2, [[j] for j in range(len(texts2))]
+    exact_seconds = time.perf_counter() - start
+
+    reuse_stats = None
+    if reuse_store is not None:
+        def score_pairs(part1, part2):
+            # 只需重新打分的部分同样按文本去重，结果复制给重复出现的句子
+            if not exact_first:
+                return _iter_fuzzy_pairs(part1, part2, threshold, workers, backend, metric, rescore)
+            part_unique1, part_groups1 = sentence_matcher.unique_texts(part1)
+            part_unique2, part_groups2 = sentence_matcher.unique_texts(part2)
+            part_pairs = _iter_fuzzy_pairs(part_unique1, part_unique2, threshold, workers, backend, metric, rescore)
+            return ((i, j, similarity)
+                    for i, row in sentence_matcher.iter_expanded_rows(part_pairs, part_groups1, part_groups2)
+                    for j, similarity in row)
+
+        all_pairs, reuse_stats = incremental_compare.match_with_reuse(sentences1, sentences2, score_pairs, reuse_store)
+        rows = sentence_matcher.iter_expanded_rows(all_pairs, [[i] for i in range(len(texts1))],
+                                                   [[j] for j in range(len(texts2))])
+    else:
+        unique_pairs = _iter_fuzzy_pairs(unique1, unique2, threshold, workers, backend, metric, rescore, top_k)
+        rows = sentence_matcher.iter_expanded_rows(unique_pairs, groups1, groups2)
+
+    counts = {"exact": 0, "fuzzy": 0}
+    for i, row in rows:
+        s1 = sentences1[i]
+        for j, similarity, stage in sentence_matcher.combine_exact(exact.get(i, ()), row, top_k):
+            s2 = sentences2[j]
+            counts[stage] += 1
+            yield {
+                "sentence1": s1["sentence"],
+                "sentence2": s2["sentence"],
+                "para1": s1["paragraph_index"],
+                "para2": s2["paragraph_index"],
+                "similarity": round(similarity, 3),
+                "stage": stage
+            }
+
+    if stats is not None:
+        total_pairs = len(texts1) * len(texts2)
+        fuzzy_pairs_count = len(unique1) * len(unique2)
+        stats.update({
+            "exact_matches": counts["exact"],
+            "fuzzy_matches": counts["fuzzy"],
+            "exact_seconds": round(exact_seconds, 3),
+            "fuzzy_seconds": round(time.perf_counter() - start - exact_seconds, 3),
+            "pairs_total": total_pairs,
+            "pairs_fuzzy": fuzzy_pairs_count,
+            "pairs_saved": total_pairs - fuzzy_pairs_count
+        })
+        if reuse_stats is not None:
+            stats["reuse"] = reuse_stats
 
 def export_to_excel(file1, file2, matches, output_path):
-    """将匹配结果输出为 Excel 报告"""
+    """将匹配结果输出为 Excel 报告（只写模式流式写入，matches 可以是生成器），返回匹配数"""
+    count, _ = report_writer.write_reports(file1, file2, matches, output_path, formats=("xlsx",))
+    return count
+
+
+# 比较模式：fuzzy 为全量模糊匹配，align 为按顺序对齐的修订比较
+MODES = ("fuzzy", "align")
+
+ALIGN_OP_LABELS = {"unchanged": "未变更", "modified": "修改", "inserted": "新增", "deleted": "删除"}
+ALIGN_OP_FILLS = {
+    "modified": PatternFill("solid", fgColor="FFF2CC"),
+    "inserted": PatternFill("solid", fgColor="E2EFDA"),
+    "deleted": PatternFill("solid", fgColor="FCE4D6"),
+}
+
+
+def export_alignment_to_excel(file1, file2, rows, stats, output_path):
+    """将顺序对齐比较结果输出为 Excel 报告（修订对比 + 统计两个工作表）"""
     wb = openpyxl.Workbook()
     ws = wb.active
-    ws.title = "匹配报告"
+    ws.title = "修订对比"
 
-    # Add headers
-    ws['A1'] = 'Comparison Report'
+    ws['A1'] = 'Revision Report'
     ws['A2'] = '文档 1:'
     ws['B2'] = file1
     ws['A3'] = '文档 2:'
@@ -120,49 +242,150 @@ def export_to_excel(file1, file2, matches, output_path):
     ws['A4'] = '状态:'
     ws['B4'] = '比较成功完成！'
 
-    headers = ["序号", "匹配句子1","匹配句子2", "文档1段落", "文档2段落", "相似度"]
-    # ws.append(headers)
-    ws['A6'] = '序号'
-    ws['B6'] = '文档1句子'
-    ws['C6'] = '文档2句子'
-    ws['D6'] = '文档1段落'
-    ws['E6'] = '文档2段落'
-    ws['F6'] = '相似度'
-
-    # 设置表头加粗
-    for col in range(1, len(headers) + 1):
-        ws.cell(row=6, column=col).font = Font(bold=True)
+    headers = ["序号", "类型", "文档1段落", "文档2段落", "文档1内容", "文档2内容", "相似度"]
+    for col, header in enumerate(headers, start=1):
+        ws.cell(row=6, column=col, value=header).font = Font(bold=True)
 
-    for i, match in enumerate(matches, start=1):
+    for i, row in enumerate(rows, start=1):
         ws.append([
-            i+7,
-            match["sentence1"],
-            match["sentence2"],
-            match["para1"],
-            match["para2"],
-            match["similarity"]
+            i,
+            ALIGN_OP_LABELS[row["op"]],
+            row["para1"],
+            row["para2"],
+            row["text1"],
+            row["text2"],
+            row["similarity"]
         ])
+        fill = ALIGN_OP_FILLS.get(row["op"])
+        if fill is not None:
+            for col in range(1, len(headers) + 1):
+                ws.cell(row=ws.max_row, column=col).fill = fill
+
+    summary = wb.create_sheet("统计")
+    summary.append(["项目", "数量"])
+    for cell in summary[1]:
+        cell.font = Font(bold=True)
+    for op in doc_alignment.OPS:
+        summary.append([ALIGN_OP_LABELS[op], stats.get(op, 0)])
+    summary.append(["文档1段落数", stats.get("paragraphs1", 0)])
+    summary.append(["文档2段落数", stats.get("paragraphs2", 0)])
+    summary.append(["对齐的段落数", stats.get("paragraphs_aligned", 0)])
+    summary.append(["句子级实际比较的句子对", stats.get("sentence_pairs_compared", 0)])
+    summary.append(["全量比较所需的句子对", stats.get("sentence_pairs_total", 0)])
 
     wb.save(output_path)
 
 
-def main(file1, file2, output_excel="比较报告.xlsx", similarity_threshold=0.9):
+def check_top_k(top_k):
+    """top_k 为 None（不限）或正整数，否则抛出 ValueError"""
+    if top_k is not None and top_k < 1:
+        raise ValueError(f"top_k 必须为正整数: {top_k}")
+
+
+def main(file1, file2, output_excel="比较报告.xlsx", similarity_threshold=0.9, workers=1,
+         backend="sequence", metric="cosine", rescore=True, sentence_cache=None,
+         segmenter=sentence_segmenter.DEFAULT_SEGMENTER, exact_first=True, stats=None, mode="fuzzy",
+         reuse_store=None, top_k=None, formats=("xlsx",), memory_limit_mb=None):
+    check_top_k(top_k)
     if not os.path.exists(file1) or not os.path.exists(file2):
         print("请确保两个文件都存在。")
         return False
+    if mode not in MODES:
+        raise ValueError(f"未知的比较模式: {mode}")
+
+    stats = stats if stats is not None else {}
+    if memory_limit_mb is not None and mode == "fuzzy":
+        return _main_streaming(file1, file2, output_excel, similarity_threshold, segmenter, exact_first,
+                               stats, top_k, formats, memory_limit_mb, backend)
+    sents1 = load_sentences(file1, sentence_cache, segmenter, stats)
+    sents2 = load_sentences(file2, sentence_cache, segmenter, stats)
 
-    sents1 = read_docx_sentences_with_paragraph_index(file1)
-    sents2 = read_docx_sentences_with_paragraph_index(file2)
-    matches = fuzzy_match_sentences(sents1, sents2, threshold=similarity_threshold)
+    if mode == "align":
+        rows = doc_alignment.align_documents(sents1, sents2, threshold=similarity_threshold, stats=stats)
+        export_alignment_to_excel(file1, file2, rows, stats, output_excel)
+        print(f"对齐比较完成！修改 {stats['modified']}，新增 {stats['inserted']}，删除 {stats['deleted']}。"
+              f"报告已生成：{output_excel}")
+        return True
+    # 匹配结果直接流入报告写出器，不在内存中汇总
+    matches = iter_match_sentences(sents1, sents2, threshold=similarity_threshold, workers=workers,
+                                   backend=backend, metric=metric, rescore=rescore,
+                                   exact_first=exact_first, stats=stats, reuse_store=reuse_store, top_k=top_k)
 
-    export_to_excel(file1, file2, matches, output_excel)
-    print(f"比较完成！共找到 {len(matches)} 个相似句子。报告已生成：{output_excel}")
+    count, paths = report_writer.write_reports(file1, file2, matches, output_excel, formats=formats)
+    print(f"比较完成！共找到 {count} 个相似句子。报告已生成：{'、'.join(paths.values())}")
+    if exact_first:
+        print(f"精确匹配 {stats['exact_matches']} 对（{stats['exact_seconds']}s），"
+              f"模糊匹配 {stats['fuzzy_matches']} 对（{stats['fuzzy_seconds']}s），"
+              f"少比较 {stats['pairs_saved']}/{stats['pairs_total']} 个句子对")
+    if "reuse" in stats:
+        print(f"复用历史结果 {stats['reuse']['pairs_reused']}/{stats['pairs_total']} 个句子对")
+    return True
+
+def _main_streaming(file1, file2, output_excel, similarity_threshold, segmenter, exact_first,
+                    stats, top_k, formats, memory_limit_mb, backend):
+    # 有内存上限时：文档流式读取、索引超限转存磁盘、结果逐条写出；只支持单进程 sequence 后端
+    if backend != "sequence":
+        raise ValueError(f"内存受限模式只支持 sequence 后端: {backend}")
+
+    def open_sentences1():
+        return iter_docx_sentences(file1, segmenter=segmenter)
+
+    matches = streaming_compare.iter_streaming_matches(
+        open_sentences1, iter_docx_sentences(file2, segmenter=segmenter), threshold=similarity_threshold,
+        top_k=top_k, exact_first=exact_first, memory_limit=memory_limit_mb * 1024 * 1024, stats=stats,
+        tmp_dir=os.path.dirname(os.path.abspath(output_excel))
+    )
+    count, paths = report_writer.write_reports(file1, file2, matches, output_excel, formats=formats)
+    print(f"比较完成！共找到 {count} 个相似句子。报告已生成：{'、'.join(paths.values())}")
+    if stats["index_spilled"]:
+        print(f"文档2索引超过 {memory_limit_mb}MB，已转存到临时文件")
     return True
 
 # 命令行支持
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 3:
-        print("用法：python compare_fuzzy.py 文件1.docx 文件2.docx")
-    else:
-        main(sys.argv[1], sys.argv[2])
+    import argparse
+
+    def positive_int(value):
+        try:
+            check_top_k(int(value))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"需要正整数: {value}")
+        return int(value)
+
+    parser = argparse.ArgumentParser(description="模糊比较两个Word文档中的相似句子")
+    parser.add_argument("file1", nargs="?", help="文档1 (.docx)")
+    parser.add_argument("file2", nargs="?", help="文档2 (.docx)")
+    parser.add_argument("output", nargs="?", default="比较报告.xlsx", help="输出的Excel报告")
+    parser.add_argument("--threshold", type=float, default=0.9, help="相似度阈值")
+    parser.add_argument("--workers", type=int, default=1, help="并行比较的进程数")
+    parser.add_argument("--backend", choices=BACKENDS, default="sequence", help="打分后端")
+    parser.add_argument("--metric", choices=shingle_scoring.METRICS, default="cosine", help="shingle 后端的相似度指标")
+    parser.add_argument("--no-rescore", action="store_true", help="shingle 后端不再用 SequenceMatcher 重新打分")
+    parser.add_argument("--segmenter", choices=list(sentence_segmenter.SEGMENTERS),
+                        default=sentence_segmenter.DEFAULT_SEGMENTER, help="分句器")
+    parser.add_argument("--no-exact", action="store_true", help="不做精确匹配，所有句子都进行模糊匹配")
+    parser.add_argument("--mode", choices=MODES, default="fuzzy", help="fuzzy：全量模糊匹配；align：按顺序对齐的修订比较")
+    parser.add_argument("--top-k", type=positive_int, default=None, help="每个文档1句子最多保留的匹配数")
+    parser.add_argument("--formats", default="xlsx",
+                        help=f"报告格式，逗号分隔（可选：{','.join(report_writer.FORMATS)}）")
+    parser.add_argument("--memory-limit-mb", type=int, default=None,
+                        help="内存上限（MB）：流式比较，文档2索引超过上限时转存到临时文件")
+    parser.add_argument("--batch", nargs="+", metavar="FILE",
+                        help="批量模式：列出的全部文档（或包含 .docx 的 zip）两两比较，输出一个汇总工作簿")
+    parser.add_argument("--batch-output", default="批量比较报告.xlsx", help="批量模式的汇总工作簿")
+    args = parser.parse_args()
+    if args.batch:
+        import tempfile
+        import batch_compare
+        with tempfile.TemporaryDirectory() as extract_dir:
+            batch_compare.main(batch_compare.expand_inputs(args.batch, extract_dir), args.batch_output,
+                               similarity_threshold=args.threshold, workers=args.workers, segmenter=args.segmenter,
+                               exact_first=not args.no_exact, top_k=args.top_k)
+        raise SystemExit(0)
+    if not args.file1 or not args.file2:
+        parser.error("需要 file1 和 file2（或使用 --batch）")
+    main(args.file1, args.file2, args.output, similarity_threshold=args.threshold, workers=args.workers,
+         backend=args.backend, metric=args.metric, rescore=not args.no_rescore, segmenter=args.segmenter,
+         exact_first=not args.no_exact, mode=args.mode, top_k=args.top_k,
+         formats=tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip()),
+         memory_limit_mb=args.memory_limit_mb)
@@ -1,7 +1,11 @@
 import os
 import sys
+import threading
 from typing import List, Dict, Any, Optional
 from database import Database
+from sentence_cache import SentenceCache, file_sha256
+from incremental_compare import ParagraphResultStore, settings_key
+from corpus_index import CorpusIndex
 
 # Handle conditional import for static analysis tools
 try:
@@ -15,16 +19,66 @@ except ImportError:
 class DocCompare:
     def __init__(self):
         self.db = Database()
+        # Number of processes used to score sentence pairs (1 = single process)
+        self.workers = int(os.getenv("DOC_COMPARE_WORKERS", "1"))
+        # On-disk cache of parsed sentences keyed by file content hash
+        self.sentence_cache = SentenceCache(
+            os.getenv("SENTENCE_CACHE_DIR", "results/sentence_cache"),
+            max_bytes=int(os.getenv("SENTENCE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            version=doc_checker.PARSER_VERSION if HAS_DOC_CHECKER and doc_checker is not None else ""
+        )
+        # Peak-memory ceiling (MB) for the streaming pipeline; unset = load documents fully
+        memory_limit = os.getenv("DOC_COMPARE_MEMORY_LIMIT_MB")
+        self.memory_limit_mb = int(memory_limit) if memory_limit else None
+        # Similarity index over every saved document, used to search the upload history
+        self.corpus_index = CorpusIndex(os.getenv("CORPUS_INDEX_PATH", "results/corpus_index.sqlite"))
+        # Statistics of the most recent compare() call, kept per thread so that
+        # concurrent background jobs sharing this instance do not overwrite each other
+        self._local = threading.local()
+
+    @property
+    def last_stats(self) -> Dict[str, Any]:
+        return getattr(self._local, "stats", {})
+
+    @last_stats.setter
+    def last_stats(self, stats: Dict[str, Any]):
+        self._local.stats = stats
     
-    def compare(self, file1_path: str, file2_path: str, result_path: str) -> bool:
+    def compare(self, file1_path: str, file2_path: str, result_path: str, workers: Optional[int] = None,
+                backend: str = "sequence", metric: str = "cosine", use_cache: bool = True,
+                segmenter: str = "cjk", mode: str = "fuzzy", comparison_id: Optional[str] = None,
+                incremental: bool = True, threshold: float = 0.9, top_k: Optional[int] = None,
+                memory_limit_mb: Optional[int] = None) -> bool:
         """
         Compare two documents and save result to result_path
         Returns True if successful, False otherwise
+        Cache hit/miss counts for this call are available in self.last_stats
+        With a comparison_id, per-paragraph match results are stored under it and
+        results of earlier comparisons are reused (reuse counts in self.last_stats["reuse"])
+        With a memory limit, fuzzy comparisons stream both documents and spill the index to disk
+        instead (no sentence cache or result reuse)
         """
+        self.last_stats = {}
         try:
             if HAS_DOC_CHECKER and doc_checker is not None:
                 # Use the actual doc_checker module
-                result = doc_checker.main(file1_path, file2_path, result_path)
+                reuse_store = None
+                if memory_limit_mb is None:
+                    memory_limit_mb = self.memory_limit_mb
+                if incremental and comparison_id and mode == "fuzzy" and memory_limit_mb is None:
+                    # Only results computed with identical scoring settings can be reused
+                    settings = settings_key(threshold=threshold, backend=backend, metric=metric, segmenter=segmenter,
+                                            parser=doc_checker.PARSER_VERSION)
+                    reuse_store = ParagraphResultStore(self.db, comparison_id, settings)
+                result = doc_checker.main(file1_path, file2_path, result_path, similarity_threshold=threshold,
+                                          workers=workers if workers is not None else self.workers,
+                                          backend=backend, metric=metric,
+                                          sentence_cache=self.sentence_cache if use_cache else None,
+                                          segmenter=segmenter, stats=self.last_stats, mode=mode,
+                                          reuse_store=reuse_store, top_k=top_k, memory_limit_mb=memory_limit_mb)
+                # Counted per call by load_sentences (the cache's own counters are shared by concurrent jobs)
+                self.last_stats.setdefault("cache_hits", 0)
+                self.last_stats.setdefault("cache_misses", 0)
                 return result is not None  # Assuming main returns something on success
             else:
                 # Simulate document comparison for development
@@ -34,6 +88,35 @@ class DocCompare:
             print(f"Error during document comparison: {e}")
             return False
     
+    def compare_batch(self, file_paths: List[str], result_path: str, workers: Optional[int] = None,
+                      threshold: float = 0.9, top_k: Optional[int] = None, use_cache: bool = True,
+                      extract_dir: Optional[str] = None, names: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Compare every pair of documents and save one summary workbook to result_path
+        (similarity matrix, pair list and one detail sheet per pair)
+        Zip archives among file_paths are expanded into extract_dir (default: next to result_path)
+        names maps file paths to the names shown in the workbook (default: file basename)
+        """
+        self.last_stats = {}
+        if not HAS_DOC_CHECKER or doc_checker is None:
+            return False
+        try:
+            import batch_compare
+            file_paths = batch_compare.expand_inputs(file_paths, extract_dir or os.path.dirname(result_path) or ".")
+            return batch_compare.main(file_paths, result_path, similarity_threshold=threshold,
+                                      workers=workers if workers is not None else self.workers,
+                                      sentence_cache=self.sentence_cache if use_cache else None,
+                                      top_k=top_k, stats=self.last_stats, names=names)
+        except Exception as e:
+            print(f"Error during batch comparison: {e}")
+            return False
+
+    def start_converter(self) -> Dict[str, Any]:
+        """Start the LibreOffice processes that convert .doc uploads, so the first upload does not wait for them"""
+        if not HAS_DOC_CHECKER or doc_checker is None:
+            return {}
+        return doc_checker.doc_convert.get_pool().warm_up()
+
     def _simulate_comparison(self, file1_path: str, file2_path: str, result_path: str):
         """Simulate document comparison by creating a sample Excel file"""
         # In a real implementation, this would be replaced with actual comparison logic
@@ -49,8 +132,24 @@ class DocCompare:
         os.rename(result_path.replace('.xlsx', '.txt'), result_path)
     
     def save_record(self, comparison_id: str, file1_path: str, file2_path: str, result_path: str, user_id: Optional[str] = None):
-        """Save comparison record to database"""
+        """Save comparison record to database and add both documents to the corpus index"""
         self.db.save_doc_comparison(comparison_id, file1_path, file2_path, result_path, user_id or "")
+        if HAS_DOC_CHECKER and doc_checker is not None:
+            for file_path in (file1_path, file2_path):
+                try:
+                    sentences = doc_checker.load_sentences(file_path, self.sentence_cache)
+                    self.corpus_index.add_document(file_path, sentences, comparison_id=comparison_id)
+                except Exception as e:
+                    print(f"Warning: failed to index {file_path}: {e}")
+
+    def find_similar(self, file_path: str, threshold: float = 0.8, limit: int = 10,
+                     content_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the past documents sharing the most similar sentences with file_path"""
+        if not HAS_DOC_CHECKER or doc_checker is None:
+            return []
+        sentences = doc_checker.load_sentences(file_path, self.sentence_cache)
+        return self.corpus_index.query(sentences, threshold=threshold, limit=limit,
+                                       exclude_hash=content_hash or file_sha256(file_path))
     
     def get_history(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get document comparison history"""
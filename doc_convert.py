@@ -0,0 +1,274 @@
+"""
+旧版 .doc 文档转换为 .docx
+Warm LibreOffice conversion pool for legacy .doc uploads
+
+doc_checker 只能读取 .docx，.doc 上传文件在解析前先经过这里转换：
+- 保持少量常驻的无界面 LibreOffice 进程（每个进程独立的用户配置目录和 UNO 端口），
+  转换请求排队分配给空闲进程，避免每个文件都启动一次 LibreOffice
+- 每次转换有超时，超时或出错的进程被杀掉并重启，然后重试一次
+- 转换结果按源文件内容的 SHA-256 缓存，同一文件只转换一次
+
+需要安装 LibreOffice；未安装 python3-uno 时退回每次调用 soffice --convert-to
+（仍按进程槽位排队，并复用各槽位已初始化的用户配置目录）。
+这种情况下没有常驻进程：每个文件都会启动一次 soffice，预热（warm_up）只创建槽位。
+
+环境变量：SOFFICE_PATH、DOC_CONVERT_WORKERS、DOC_CONVERT_TIMEOUT、DOC_CONVERT_CACHE_DIR
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+from sentence_cache import file_sha256
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    HAS_UNO = True
+except ImportError:
+    uno = None
+    PropertyValue = None
+    HAS_UNO = False
+
+# LibreOffice 导出 .docx 使用的过滤器
+DOCX_FILTER = "MS Word 2007 XML"
+
+# 常驻进程启动后等待 UNO 端口就绪的最长时间（秒）
+STARTUP_TIMEOUT = 30
+
+CONVERTIBLE_EXTENSIONS = (".doc",)
+
+
+class ConversionError(Exception):
+    pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class LibreOfficeWorker:
+    """一个常驻的无界面 LibreOffice 进程（或未安装 UNO 时的一个转换槽位）"""
+
+    def __init__(self, soffice="soffice", work_dir=None):
+        self.soffice = soffice
+        self.work_dir = tempfile.mkdtemp(prefix="lo_worker_", dir=work_dir)
+        self.profile_url = "file://" + os.path.join(self.work_dir, "profile").replace(os.sep, "/")
+        self.process = None
+        self.desktop = None
+        self.port = None
+
+    def start(self):
+        if not HAS_UNO:
+            return
+        self.port = _free_port()
+        self.process = subprocess.Popen(
+            [self.soffice, f"-env:UserInstallation={self.profile_url}", "--headless", "--invisible",
+             "--nologo", "--norestore", "--nodefault",
+             f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError("LibreOffice 启动失败")
+                time.sleep(0.2)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.desktop = None
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def convert(self, src, dst, timeout):
+        """将 src 转换为 .docx 写到 dst；超时抛出 ConversionError（调用方负责重启）"""
+        if not HAS_UNO:
+            self._convert_subprocess(src, dst, timeout)
+            return
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        result = {}
+        thread = threading.Thread(target=self._convert_uno, args=(src, dst, result), daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            raise ConversionError(f"转换超时（{timeout}s）：{src}")
+        if "error" in result:
+            raise ConversionError(f"转换失败：{src}：{result['error']}")
+
+    def _convert_uno(self, src, dst, result):
+        try:
+            document = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(src)), "_blank", 0, (_property("Hidden", True),))
+            if document is None:
+                raise ConversionError("无法打开文档")
+            try:
+                document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(dst)),
+                                    (_property("FilterName", DOCX_FILTER),))
+            finally:
+                document.close(True)
+        except Exception as e:
+            result["error"] = e
+
+    def _convert_subprocess(self, src, dst, timeout):
+        out_dir = os.path.join(self.work_dir, "out")
+        os.makedirs(out_dir, exist_ok=True)
+        try:
+            subprocess.run(
+                [self.soffice, f"-env:UserInstallation={self.profile_url}", "--headless", "--norestore",
+                 "--convert-to", f"docx:{DOCX_FILTER}", "--outdir", out_dir, os.path.abspath(src)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout, check=True
+            )
+        except subprocess.TimeoutExpired:
+            raise ConversionError(f"转换超时（{timeout}s）：{src}")
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise ConversionError(f"转换失败：{src}：{e}")
+        converted = os.path.join(out_dir, os.path.splitext(os.path.basename(src))[0] + ".docx")
+        if not os.path.exists(converted):
+            raise ConversionError(f"转换失败：{src}：未生成输出文件")
+        shutil.move(converted, dst)
+
+
+class ConversionPool:
+    def __init__(self, size: int = 2, timeout: float = 60, cache_dir: str = "results/converted",
+                 soffice: str = "soffice"):
+        self.size = size
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.soffice = soffice
+        self.idle = queue.Queue()
+        self.workers = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.restarts = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def warm_up(self):
+        """启动全部 size 个常驻进程，第一个 .doc 上传不用等待 LibreOffice 启动（应用启动时调用）"""
+        started = []
+        with self._lock:
+            while len(self.workers) < self.size:
+                worker = LibreOfficeWorker(self.soffice, work_dir=self.cache_dir)
+                self.workers.append(worker)
+                started.append(worker)
+        for worker in started:
+            try:
+                worker.start()
+            except ConversionError as e:
+                # 启动失败的进程在第一次转换时重新启动
+                print(f"Warning: {e}")
+            finally:
+                self.idle.put(worker)
+        return self.stats()
+
+    def _acquire(self):
+        # 进程按需启动，最多 size 个；都在忙时排队等待
+        with self._lock:
+            if self.idle.empty() and len(self.workers) < self.size:
+                worker = LibreOfficeWorker(self.soffice, work_dir=self.cache_dir)
+                self.workers.append(worker)
+                return worker
+        return self.idle.get()
+
+    def convert(self, file_path: str) -> str:
+        """
+        返回 file_path 对应的 .docx 路径（缓存命中时直接返回）
+
+        Args:
+            file_path (str): .doc 文件路径
+
+        Returns:
+            str: 缓存目录中的 .docx 路径
+        """
+        target = os.path.join(self.cache_dir, f"{file_sha256(file_path)}.docx")
+        if os.path.exists(target):
+            self.hits += 1
+            return target
+        self.misses += 1
+
+        worker = self._acquire()
+        tmp_path = f"{target}.{id(worker)}.tmp"
+        try:
+            for attempt in range(2):
+                try:
+                    worker.convert(file_path, tmp_path, self.timeout)
+                    break
+                except ConversionError:
+                    # 卡住或出错的进程被杀掉，下次转换时重新启动，重试一次
+                    self.restarts += 1
+                    worker.stop()
+                    if attempt == 1:
+                        raise
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.idle.put(worker)
+        return target
+
+    def close(self):
+        with self._lock:
+            for worker in self.workers:
+                worker.close()
+            self.workers = []
+            self.idle = queue.Queue()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "restarts": self.restarts, "workers": len(self.workers)}
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """返回进程内共享的转换池（按环境变量配置，首次使用时创建）"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConversionPool(
+                size=int(os.getenv("DOC_CONVERT_WORKERS", "2")),
+                timeout=float(os.getenv("DOC_CONVERT_TIMEOUT", "60")),
+                cache_dir=os.getenv("DOC_CONVERT_CACHE_DIR", "results/converted"),
+                soffice=os.getenv("SOFFICE_PATH", "soffice")
+            )
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+
+def ensure_docx(file_path, pool=None):
+    """.doc 文件转换为 .docx 后返回新路径，其他文件原样返回"""
+    if not file_path.lower().endswith(CONVERTIBLE_EXTENSIONS):
+        return file_path
+    return (pool or get_pool()).convert(file_path)
@@ -0,0 +1,154 @@
+"""
+流式 DOCX 文本提取
+Streaming DOCX text extractor that bypasses the python-docx object model
+
+直接从 zip 中读取 word/document.xml，用 iterparse 增量解析，
+每处理完一个正文段落就释放对应的 XML 节点，内存占用与文档大小基本无关。
+默认输出与 python-docx 的 [p.text for p in Document(path).paragraphs] 一致。
+
+基准测试：
+    python docx_stream.py 文档.docx
+"""
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W = "{" + W_NS + "}"
+
+_BODY = _W + "body"
+_P = _W + "p"
+_R = _W + "r"
+_TBL = _W + "tbl"
+_HYPERLINK = _W + "hyperlink"
+_T = _W + "t"
+_TAB = _W + "tab"
+_PTAB = _W + "ptab"
+_BR = _W + "br"
+_CR = _W + "cr"
+_NO_BREAK_HYPHEN = _W + "noBreakHyphen"
+_TYPE = _W + "type"
+
+_HEADER_FOOTER_RE = re.compile(r"^word/(header|footer)\d*\.xml$")
+
+
+def _run_text(run):
+    # 与 python-docx 的 CT_R.text 保持一致
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _T:
+            parts.append(child.text or "")
+        elif tag == _TAB or tag == _PTAB:
+            parts.append("\t")
+        elif tag == _BR:
+            if child.get(_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _CR:
+            parts.append("\n")
+        elif tag == _NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def paragraph_text(p):
+    """返回 w:p 元素的文本（只包含直接子 run 和超链接中的 run，同 python-docx）"""
+    parts = []
+    for child in p:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == _R)
+    return "".join(parts)
+
+
+def _iter_body(stream, include_tables):
+    body = None
+    depth = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if elem.tag == _BODY and depth == 2:
+                body = elem
+            continue
+        depth -= 1
+        # 只处理 w:body 的直接子元素（depth 2 为 body，子元素结束后 depth 回到 2）
+        if body is None or depth != 2:
+            continue
+        if elem.tag == _P:
+            yield paragraph_text(elem)
+        elif elem.tag == _TBL and include_tables:
+            for p in elem.iter(_P):
+                yield paragraph_text(p)
+        # 已处理的节点不再需要，释放内存
+        body.clear()
+
+
+def _iter_part(stream):
+    for p in ET.parse(stream).getroot().iter(_P):
+        yield paragraph_text(p)
+
+
+def iter_paragraphs(file_path, include_tables=False, include_headers_footers=False):
+    """
+    逐段生成 DOCX 文档的段落文本
+
+    Args:
+        file_path (str): .docx 文件路径
+        include_tables (bool): 是否包含表格单元格中的段落（按文档顺序穿插在正文中）
+        include_headers_footers (bool): 是否在正文之后附加页眉和页脚的段落
+
+    Yields:
+        str: 段落文本
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        with zf.open("word/document.xml") as stream:
+            yield from _iter_body(stream, include_tables)
+        if include_headers_footers:
+            for name in sorted(n for n in zf.namelist() if _HEADER_FOOTER_RE.match(n)):
+                with zf.open(name) as stream:
+                    yield from _iter_part(stream)
+
+
+def iter_paragraphs_python_docx(file_path):
+    """原有的 python-docx 提取路径，仅用于基准对比"""
+    from docx import Document
+    for para in Document(file_path).paragraphs:
+        yield para.text
+
+
+def benchmark(file_path, repeat=3):
+    """对比两种提取方式的耗时和峰值内存，并检查输出是否一致"""
+    import time
+    import tracemalloc
+
+    results = {}
+    outputs = {}
+    for name, extract in (("python-docx", iter_paragraphs_python_docx), ("stream", iter_paragraphs)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = list(extract(file_path))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        # tracemalloc 只统计 Python 层分配，python-docx 依赖的 lxml 内存不在其中，实际差距更大
+        tracemalloc.start()
+        for _ in extract(file_path):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = (best, peak)
+
+    for name, (elapsed, peak) in results.items():
+        print(f"{name:12s} 耗时 {elapsed * 1000:9.1f} ms  峰值内存 {peak / 1024 / 1024:8.1f} MB")
+    print(f"段落数: {len(outputs['stream'])}，输出一致: {outputs['stream'] == outputs['python-docx']}")
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("用法：python docx_stream.py 文档.docx")
+    else:
+        benchmark(sys.argv[1])
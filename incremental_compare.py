@@ -0,0 +1,170 @@
+"""
+增量比较：复用以往比较中已算过的段落对结果
+Incremental re-comparison for DocCompare
+
+模糊匹配是逐句对独立打分的，因此两个段落之间的匹配结果只取决于这两个段落的内容。
+每次比较后按 (文档1段落哈希, 文档2段落哈希) 保存该段落对内的句子匹配（句内偏移 + 相似度），
+并记录两侧出现过的全部段落哈希，关联到 doc_comparisons 的记录 ID。
+
+新的比较会在相同设置的历史比较中找出共享段落最多的一次：
+两侧段落都出现过的段落对直接复用（没有保存结果即表示没有匹配），
+只有变化的段落才与另一文档重新打分。
+
+段落哈希取自原始句子文本（不做规范化）：打分基于原始文本，只在规范化后相同的段落不能共用结果。
+每种设置保留最近 RETAINED_COMPARISONS 次比较的结果（查找时只考察最近 PRIOR_CANDIDATES 次，
+多保留的部分使同时运行的比较清理旧结果时不会删掉正在被读取的候选）；
+读取候选的段落哈希和结果在同一个快照中进行，候选已被删除时改用下一个。
+保存的句子匹配超过 MAX_STORED_MATCHES 条时本次结果不保存（匹配过多的文档复用价值低，且会占用大量存储）。
+"""
+
+import hashlib
+import json
+import os
+
+import doc_alignment
+
+# 查找可复用的历史比较时考察的最近记录数
+PRIOR_CANDIDATES = 20
+# 每种设置保留的比较数
+RETAINED_COMPARISONS = 2 * PRIOR_CANDIDATES
+# 单次比较最多保存的句子匹配数
+MAX_STORED_MATCHES = int(os.getenv("REUSE_MAX_STORED_MATCHES", "200000"))
+
+
+def settings_key(**settings):
+    """影响逐句打分结果的设置（阈值、后端、分句器等）的摘要，只有设置相同的结果才能复用"""
+    text = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def paragraph_hash(sentences):
+    """段落内容哈希：原始句子逐行拼接再取 BLAKE2b（16 字节），与 doc_alignment.paragraph_hash 的规范化哈希区分"""
+    text = "\n".join(sentences)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16, person=b"raw-paragraph").hexdigest()
+
+
+def paragraph_layout(sentences_info):
+    """
+    返回段落哈希列表，以及每个句子所属的段落序号和段内偏移
+
+    Returns:
+        tuple: (hashes, [(段落序号, 段内偏移)] 与 sentences_info 一一对应)
+    """
+    hashes = []
+    positions = []
+    for paragraph_number, (_, sentences) in enumerate(doc_alignment.group_paragraphs(sentences_info)):
+        hashes.append(paragraph_hash(sentences))
+        positions.extend((paragraph_number, offset) for offset in range(len(sentences)))
+    return hashes, positions
+
+
+class ParagraphResultStore:
+    """把段落对结果保存在数据库中，并关联到某次比较"""
+
+    def __init__(self, db, comparison_id: str, settings: str):
+        self.db = db
+        self.comparison_id = comparison_id
+        self.settings = settings
+
+    def find_prior(self, hashes1, hashes2):
+        """返回与当前两侧段落重合最多的历史比较 {"hashes1", "hashes2", "results"}，没有则返回 None"""
+        set1, set2 = set(hashes1), set(hashes2)
+        candidates = []
+        for record in self.db.get_paragraph_hash_sets(self.settings, PRIOR_CANDIDATES):
+            overlap = (len(set1 & set(record["paragraph_hashes1"].split()))
+                       + len(set2 & set(record["paragraph_hashes2"].split())))
+            if overlap:
+                candidates.append((overlap, len(candidates), record["comparison_id"]))
+        for _, _, comparison_id in sorted(candidates, key=lambda c: (-c[0], c[1])):
+            # 哈希和结果重新从同一快照读取：列出候选之后被其他比较清理掉的记录读不到，跳过
+            record = self.db.get_paragraph_results(comparison_id)
+            if not record:
+                continue
+            results = {}
+            for row in record["results"]:
+                results[(row["para_hash1"], row["para_hash2"])] = json.loads(row["matches"])
+            return {"comparison_id": comparison_id, "hashes1": set(record["paragraph_hashes1"].split()),
+                    "hashes2": set(record["paragraph_hashes2"].split()), "results": results}
+        return None
+
+    def save(self, hashes1, hashes2, results):
+        """保存本次结果并清理同设置下更早的比较；匹配数超过 MAX_STORED_MATCHES 时不保存，返回是否已保存"""
+        if sum(len(matches) for matches in results.values()) > MAX_STORED_MATCHES:
+            return False
+        self.db.save_paragraph_results(
+            self.comparison_id, self.settings, " ".join(hashes1), " ".join(hashes2),
+            [(h1, h2, json.dumps(matches)) for (h1, h2), matches in results.items()]
+        )
+        self.db.delete_old_paragraph_results(self.settings, RETAINED_COMPARISONS)
+        return True
+
+
+def match_with_reuse(sentences1, sentences2, score_pairs, store):
+    """
+    全量逐句模糊匹配，能复用的段落对直接取历史结果
+
+    Args:
+        sentences1 (list): 文档1句子列表
+        sentences2 (list): 文档2句子列表
+        score_pairs (callable): score_pairs(texts1, texts2) 生成 (i, j, similarity)
+        store (ParagraphResultStore): 段落对结果存储
+
+    Returns:
+        tuple: (按 (i, j) 排序的全部 (i, j, similarity), 复用统计)
+    """
+    hashes1, positions1 = paragraph_layout(sentences1)
+    hashes2, positions2 = paragraph_layout(sentences2)
+    prior = store.find_prior(hashes1, hashes2)
+    known1 = prior["hashes1"] if prior else set()
+    known2 = prior["hashes2"] if prior else set()
+
+    reused1 = [i for i, (p, _) in enumerate(positions1) if hashes1[p] in known1]
+    reused2 = [j for j, (p, _) in enumerate(positions2) if hashes2[p] in known2]
+    changed1 = [i for i, (p, _) in enumerate(positions1) if hashes1[p] not in known1]
+    changed2 = [j for j, (p, _) in enumerate(positions2) if hashes2[p] not in known2]
+
+    pairs = []
+    if prior:
+        # 段落哈希 -> 段落首句的全局下标（同一内容的段落可能出现多次）
+        starts1, starts2 = {}, {}
+        for i, (p, offset) in enumerate(positions1):
+            if offset == 0:
+                starts1.setdefault(hashes1[p], []).append(i)
+        for j, (p, offset) in enumerate(positions2):
+            if offset == 0:
+                starts2.setdefault(hashes2[p], []).append(j)
+        for (h1, h2), matches in prior["results"].items():
+            for start1 in starts1.get(h1, ()):
+                for start2 in starts2.get(h2, ()):
+                    pairs.extend((start1 + k1, start2 + k2, similarity) for k1, k2, similarity in matches)
+
+    texts1 = [s["sentence"] for s in sentences1]
+    texts2 = [s["sentence"] for s in sentences2]
+    # 变化的文档1段落与整个文档2比较；未变化的文档1段落只需与变化的文档2段落比较
+    for rows, cols in ((changed1, list(range(len(texts2)))), (reused1, changed2)):
+        if rows and cols:
+            pairs.extend((rows[i], cols[j], similarity)
+                         for i, j, similarity in score_pairs([texts1[i] for i in rows], [texts2[j] for j in cols]))
+    pairs.sort(key=lambda pair: (pair[0], pair[1]))
+
+    results = {}
+    for i, j, similarity in pairs:
+        p1, k1 = positions1[i]
+        p2, k2 = positions2[j]
+        results.setdefault((hashes1[p1], hashes2[p2]), []).append((k1, k2, similarity))
+    # 同一段落对可能在文档中重复出现，只保留一份
+    results = {key: sorted(set(map(tuple, matches))) for key, matches in results.items()}
+    stored = store.save(hashes1, hashes2, results)
+
+    total = len(sentences1) * len(sentences2)
+    reused = len(reused1) * len(reused2)
+    stats = {
+        "reused_from": prior["comparison_id"] if prior else None,
+        "paragraphs_reused": sum(1 for h in hashes1 if h in known1) + sum(1 for h in hashes2 if h in known2),
+        "paragraphs_total": len(hashes1) + len(hashes2),
+        "pairs_reused": reused,
+        "pairs_rescored": total - reused,
+        "reuse_ratio": round(reused / total, 3) if total else 0.0,
+        "stored": stored
+    }
+    return pairs, stats
@@ -0,0 +1,107 @@
+"""
+后台任务队列
+Background job queue for long-running comparisons and transcriptions
+
+提交接口立即返回任务 ID，实际工作在有上限的线程池中执行（每类任务一个池），
+页面轮询状态接口获取进度和结果。任务状态：queued -> running -> done / failed。
+已结束的任务保留 JOB_RETENTION_SECONDS 秒后清理（只保存在内存中，服务重启后丢失）。
+
+任务在线程池中运行，请求处理不必等待任务结束。转录在 Whisper 进程中进行；比较只有在
+DOC_COMPARE_WORKERS > 1 且句子对数不少于 sentence_matcher.PARALLEL_MIN_PAIRS 时才在子进程中打分，
+否则 SequenceMatcher 就在池线程中运行并持有 GIL，与事件循环争用同一个 CPU 核心
+（页面和接口仍能响应，但比较进行期间会变慢）。
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+STATUSES = ("queued", "running", "done", "failed")
+
+# 已结束任务的保留时间（秒）
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+
+class JobQueue:
+    def __init__(self, pools: Dict[str, int]):
+        """
+        Args:
+            pools (dict): 任务类型 -> 并发数，例如 {"compare": 2, "transcribe": 1}
+        """
+        self.executors = {kind: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"job-{kind}")
+                          for kind, size in pools.items()}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[..., Optional[Dict[str, Any]]], *args, **kwargs) -> str:
+        """
+        提交任务，立即返回任务 ID
+
+        func 返回结果字典表示成功；返回 None 或抛出异常表示失败
+        （结果字典中的 "error" 作为失败原因）。
+        """
+        if kind not in self.executors:
+            raise ValueError(f"未知的任务类型: {kind}")
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._prune()
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+        self.executors[kind].submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            return
+        if result is None or "error" in result:
+            error = result.get("error") if result else "任务失败"
+            self._update(job_id, status="failed", error=error, finished_at=time.time())
+        else:
+            self._update(job_id, status="done", result=result, finished_at=time.time())
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job["finished_at"] is not None and job["finished_at"] < cutoff]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """返回任务状态的副本，不存在（或已清理）时返回 None"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            status = dict(job)
+            if status["status"] == "queued":
+                # 同类任务中排在它前面的数量
+                status["position"] = sum(1 for other in self.jobs.values()
+                                         if other["kind"] == job["kind"] and other["status"] == "queued"
+                                         and other["created_at"] < job["created_at"])
+            return status
+
+    def shutdown(self, wait: bool = True):
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
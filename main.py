@@ -1,15 +1,21 @@
-from fastapi import FastAPI, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi import FastAPI, Request, Form, UploadFile, File, HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
 import os
 from datetime import datetime
 import uuid
+import hashlib
+import shutil
 
 # Import our modules
 from doc_compare import DocCompare
 from meeting_transcribe import MeetingTranscribe
+from job_queue import JobQueue
+from upload_store import UploadStore, UploadSessionError, OffsetMismatch, DEFAULT_ROOT as UPLOAD_STORE_ROOT
 
 app = FastAPI()
 
@@ -26,6 +32,167 @@ templates = Jinja2Templates(directory="templates")
 # Initialize our services
 doc_compare_service = DocCompare()
 meeting_service = MeetingTranscribe()
+# Long-running work runs on bounded background pools; submit endpoints return a job ID
+job_queue = JobQueue({
+    "compare": int(os.getenv("COMPARE_JOB_WORKERS", "2")),
+    "transcribe": int(os.getenv("TRANSCRIBE_JOB_WORKERS", "1")),
+    "maintenance": 1
+})
+# Uploaded files are stored once per content hash; records reference the stored blob
+upload_store = UploadStore(doc_compare_service.db, os.getenv("UPLOAD_STORE_DIR", UPLOAD_STORE_ROOT))
+
+@app.on_event("startup")
+async def collect_upload_garbage():
+    # Apply the upload retention policy once per start (also: python upload_store.py gc)
+    job_queue.submit("maintenance", upload_store.gc,
+                     int(os.getenv("UPLOAD_RETENTION_DAYS", "90")), int(os.getenv("UPLOAD_GC_GRACE_HOURS", "24")))
+
+@app.on_event("startup")
+async def start_transcription_worker():
+    # Load the Whisper model once, before the first transcription job arrives
+    job_queue.submit("maintenance", meeting_service.start_worker)
+
+@app.on_event("startup")
+async def start_document_converter():
+    # Start the LibreOffice processes for .doc uploads, before the first comparison arrives
+    job_queue.submit("maintenance", doc_compare_service.start_converter)
+
+# Uploads are copied in fixed-size chunks so large recordings never sit in memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Per-type upload size limits in MB (override with UPLOAD_LIMIT_<TYPE>_MB)
+UPLOAD_LIMITS_MB = {
+    "document": int(os.getenv("UPLOAD_LIMIT_DOCUMENT_MB", "100")),
+    "archive": int(os.getenv("UPLOAD_LIMIT_ARCHIVE_MB", "1024")),
+    "audio": int(os.getenv("UPLOAD_LIMIT_AUDIO_MB", "2048")),
+    "video": int(os.getenv("UPLOAD_LIMIT_VIDEO_MB", "8192")),
+}
+
+UPLOAD_TYPES = {
+    ".doc": "document", ".docx": "document",
+    ".zip": "archive",
+    ".mp3": "audio", ".wav": "audio", ".m4a": "audio",
+    ".mp4": "video",
+}
+
+# Raw chunks of a resumable upload are read into memory; cap their size
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_MB", "16")) * 1024 * 1024
+
+def upload_limit(filename: Optional[str], size: Optional[int] = None):
+    """
+    Return (upload type, size limit in bytes) for a filename;
+    raises HTTP 415 for unsupported types and 413 when a declared size exceeds the limit
+    """
+    upload_type = UPLOAD_TYPES.get(os.path.splitext(filename or "")[1].lower())
+    if upload_type is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {filename}")
+    limit = UPLOAD_LIMITS_MB[upload_type] * 1024 * 1024
+    if size is not None and size > limit:
+        raise HTTPException(status_code=413,
+                            detail=f"{filename} exceeds the {UPLOAD_LIMITS_MB[upload_type]} MB limit")
+    return upload_type, limit
+
+async def save_upload(upload: UploadFile, owner_type: str, owner_id: Optional[str]):
+    """
+    Copy an uploaded file into the upload store in chunks on a worker thread
+    and record it (original filename) under the owning comparison/transcription
+    Returns (stored file path, sha256 hex digest, size in bytes);
+    raises HTTP 413/415 for oversized or unsupported files
+    """
+    upload_type, limit = upload_limit(upload.filename)
+
+    def copy():
+        tmp_path = upload_store.temp_path()
+        digest = hashlib.sha256()
+        size = 0
+        upload.file.seek(0)
+        with open(tmp_path, "wb") as buffer:
+            for chunk in iter(lambda: upload.file.read(UPLOAD_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > limit:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+        if size > limit:
+            os.remove(tmp_path)
+            raise HTTPException(status_code=413,
+                                detail=f"{upload.filename} exceeds the {UPLOAD_LIMITS_MB[upload_type]} MB limit")
+        content_hash = digest.hexdigest()
+        file_path = upload_store.commit(tmp_path, content_hash, size, upload.filename)
+        if owner_id:
+            upload_store.add_reference(file_path, upload.filename, owner_type, owner_id)
+        return file_path, content_hash, size
+
+    return await run_in_threadpool(copy)
+
+async def resolve_upload(upload: Optional[UploadFile], content_hash: Optional[str], filename: Optional[str],
+                         owner_type: str, owner_id: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Stored path and SHA-256 of a file attached to a job: either uploaded with the request, or sent
+    earlier through /uploads (the form then carries only its SHA-256 and original filename)
+    Returns (None, None) when neither is given; raises HTTP 404 if the content is not stored
+    """
+    if upload is not None and upload.filename:
+        file_path, content_hash, _ = await save_upload(upload, owner_type, owner_id)
+        return file_path, content_hash
+    if not content_hash:
+        return None, None
+    upload_limit(filename)
+
+    def reference():
+        file_path = upload_store.find(content_hash.lower(), os.path.splitext(filename)[1])
+        if file_path is None:
+            raise HTTPException(status_code=404, detail=f"{filename} has not been uploaded")
+        upload_store.add_reference(file_path, filename, owner_type, owner_id)
+        return file_path, content_hash.lower()
+
+    return await run_in_threadpool(reference)
+
+@app.post("/uploads/check")
+async def check_upload(sha256: str = Form(...), filename: str = Form(...), size: int = Form(...)):
+    # Hash-first handshake: the page hashes the file before sending it.
+    # Content the server already stores is not transferred again; otherwise a
+    # resumable upload session is opened (or resumed) for it.
+    upload_limit(filename, size)
+    extension = os.path.splitext(filename)[1]
+    if await run_in_threadpool(upload_store.find, sha256.lower(), extension):
+        return {"exists": True}
+    try:
+        session_id = upload_store.start_session(sha256.lower(), extension)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"exists": False, "upload_url": f"/uploads/{session_id}",
+            "offset": upload_store.session_offset(session_id)}
+
+@app.get("/uploads/{session_id}")
+async def upload_status(session_id: str):
+    # Bytes received so far, for resuming after a dropped connection
+    try:
+        offset = upload_store.session_offset(session_id)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if offset is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return {"offset": offset}
+
+@app.put("/uploads/{session_id}")
+async def upload_chunk(session_id: str, request: Request, offset: int, size: int):
+    # Append one chunk (raw request body) at offset; the last chunk verifies the hash and stores the file
+    upload_limit(session_id, size)
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > UPLOAD_MAX_CHUNK_SIZE:
+            raise HTTPException(status_code=413, detail="Chunk too large")
+    try:
+        received, file_path = await run_in_threadpool(upload_store.append_chunk, session_id, offset,
+                                                      bytes(data), size)
+    except OffsetMismatch as e:
+        # Tell the client where to continue (e.g. a chunk was resent after a timeout)
+        return JSONResponse(status_code=409, content={"detail": str(e), "offset": e.offset})
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"offset": received, "complete": file_path is not None}
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -47,40 +214,123 @@ async def login_page(request: Request):
 async def doc_compare_page(request: Request):
     # Get history records for current user
     history_records = doc_compare_service.get_history()  # Placeholder
+    names = upload_store.original_names(record["id"] for record in history_records)
+    for record in history_records:
+        record["file1_name"] = upload_store.display_name(names, record["id"], record["file1_path"])
+        record["file2_name"] = upload_store.display_name(names, record["id"], record["file2_path"])
     
     return templates.TemplateResponse("doc_compare.html", {
         "request": request,
         "history_records": history_records
     })
 
+def check_top_k(top_k: Optional[int]):
+    """Reject a match limit below 1 (None means unlimited)"""
+    if top_k is not None and top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be a positive integer")
+
 @app.post("/docchk/compare")
 async def compare_documents(
-    file1: UploadFile = File(...),
-    file2: UploadFile = File(...)
+    file1: UploadFile = File(None),
+    file2: UploadFile = File(None),
+    file1_sha256: Optional[str] = Form(None),
+    file1_name: Optional[str] = Form(None),
+    file2_sha256: Optional[str] = Form(None),
+    file2_name: Optional[str] = Form(None),
+    backend: str = Form("sequence"),
+    metric: str = Form("cosine"),
+    mode: str = Form("fuzzy"),
+    top_k: Optional[int] = Form(None)
 ):
+    check_top_k(top_k)
     # Generate unique IDs for this comparison
     comparison_id = str(uuid.uuid4())
     
-    # Save uploaded files
-    file1_path = f"uploads/{comparison_id}_{file1.filename}"
-    file2_path = f"uploads/{comparison_id}_{file2.filename}"
+    # Save uploaded files (or reference files already sent through /uploads)
+    file1_path, _ = await resolve_upload(file1, file1_sha256, file1_name, "comparison", comparison_id)
+    file2_path, _ = await resolve_upload(file2, file2_sha256, file2_name, "comparison", comparison_id)
+    if not file1_path or not file2_path:
+        raise HTTPException(status_code=400, detail="Two documents are required")
     
-    with open(file1_path, "wb") as buffer:
-        buffer.write(await file1.read())
-        
-    with open(file2_path, "wb") as buffer:
-        buffer.write(await file2.read())
-    
-    # Perform document comparison
+    # Perform document comparison in the background
+    job_id = job_queue.submit("compare", run_compare_job, comparison_id, file1_path, file2_path,
+                              backend, metric, mode, top_k)
+    return {"success": True, "job_id": job_id, "status_url": f"/jobs/{job_id}"}
+
+def run_compare_job(comparison_id, file1_path, file2_path, backend, metric, mode, top_k):
     result_path = f"results/{comparison_id}_result.xlsx"
-    success = doc_compare_service.compare(file1_path, file2_path, result_path)
+    success = doc_compare_service.compare(file1_path, file2_path, result_path,
+                                          backend=backend, metric=metric, mode=mode,
+                                          comparison_id=comparison_id, top_k=top_k)
     
     if success:
         # Save record to database
         doc_compare_service.save_record(comparison_id, file1_path, file2_path, result_path)
-        return {"success": True, "download_url": f"/download/{comparison_id}"}
+        return {"download_url": f"/download/{comparison_id}", "stats": doc_compare_service.last_stats}
+    else:
+        return {"error": "Comparison failed"}
+
+@app.post("/docchk/batch")
+async def compare_documents_batch(
+    files: List[UploadFile] = File(...),
+    threshold: float = Form(0.9),
+    top_k: Optional[int] = Form(None)
+):
+    check_top_k(top_k)
+    # Compare every pair of the uploaded documents (.docx files or zip archives of them)
+    batch_id = str(uuid.uuid4())
+
+    paths = []
+    names = {}
+    for file in files:
+        file_path, _, _ = await save_upload(file, "batch", batch_id)
+        paths.append(file_path)
+        names[file_path] = os.path.basename(file.filename)
+
+    job_id = job_queue.submit("compare", run_batch_job, batch_id, paths, names, threshold, top_k)
+    return {"success": True, "job_id": job_id, "status_url": f"/jobs/{job_id}"}
+
+def run_batch_job(batch_id, paths, names, threshold, top_k):
+    result_path = f"results/{batch_id}_batch.xlsx"
+    # Documents extracted from zip archives are scratch files, removed after the comparison
+    extract_dir = f"uploads/batch_{batch_id}"
+    os.makedirs(extract_dir, exist_ok=True)
+    try:
+        success = doc_compare_service.compare_batch(paths, result_path, threshold=threshold, top_k=top_k,
+                                                    extract_dir=extract_dir, names=names)
+    finally:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+
+    if success:
+        return {"download_url": f"/download/batch/{batch_id}", "stats": doc_compare_service.last_stats}
+    else:
+        return {"error": "Batch comparison failed"}
+
+@app.get("/download/batch/{batch_id}")
+async def download_batch_result(batch_id: str):
+    result_path = f"results/{batch_id}_batch.xlsx"
+    if os.path.exists(result_path):
+        return FileResponse(result_path, filename=f"batch_comparison_{batch_id}.xlsx")
     else:
-        return {"success": False, "error": "Comparison failed"}
+        return {"error": "File not found"}
+
+@app.post("/docchk/similar")
+async def find_similar_documents(
+    file: UploadFile = File(...),
+    threshold: float = Form(0.8),
+    limit: int = Form(10)
+):
+    # Search every previously saved document for sentences reused by this upload
+    # (query uploads are not referenced by any record; the store's GC removes them)
+    file_path, content_hash, _ = await save_upload(file, "query", None)
+
+    try:
+        # Parsing and corpus lookup are blocking; keep them off the event loop
+        documents = await run_in_threadpool(doc_compare_service.find_similar, file_path, threshold=threshold,
+                                            limit=limit, content_hash=content_hash)
+        return {"success": True, "documents": documents}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
 @app.get("/download/{comparison_id}")
 async def download_result(comparison_id: str):
@@ -95,12 +345,13 @@ async def meeting_page(request: Request):
     # Get history records for current user
     history_records = meeting_service.get_history()  # Placeholder
 
-    # 将history_records的每条记录的audio_path或video_path截取第45个字符之后的字符串
+    # 显示上传时的原始文件名（存储中的文件按内容哈希命名）
+    names = upload_store.original_names(record["id"] for record in history_records)
     history_records = [
         {
             "id": record["id"],
-            "audio_path": record["audio_path"][45:] if record["audio_path"] else None,
-            "video_path": record["video_path"][45:] if record["video_path"] else None,
+            "audio_path": upload_store.display_name(names, record["id"], record["audio_path"]),
+            "video_path": upload_store.display_name(names, record["id"], record["video_path"]),
             "raw_text_path": record["raw_text_path"],
             "processed_text_path": record["processed_text_path"],
             "created_at": record["created_at"],
@@ -112,76 +363,118 @@ async def meeting_page(request: Request):
     
     return templates.TemplateResponse("meeting.html", {
         "request": request,
+        "transcription_options": meeting_service.transcription_options(),
         "history_records": history_records
     })
 
 @app.post("/meeting/transcribe")
 async def transcribe_meeting(
     audio_file: UploadFile = File(None),
-    video_file: UploadFile = File(None)
+    video_file: UploadFile = File(None),
+    audio_sha256: Optional[str] = Form(None),
+    audio_name: Optional[str] = Form(None),
+    video_sha256: Optional[str] = Form(None),
+    video_name: Optional[str] = Form(None),
+    model: Optional[str] = Form(None),
+    compute_type: Optional[str] = Form(None)
 ):
+    # Per-job Whisper model and precision; empty values use the configured defaults
+    options = meeting_service.transcription_options()
+    if model and model not in options["models"]:
+        raise HTTPException(status_code=400, detail=f"Unsupported model: {model}")
+    if compute_type and compute_type not in options["compute_types"]:
+        raise HTTPException(status_code=400, detail=f"Unsupported compute type: {compute_type}")
+
     # Generate unique ID for this transcription
     transcription_id = str(uuid.uuid4())
     
-    # Save uploaded files
-    audio_path = None
-    video_path = None
+    # Save uploaded files (or reference files already sent through /uploads)
+    audio_path, audio_hash = await resolve_upload(audio_file, audio_sha256, audio_name, "transcription",
+                                                  transcription_id)
+    video_path, video_hash = await resolve_upload(video_file, video_sha256, video_name, "transcription",
+                                                  transcription_id)
+    if not audio_path and not video_path:
+        raise HTTPException(status_code=400, detail="An audio or video file is required")
     
-    if audio_file:
-        audio_path = f"uploads/{transcription_id}_{audio_file.filename}"
-        with open(audio_path, "wb") as buffer:
-            buffer.write(await audio_file.read())
-            
-    if video_file:
-        video_path = f"uploads/{transcription_id}_{video_file.filename}"
-        with open(video_path, "wb") as buffer:
-            buffer.write(await video_file.read())
-    
-    # Perform transcription and processing
+    # Perform transcription and processing in the background (the transcribed file is the audio if both are given)
+    job_id = job_queue.submit("transcribe", run_transcribe_job, transcription_id, audio_path, video_path,
+                              model or None, compute_type or None, audio_hash if audio_path else video_hash)
+    return {"success": True, "job_id": job_id, "status_url": f"/jobs/{job_id}"}
+
+def run_transcribe_job(transcription_id, audio_path, video_path, model=None, compute_type=None, media_hash=None):
     raw_text_path = f"results/{transcription_id}_raw.txt"
     processed_text_path = f"results/{transcription_id}_processed.docx"
     
-    success = meeting_service.transcribe_and_process(
-        audio_path, video_path, raw_text_path, processed_text_path
+    outputs = meeting_service.transcribe_and_process(
+        audio_path, video_path, raw_text_path, processed_text_path, model=model, compute_type=compute_type,
+        media_hash=media_hash
     )
     
-    if success:
-        # Save record to database
-        meeting_service.save_record(transcription_id, audio_path, video_path, raw_text_path, processed_text_path)
+    if outputs:
+        # Save record to database (a cache hit points at the outputs of the earlier transcription)
+        meeting_service.save_record(transcription_id, audio_path, video_path,
+                                    outputs["raw_text_path"], outputs["processed_text_path"])
         return {
-            "success": True,
             "raw_download_url": f"/download/raw/{transcription_id}",
-            "processed_download_url": f"/download/processed/{transcription_id}"
+            "processed_download_url": f"/download/processed/{transcription_id}",
+            "cache_hit": outputs["cache_hit"]
         }
     else:
-        return {"success": False, "error": "Transcription failed"}
+        return {"error": "Transcription failed"}
+
+@app.get("/admin/transcription-worker")
+async def transcription_worker_health():
+    # Status of the persistent Whisper worker: ok / busy / stopped / unhealthy, restarts and last error
+    return await run_in_threadpool(meeting_service.worker_health)
+
+@app.get("/admin/transcription-cache")
+async def transcription_cache_stats():
+    # Hit rate of the transcription cache since start, plus stored entries and their total hits
+    return await run_in_threadpool(meeting_service.cache.stats)
+
+@app.post("/admin/transcription-cache/invalidate")
+async def invalidate_transcription_cache(
+    media_hash: Optional[str] = Form(None),
+    transcription_id: Optional[str] = Form(None),
+    all: bool = Form(False)
+):
+    # Drop cache entries for a recording (SHA-256), for the outputs of one transcription, or all of them;
+    # the output files stay in place for the records that use them
+    if transcription_id:
+        transcription_record = meeting_service.get_transcription_by_id(transcription_id)
+        if not transcription_record:
+            raise HTTPException(status_code=404, detail="Transcription not found")
+        removed = meeting_service.cache.invalidate(raw_text_path=transcription_record["raw_text_path"])
+    elif media_hash or all:
+        removed = meeting_service.cache.invalidate(media_hash=media_hash)
+    else:
+        raise HTTPException(status_code=400, detail="Specify media_hash, transcription_id or all")
+    return {"success": True, "removed": removed}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    return job
+
+def transcript_source_name(transcription_id: str, transcription_record: Dict[str, Any]) -> Optional[str]:
+    """Original filename (without extension) of the audio/video a transcription was made from"""
+    file_source = transcription_record.get("audio_path") or transcription_record.get("video_path")
+    if not file_source:
+        return None
+    names = upload_store.original_names([transcription_id])
+    return os.path.splitext(upload_store.display_name(names, transcription_id, file_source))[0]
 
 @app.get("/download/raw/{transcription_id}")
 async def download_raw_text(transcription_id: str):
-    file_path = f"results/{transcription_id}_raw.txt"
-    print(f"想下载：{file_path}")
-
-    # 从数据库查询transcription_id记录，取audio_path or video_path从45开始的字符串,去掉文件后缀，做为输出的文件名
-    # Get the transcription record from database
+    # Outputs reused from the transcription cache live under the earlier transcription's name
     transcription_record = meeting_service.get_transcription_by_id(transcription_id)
-    
-    # Extract original filename
-    original_filename = "raw_transcript.txt"  # default filename
-    if transcription_record:
-        # Get audio_path or video_path
-        audio_path = transcription_record.get("audio_path")
-        video_path = transcription_record.get("video_path")
-        
-        # Extract filename from path
-        file_source = audio_path or video_path
-        if file_source:
-            # Extract filename and remove extension
-            filename = os.path.basename(file_source)    
-            name_without_ext = os.path.splitext(filename)[0]
-            # 取name_without_ext从第45个开始的字符串
-            name_without_ext = name_without_ext[45:]
-            original_filename = f"{name_without_ext}_raw.txt"
-            print(f"ORIGINAL FILENAME:{original_filename}")
+    file_path = transcription_record.get("raw_text_path") or f"results/{transcription_id}_raw.txt"
+
+    # Name the download after the original upload
+    name = transcript_source_name(transcription_id, transcription_record)
+    original_filename = f"{name}_raw.txt" if name else "raw_transcript.txt"
 
     if os.path.exists(file_path):
         return FileResponse(file_path, filename=original_filename)
@@ -190,30 +483,26 @@ async def download_raw_text(transcription_id: str):
 
 @app.get("/download/processed/{transcription_id}")
 async def download_processed_text(transcription_id: str):
-    file_path = f"results/{transcription_id}_processed.docx"
-    
-    # Get the transcription record from database
     transcription_record = meeting_service.get_transcription_by_id(transcription_id)
+    file_path = transcription_record.get("processed_text_path") or f"results/{transcription_id}_processed.docx"
     
-    # Extract original filename
-    original_filename = "processed_transcript.docx"  # default filename
-    if transcription_record:
-        # Get audio_path or video_path
-        audio_path = transcription_record.get("audio_path")
-        video_path = transcription_record.get("video_path")
-        
-        # Extract filename from path
-        file_source = audio_path or video_path
-        if file_source:
-            # Extract filename and remove extension
-            filename = os.path.basename(file_source)
-            name_without_ext = os.path.splitext(filename)[0]
-            original_filename = f"{name_without_ext}_processed.docx"
+    # Name the download after the original upload
+    name = transcript_source_name(transcription_id, transcription_record)
+    original_filename = f"{name}_processed.docx" if name else "processed_transcript.docx"
 
     if os.path.exists(file_path):
         return FileResponse(file_path, filename=original_filename)
     else:
         return {"error": "File not found"}
 
+@app.get("/download/upload/{file_id}")
+async def download_upload(file_id: str):
+    # Serve an uploaded file from the content-addressed store under its original name
+    upload = doc_compare_service.db.get_upload_file(file_id)
+    if upload and os.path.exists(upload["blob_path"]):
+        return FileResponse(upload["blob_path"], filename=upload["original_filename"])
+    else:
+        return {"error": "File not found"}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=9092)
\ No newline at end of file
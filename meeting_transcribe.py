@@ -1,6 +1,9 @@
 import os
 from typing import List, Dict, Any, Optional
 from database import Database
+from sentence_cache import file_sha256
+from transcription_cache import TranscriptionCache
+from audio_extract import AudioStore, AudioExtractionError
 
 # Try to import the video_transcription module
 try:
@@ -14,11 +17,28 @@ except ImportError:
 class MeetingTranscribe:
     def __init__(self):
         self.db = Database()
+        self.cache = TranscriptionCache(self.db)
+        # Uploads are decoded once into cached 16 kHz mono audio that every later stage reads
+        self.audio_store = AudioStore(
+            self.db,
+            os.getenv("AUDIO_CACHE_DIR", "results/audio"),
+            max_bytes=int(os.getenv("AUDIO_CACHE_MAX_MB", "10240")) * 1024 * 1024,
+            ffmpeg=os.getenv("FFMPEG_PATH", "ffmpeg"),
+            ffprobe=os.getenv("FFPROBE_PATH", "ffprobe")
+        )
     
-    def transcribe_and_process(self, audio_path: Optional[str], video_path: Optional[str], raw_text_path: str, processed_text_path: str) -> bool:
+    def transcribe_and_process(self, audio_path: Optional[str], video_path: Optional[str], raw_text_path: str,
+                               processed_text_path: str, use_cache: bool = True, model: Optional[str] = None,
+                               compute_type: Optional[str] = None,
+                               media_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Transcribe audio/video and process the text
-        Returns True if successful, False otherwise
+        Returns {"raw_text_path", "processed_text_path", "cache_hit"} if successful, None otherwise.
+        A recording already transcribed with the same settings is not transcribed again:
+        the outputs of the earlier transcription are returned instead of the given paths.
+        model / compute_type override the configured Whisper model and precision for this job.
+        media_hash is the SHA-256 of the transcribed file when already known (e.g. from the upload store);
+        otherwise the file is hashed here.
         """
         try:
             # Use the actual video_transcription module if available
@@ -26,14 +46,74 @@ class MeetingTranscribe:
                 # Choose the available file path (audio or video)
                 input_file = audio_path or video_path
                 if input_file:
-                    result = video_transcription.process(input_file, raw_text_path, processed_text_path)
-                    return result is not None  # Assuming process returns something on success
+                    settings = video_transcription.transcription_settings(model, compute_type)
+                    media_hash = media_hash or file_sha256(input_file)
+                    if use_cache:
+                        entry = self.cache.get(media_hash, settings)
+                        if entry:
+                            return {
+                                "raw_text_path": entry["raw_text_path"],
+                                "processed_text_path": entry["processed_text_path"],
+                                "cache_hit": True
+                            }
+                    # Extract the audio once; transcription (and any retry) reads only that file,
+                    # which stays pinned in the audio cache until this job is done with it
+                    duration = None
+                    pinned = None
+                    try:
+                        audio = self.audio_store.prepare(input_file, media_hash, pin=True)
+                        input_file, duration, pinned = audio["audio_path"], audio["duration"], media_hash
+                    except AudioExtractionError as e:
+                        print(f"Warning: audio extraction failed, transcribing the upload directly: {e}")
+                    try:
+                        result = video_transcription.process(input_file, raw_text_path, processed_text_path,
+                                                             duration, model, compute_type)
+                    finally:
+                        self.audio_store.release(pinned)
+                    if result is None:
+                        return None
+                    # Only cache runs that actually produced a transcript
+                    if use_cache and os.path.exists(raw_text_path) and os.path.getsize(raw_text_path) > 0:
+                        self.cache.put(media_hash, settings, raw_text_path, processed_text_path)
+                    return {"raw_text_path": raw_text_path, "processed_text_path": processed_text_path,
+                            "cache_hit": False}
             # Simulate transcription for development
             self._simulate_transcription(audio_path or "", video_path or "", raw_text_path, processed_text_path)
-            return True
+            return {"raw_text_path": raw_text_path, "processed_text_path": processed_text_path, "cache_hit": False}
         except Exception as e:
             print(f"Error during transcription: {e}")
-            return False
+            return None
+    
+    def transcription_options(self) -> Dict[str, Any]:
+        """Models and compute types a job may choose, and the device detected at startup"""
+        if not (HAS_VIDEO_TRANSCRIPTION and video_transcription):
+            return {"models": [], "compute_types": [], "device": None}
+        return {
+            "models": video_transcription.WHISPER_MODELS,
+            "compute_types": list(video_transcription.whisper_server.COMPUTE_TYPES),
+            "device": video_transcription.WHISPER_DEVICE
+        }
+
+    def start_worker(self) -> Dict[str, Any]:
+        """Start the persistent transcription worker so the model is loaded before the first job"""
+        if not (HAS_VIDEO_TRANSCRIPTION and video_transcription):
+            return {"backend": "cli"}
+        with video_transcription.leased_server() as server:
+            if server is None:
+                return {"backend": "cli"}
+            server.start()
+            return server.health()
+
+    def worker_health(self) -> Dict[str, Any]:
+        """Health of the persistent transcription worker ({"backend": "cli"} when whisper.exe is used)"""
+        if not (HAS_VIDEO_TRANSCRIPTION and video_transcription):
+            return {"backend": "cli"}
+        backend = video_transcription.whisper_server.resolve_backend(video_transcription.WHISPER_BACKEND)
+        if backend == "cli":
+            return {"backend": "cli"}
+        # 只查询已有的进程：健康检查不能创建进程或淘汰其他设置的进程
+        server = video_transcription.peek_server()
+        return server.health() if server is not None else {"status": "stopped", "backend": backend}
     
     def _simulate_transcription(self, audio_path: str, video_path: str, raw_text_path: str, processed_text_path: str):
         """Simulate transcription by creating sample Word documents"""
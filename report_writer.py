@@ -0,0 +1,198 @@
+"""
+流式匹配报告输出
+Streaming, memory-bounded report writers for doc_checker
+
+匹配结果逐条写入，不在内存中保留完整列表或工作簿：
+- xlsx：openpyxl 只写模式（write_only），超过 Excel 单表行数上限时自动续写到新工作表
+- csv：UTF-8 BOM，Excel 可直接打开
+- parquet：按批写入，需要安装 pyarrow（可选）
+"""
+
+import csv
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pq = None
+    HAS_PYARROW = False
+
+FORMATS = ("xlsx", "csv", "parquet")
+
+# Excel 单个工作表的最大行数
+EXCEL_MAX_ROWS = 1048576
+
+HEADERS = ["序号", "文档1句子", "文档2句子", "文档1段落", "文档2段落", "相似度", "匹配方式"]
+
+# 匹配来源：exact 为规范化后完全相同（哈希连接），fuzzy 为模糊匹配
+STAGE_LABELS = {"exact": "完全相同", "fuzzy": "模糊匹配"}
+
+# parquet 每个行组缓存的行数
+PARQUET_BATCH_ROWS = 50000
+
+
+def match_row(number, match):
+    """将匹配项转换为报告中的一行"""
+    return [
+        number,
+        match["sentence1"],
+        match["sentence2"],
+        match["para1"],
+        match["para2"],
+        match["similarity"],
+        STAGE_LABELS.get(match.get("stage", "fuzzy"), "")
+    ]
+
+
+class ExcelReportWriter:
+    """只写模式的 Excel 报告，首个工作表保留原有的表头区（第1-6行）"""
+
+    def __init__(self, output_path, file1, file2, sheet_title="匹配报告", max_rows=EXCEL_MAX_ROWS):
+        self.output_path = output_path
+        self.sheet_title = sheet_title
+        self.max_rows = max_rows
+        self.wb = Workbook(write_only=True)
+        self.sheets = 0
+        self.ws = self._new_sheet()
+        self.ws.append(["Comparison Report"])
+        self.ws.append(["文档 1:", file1])
+        self.ws.append(["文档 2:", file2])
+        self.ws.append(["状态:", "比较成功完成！"])
+        self.ws.append([])
+        self._append_headers()
+        self.rows = 6
+        self.count = 0
+
+    def _new_sheet(self):
+        self.sheets += 1
+        title = self.sheet_title if self.sheets == 1 else f"{self.sheet_title} ({self.sheets})"
+        return self.wb.create_sheet(title)
+
+    def _append_headers(self):
+        cells = []
+        for header in HEADERS:
+            cell = WriteOnlyCell(self.ws, value=header)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        self.ws.append(cells)
+
+    def write(self, match):
+        if self.rows >= self.max_rows:
+            # 超过行数上限，续写到新的工作表
+            self.ws = self._new_sheet()
+            self._append_headers()
+            self.rows = 1
+        self.count += 1
+        # 序号沿用原报告的编号方式（从 8 开始）
+        self.ws.append(match_row(self.count + 7, match))
+        self.rows += 1
+
+    def close(self):
+        self.wb.save(self.output_path)
+
+
+class CsvReportWriter:
+    def __init__(self, output_path, file1, file2):
+        self.output_path = output_path
+        self.f = open(output_path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(HEADERS)
+        self.count = 0
+
+    def write(self, match):
+        self.count += 1
+        self.writer.writerow(match_row(self.count, match))
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetReportWriter:
+    SCHEMA_FIELDS = [
+        ("number", "int64"), ("sentence1", "string"), ("sentence2", "string"),
+        ("para1", "int64"), ("para2", "int64"), ("similarity", "float64"), ("stage", "string")
+    ]
+
+    def __init__(self, output_path, file1, file2, batch_rows=PARQUET_BATCH_ROWS):
+        if not HAS_PYARROW:
+            raise ImportError("输出 parquet 需要安装 pyarrow")
+        self.output_path = output_path
+        self.batch_rows = batch_rows
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in self.SCHEMA_FIELDS])
+        self.writer = pq.ParquetWriter(output_path, self.schema)
+        self.columns = {name: [] for name, _ in self.SCHEMA_FIELDS}
+        self.count = 0
+
+    def write(self, match):
+        self.count += 1
+        self.columns["number"].append(self.count)
+        self.columns["sentence1"].append(match["sentence1"])
+        self.columns["sentence2"].append(match["sentence2"])
+        self.columns["para1"].append(match["para1"])
+        self.columns["para2"].append(match["para2"])
+        self.columns["similarity"].append(match["similarity"])
+        self.columns["stage"].append(match.get("stage", "fuzzy"))
+        if len(self.columns["number"]) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self.columns["number"]:
+            self.writer.write_table(pa.table(self.columns, schema=self.schema))
+            self.columns = {name: [] for name in self.columns}
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+WRITERS = {
+    "xlsx": ExcelReportWriter,
+    "csv": CsvReportWriter,
+    "parquet": ParquetReportWriter,
+}
+
+
+def output_path_for(output_excel, fmt):
+    """由 Excel 报告路径推出其他格式的输出路径（同名，不同扩展名）"""
+    if fmt == "xlsx":
+        return output_excel
+    base = output_excel[:-5] if output_excel.lower().endswith(".xlsx") else output_excel
+    return f"{base}.{fmt}"
+
+
+def write_reports(file1, file2, matches, output_excel, formats=("xlsx",)):
+    """
+    将匹配结果流式写入一种或多种格式的报告，matches 只被遍历一次
+
+    Args:
+        file1 (str): 文档1路径
+        file2 (str): 文档2路径
+        matches (iterable): 匹配项（可以是生成器）
+        output_excel (str): Excel 报告路径，其他格式使用同名不同扩展名
+        formats (tuple): 输出格式，取值见 FORMATS
+
+    Returns:
+        tuple: (匹配数, {格式: 输出路径})
+    """
+    paths = {fmt: output_path_for(output_excel, fmt) for fmt in formats}
+    writers = []
+    try:
+        for fmt, path in paths.items():
+            if fmt not in WRITERS:
+                raise ValueError(f"未知的报告格式: {fmt}")
+            writers.append(WRITERS[fmt](path, file1, file2))
+        count = 0
+        for match in matches:
+            count += 1
+            for writer in writers:
+                writer.write(match)
+    finally:
+        for writer in writers:
+            writer.close()
+    return count, paths
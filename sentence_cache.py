@@ -0,0 +1,158 @@
+"""
+按文件内容哈希缓存解析后的句子列表
+Persistent content-hash cache of parsed sentences for uploaded documents
+
+缓存键为文件字节的 SHA-256 加上解析器版本号（分句器变化时旧条目自动失效），
+每个条目是一个紧凑的二进制文件：魔数 + zlib 压缩的 (段落编号, 句子) 序列。
+总大小超过上限时按最近访问时间（mtime）淘汰最旧的条目。
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+
+MAGIC = b"SC01"
+
+# 读取文件计算哈希时的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_COUNT = struct.Struct("<I")
+_ITEM = struct.Struct("<II")
+
+
+def file_sha256(file_path):
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_sentences(sentences_info):
+    """将 [{"sentence", "paragraph_index"}] 编码为压缩的二进制数据"""
+    parts = [_COUNT.pack(len(sentences_info))]
+    for item in sentences_info:
+        text = item["sentence"].encode("utf-8")
+        parts.append(_ITEM.pack(item["paragraph_index"], len(text)))
+        parts.append(text)
+    return MAGIC + zlib.compress(b"".join(parts))
+
+
+def decode_sentences(data):
+    """encode_sentences 的逆操作"""
+    if not data.startswith(MAGIC):
+        raise ValueError("不是有效的句子缓存数据")
+    payload = zlib.decompress(data[len(MAGIC):])
+    (count,) = _COUNT.unpack_from(payload, 0)
+    offset = _COUNT.size
+    sentences_info = []
+    for _ in range(count):
+        paragraph_index, length = _ITEM.unpack_from(payload, offset)
+        offset += _ITEM.size
+        sentences_info.append({
+            "sentence": payload[offset:offset + length].decode("utf-8"),
+            "paragraph_index": paragraph_index
+        })
+        offset += length
+    return sentences_info
+
+
+class SentenceCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024, version: str = ""):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, content_hash: str, variant: str = "") -> str:
+        # variant 区分同一文件的不同解析方式（例如分句器）
+        version_tag = hashlib.sha256(f"{self.version}/{variant}".encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{content_hash}_{version_tag}.bin")
+
+    def get(self, content_hash: str, variant: str = ""):
+        """返回缓存的句子列表，未命中返回 None"""
+        path = self._entry_path(content_hash, variant)
+        try:
+            with open(path, "rb") as f:
+                sentences_info = decode_sentences(f.read())
+            # 更新访问时间，供 LRU 淘汰使用
+            os.utime(path)
+        except (OSError, ValueError, zlib.error, struct.error):
+            return None
+        return sentences_info
+
+    def put(self, content_hash: str, sentences_info, variant: str = ""):
+        """写入缓存条目（先写临时文件再原子替换），然后按需淘汰"""
+        path = self._entry_path(content_hash, variant)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(encode_sentences(sentences_info))
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def get_or_parse(self, file_path: str, parse, variant: str = "", stats=None):
+        """
+        按文件内容查找缓存，未命中时调用 parse(file_path) 并写入缓存
+
+        Args:
+            file_path (str): 文档路径
+            parse (callable): 解析函数，返回句子列表
+            variant (str): 解析方式标识，不同取值互不共享缓存
+            stats (dict): 可选，累加本次调用的 cache_hits / cache_misses
+                （hits / misses 是所有调用共享的累计值，并发比较时不能用差值计算单次的命中数）
+
+        Returns:
+            list: 句子列表
+        """
+        content_hash = file_sha256(file_path)
+        sentences_info = self.get(content_hash, variant)
+        key = "cache_hits" if sentences_info is not None else "cache_misses"
+        if stats is not None:
+            stats[key] = stats.get(key, 0) + 1
+        if sentences_info is not None:
+            self.hits += 1
+            return sentences_info
+        self.misses += 1
+        sentences_info = parse(file_path)
+        try:
+            self.put(content_hash, sentences_info, variant)
+        except OSError as e:
+            print(f"Warning: failed to write sentence cache: {e}")
+        return sentences_info
+
+    def evict(self):
+        """总大小超过 max_bytes 时删除最久未访问的条目"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".bin"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        """返回累计的命中/未命中次数"""
+        return {"hits": self.hits, "misses": self.misses}
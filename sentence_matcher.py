@@ -0,0 +1,346 @@
+"""
+候选剪枝的模糊句子匹配引擎
+Candidate-pruned fuzzy sentence matching for doc_checker
+
+只依赖标准库，结果与逐对调用 difflib.SequenceMatcher(None, s1, s2).ratio() 完全一致：
+1. 长度窗口：ratio <= 2*min(la, lb)/(la+lb)，按长度排序后二分得到候选区间
+2. 字符二元组倒排索引：ratio >= t 时两句至少共享 (1.5t-1)(la+lb)-1 个二元组
+3. quick_ratio 上界过滤
+4. 只对剩余候选计算完整的 ratio()
+"""
+
+import bisect
+import difflib
+import heapq
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# 倒排索引使用的字符 n-gram 长度（二元组给出的下界最紧）
+NGRAM_SIZE = 2
+
+# 浮点比较的保守余量，只会放宽剪枝条件，不会误删候选
+_EPS = 1e-9
+
+
+def ngram_counts(text, n=NGRAM_SIZE):
+    """返回字符串的字符 n-gram 计数"""
+    return Counter(text[k:k + n] for k in range(len(text) - n + 1))
+
+
+def length_window(length, threshold):
+    """返回能与给定长度的句子达到阈值的另一句长度范围 (lo, hi)"""
+    lo = length * threshold / (2 - threshold) - _EPS
+    hi = length * (2 - threshold) / threshold + _EPS
+    return lo, hi
+
+
+def required_shared_ngrams(total_length, threshold):
+    """
+    返回 ratio >= threshold 时两句必须共享的二元组数量下界
+
+    SequenceMatcher 的匹配块互不相交且有序，相邻块之间至少有一个未匹配字符，
+    因此块数 k <= T - 2M + 1，块内共享二元组数 >= M - k >= 3M - T - 1，
+    再代入 M >= t*T/2 即得。
+    """
+    return (1.5 * threshold - 1) * total_length - 1 - _EPS
+
+
+class SentenceIndex:
+    """文档2句子的长度排序表和二元组倒排索引，可被多次查询复用"""
+
+    def __init__(self, texts, threshold):
+        self.texts = list(texts)
+        self.threshold = threshold
+        self.lengths = [len(t) for t in self.texts]
+        # 按长度排序的句子下标，用于二分查找长度窗口
+        self.by_length = sorted(range(len(self.texts)), key=lambda j: self.lengths[j])
+        self.sorted_lengths = [self.lengths[j] for j in self.by_length]
+        # 阈值不超过 2/3 时二元组下界恒不为正，索引没有意义
+        self.use_ngrams = threshold > 2.0 / 3.0
+        self.postings = defaultdict(list)
+        if self.use_ngrams:
+            for j, text in enumerate(self.texts):
+                for gram, count in ngram_counts(text).items():
+                    self.postings[gram].append((j, count))
+        self._matchers = {}
+
+    def matcher(self, j):
+        """返回以文档2第 j 句为 seq2 的 SequenceMatcher（缓存 b 端的分析结果）"""
+        m = self._matchers.get(j)
+        if m is None:
+            m = difflib.SequenceMatcher(None, "", self.texts[j])
+            self._matchers[j] = m
+        return m
+
+    def _window(self, length):
+        lo, hi = length_window(length, self.threshold)
+        start = bisect.bisect_left(self.sorted_lengths, lo)
+        end = bisect.bisect_right(self.sorted_lengths, hi)
+        return start, end
+
+    def candidates(self, text):
+        """返回可能达到阈值的文档2句子下标（升序）"""
+        la = len(text)
+        if self.threshold <= 0:
+            return range(len(self.texts))
+
+        start, end = self._window(la)
+        if not self.use_ngrams:
+            return sorted(self.by_length[start:end])
+
+        shared = defaultdict(int)
+        for gram, count in ngram_counts(text).items():
+            for j, count2 in self.postings.get(gram, ()):
+                shared[j] += count if count < count2 else count2
+
+        lo_len = self.sorted_lengths[start] if start < end else 0
+        hi_len = self.sorted_lengths[end - 1] if start < end else -1
+        result = []
+        for j, n in shared.items():
+            lb = self.lengths[j]
+            if lo_len <= lb <= hi_len and n >= required_shared_ngrams(la + lb, self.threshold):
+                result.append(j)
+
+        # 总长度很短时下界不为正，即使没有共享二元组也可能达到阈值
+        seen = set(result)
+        for pos in range(start, end):
+            lb = self.sorted_lengths[pos]
+            if required_shared_ngrams(la + lb, self.threshold) > 0:
+                break
+            j = self.by_length[pos]
+            if j not in seen:
+                result.append(j)
+        result.sort()
+        return result
+
+
+def iter_matches(texts1, texts2, threshold=0.9, index=None, top_k=None):
+    """
+    按 (i, j) 顺序生成相似度不低于阈值的句子对
+
+    Args:
+        texts1 (list): 文档1句子文本
+        texts2 (list): 文档2句子文本
+        threshold (float): 相似度阈值
+        index (SentenceIndex): 可选，预先为 texts2 建好的索引
+        top_k (int): 可选，每个文档1句子只保留相似度最高的 k 个匹配（相同时取 j 较小者）
+
+    Yields:
+        tuple: (i, j, similarity)，similarity 为未取整的 ratio()
+    """
+    if index is None:
+        index = SentenceIndex(texts2, threshold)
+    for i, s1 in enumerate(texts1):
+        for j, similarity in match_sentence(index, s1, threshold, top_k):
+            yield i, j, similarity
+
+
+def match_sentence(index, s1, threshold, top_k=None, exclude=None):
+    """
+    返回一个文档1句子在索引中的全部匹配
+
+    Args:
+        index (SentenceIndex): 文档2索引
+        s1 (str): 文档1句子
+        threshold (float): 相似度阈值
+        top_k (int): 可选，只保留前 k 个
+        exclude (set): 可选，不参与比较的文档2句子下标
+
+    Returns:
+        list: [(j, similarity)]，j 升序
+    """
+    candidates = index.candidates(s1)
+    if exclude:
+        candidates = [j for j in candidates if j not in exclude]
+    if top_k is not None:
+        return _top_k_for_sentence(index, s1, candidates, threshold, top_k)
+    result = []
+    for j in candidates:
+        m = index.matcher(j)
+        m.set_seq1(s1)
+        if m.real_quick_ratio() < threshold or m.quick_ratio() < threshold:
+            continue
+        similarity = m.ratio()
+        if similarity >= threshold:
+            result.append((j, similarity))
+    return result
+
+
+def _top_k_for_sentence(index, s1, candidates, threshold, k):
+    # 按长度上界从高到低检查候选，用大小为 k 的最小堆保存当前最好的 (similarity, -j)；
+    # 上界低于堆顶（第 k 好的相似度）时，其后的候选都不可能进入前 k，直接结束
+    la = len(s1)
+    bounds = []
+    for j in candidates:
+        lb = index.lengths[j]
+        bounds.append((-2.0 * min(la, lb) / (la + lb), j))
+    bounds.sort()
+
+    heap = []
+    for neg_bound, j in bounds:
+        floor = heap[0][0] if len(heap) == k else threshold
+        if -neg_bound < floor:
+            break
+        m = index.matcher(j)
+        m.set_seq1(s1)
+        if m.quick_ratio() < floor:
+            continue
+        similarity = m.ratio()
+        if similarity < threshold:
+            continue
+        item = (similarity, -j)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return sorted((-neg_j, similarity) for similarity, neg_j in heap)
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sentence(text):
+    """精确匹配前的规范化：NFKC（全角/半角统一）并合并空白"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def exact_matches(texts1, texts2):
+    """
+    按规范化文本的哈希连接两组句子，找出完全相同的句子对
+
+    Args:
+        texts1 (list): 文档1句子文本
+        texts2 (list): 文档2句子文本
+
+    Returns:
+        list: 按 (i, j) 排序的完全相同句子对
+    """
+    positions2 = {}
+    for j, text in enumerate(texts2):
+        positions2.setdefault(normalize_sentence(text), []).append(j)
+
+    pairs = []
+    for i, text in enumerate(texts1):
+        js = positions2.get(normalize_sentence(text))
+        if js:
+            pairs.extend((i, j) for j in js)
+    return pairs
+
+
+def unique_texts(texts):
+    """
+    去掉重复的句子文本（逐字相同才算重复，相似度按原文计算）
+
+    Returns:
+        tuple: (按首次出现顺序的不重复文本, 每个文本对应的原下标列表)
+    """
+    positions = {}
+    for k, text in enumerate(texts):
+        positions.setdefault(text, []).append(k)
+    return list(positions), list(positions.values())
+
+
+def iter_expanded_rows(unique_pairs, groups1, groups2):
+    """
+    把不重复文本之间的匹配展开为原句子之间的匹配
+
+    Args:
+        unique_pairs (iterable): 按 (u1, u2) 排序的 (u1, u2, similarity)
+        groups1 (list): unique_texts 返回的文档1下标分组
+        groups2 (list): unique_texts 返回的文档2下标分组
+
+    Yields:
+        tuple: (i, [(j, similarity)])，i 从 0 开始依次生成（没有匹配时为空列表），j 升序
+    """
+    owner = {}
+    for u, group in enumerate(groups1):
+        for i in group:
+            owner[i] = u
+    remaining = [len(group) for group in groups1]
+    rows = {}
+    pairs = iter(unique_pairs)
+    pending = next(pairs, None)
+    for i in range(len(owner)):
+        u = owner[i]
+        # 不重复文本按首次出现编号，处理到第 i 句时它所属文本的全部匹配都已读入
+        while pending is not None and pending[0] <= u:
+            rows.setdefault(pending[0], []).append((pending[1], pending[2]))
+            pending = next(pairs, None)
+        row = rows.get(u, [])
+        remaining[u] -= 1
+        if not remaining[u]:
+            rows.pop(u, None)
+        yield i, sorted((j, similarity) for u2, similarity in row for j in groups2[u2])
+
+
+def combine_exact(exact_js, fuzzy_row, top_k=None):
+    """
+    合并一个文档1句子的精确匹配（相似度记为 1.0）和模糊匹配
+
+    精确匹配的文档2句子同时出现在模糊结果中时只保留精确那一条；其余模糊匹配不受影响。
+    top_k 的选择与 iter_matches 相同（相似度从高到低，相同时取 j 较小者）。
+
+    Returns:
+        list: [(j, similarity, stage)]，j 升序，stage 为 "exact" 或 "fuzzy"
+    """
+    exact = set(exact_js)
+    row = [(j, 1.0, "exact") for j in exact_js]
+    row += [(j, similarity, "fuzzy") for j, similarity in fuzzy_row if j not in exact]
+    if top_k is not None:
+        row = heapq.nlargest(top_k, row, key=lambda item: (item[1], -item[0]))
+    return sorted(row)
+
+
+# 句子对数低于该值时并行启动进程池的开销大于收益，直接走单进程路径
+PARALLEL_MIN_PAIRS = 200_000
+
+# 每个工作进程持有的文档2索引，由 _init_worker 在进程启动时构建一次
+_worker_index = None
+_worker_top_k = None
+
+
+def _init_worker(texts2, threshold, top_k):
+    global _worker_index, _worker_top_k
+    _worker_index = SentenceIndex(texts2, threshold)
+    _worker_top_k = top_k
+
+
+def _match_chunk(args):
+    offset, texts1 = args
+    return [(offset + i, j, similarity)
+            for i, j, similarity in iter_matches(texts1, _worker_index.texts, _worker_index.threshold,
+                                                 index=_worker_index, top_k=_worker_top_k)]
+
+
+def iter_matches_parallel(texts1, texts2, threshold=0.9, workers=1, chunk_size=None, top_k=None):
+    """
+    多进程版本的 iter_matches，结果与单进程完全一致
+
+    文档1的句子被切成若干块分发到进程池，每个进程只为文档2建一次索引，
+    executor.map 按提交顺序返回，因此合并后仍是 (i, j) 顺序。
+    workers <= 1 或句子对数小于 PARALLEL_MIN_PAIRS 时退回单进程路径。
+
+    Args:
+        texts1 (list): 文档1句子文本
+        texts2 (list): 文档2句子文本
+        threshold (float): 相似度阈值
+        workers (int): 进程数
+        chunk_size (int): 每块的文档1句子数，默认按进程数的 4 倍切分
+        top_k (int): 可选，每个文档1句子只保留前 k 个匹配
+
+    Yields:
+        tuple: (i, j, similarity)
+    """
+    if workers <= 1 or len(texts1) * len(texts2) < PARALLEL_MIN_PAIRS:
+        yield from iter_matches(texts1, texts2, threshold, top_k=top_k)
+        return
+
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(texts1) // (workers * 4)))
+    chunks = [(start, texts1[start:start + chunk_size]) for start in range(0, len(texts1), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(list(texts2), threshold, top_k)) as executor:
+        for chunk_matches in executor.map(_match_chunk, chunks):
+            yield from chunk_matches
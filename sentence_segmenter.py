@@ -0,0 +1,62 @@
+"""
+可插拔的分句器
+Pluggable sentence segmenters for doc_checker
+
+- cjk（默认）：预编译正则，按中文句末标点 。！？；… 及英文 .!?; 分句，适用于中文和中英混排文本
+- punkt：NLTK punkt 模型，仅在选用时才导入 nltk，且从不自动下载数据
+  （离线环境请预先执行 nltk.download('punkt_tab') 并设置 NLTK_DATA）
+
+分句器是接收段落文本、返回句子列表的函数，可用 register_segmenter 注册新的实现。
+"""
+
+import re
+
+DEFAULT_SEGMENTER = "cjk"
+
+_TERMINATORS = "。！？；!?;…"
+_CLOSERS = "”’」』）)】》\"'"
+
+# 句子 = 一段文本 + 句末标点（含后随的引号/括号）；英文句点只有后面是空白或行尾时才算句末，
+# 以免拆开 3.5、www.example.com 这类写法。
+# 正文中的一串句点用 (?=(\.+))\1 整串匹配（等价于原子组，不会回退成更短的一串），正文在句末标点处
+# 停下后总有一个结尾分支匹配成功，因此匹配是线性的；"...." 这类长串不会导致回溯爆炸
+_SENTENCE_RE = re.compile(
+    rf"(?:[^{_TERMINATORS}.]|(?=(\.+))\1(?![{_CLOSERS}]*(?:\s|$)))*"
+    rf"(?:[{_TERMINATORS}]+[{_CLOSERS}]*|\.+[{_CLOSERS}]*|$)"
+)
+
+
+def split_cjk(text):
+    """按中英文句末标点和换行分句"""
+    sentences = []
+    for line in text.splitlines():
+        for match in _SENTENCE_RE.finditer(line):
+            sentence = match.group()
+            if sentence.strip():
+                sentences.append(sentence)
+    return sentences
+
+
+def split_punkt(text):
+    """使用 NLTK punkt 分句（延迟导入，不会自动下载模型）"""
+    from nltk.tokenize import sent_tokenize
+    return sent_tokenize(text)
+
+
+SEGMENTERS = {
+    "cjk": split_cjk,
+    "punkt": split_punkt,
+}
+
+
+def register_segmenter(name, func):
+    """注册自定义分句器"""
+    SEGMENTERS[name] = func
+
+
+def get_segmenter(name=DEFAULT_SEGMENTER):
+    """按名称返回分句函数"""
+    try:
+        return SEGMENTERS[name]
+    except KeyError:
+        raise ValueError(f"未知的分句器: {name}（可选：{', '.join(SEGMENTERS)}）") from None
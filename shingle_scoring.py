@@ -0,0 +1,129 @@
+"""
+基于稀疏字符 shingle 矩阵的批量相似度打分
+Vectorized batch similarity scoring for doc_checker
+
+每个句子编码为二值的字符 n-gram（shingle）稀疏向量，一块文档1句子与全部文档2句子
+的交集大小由一次稀疏矩阵乘法得到，再换算为 cosine 或 Jaccard 分数。
+分数达到阈值的候选可选择再用 difflib.SequenceMatcher 重新打分，作为报告中的相似度。
+
+依赖 numpy 和 scipy（可选），未安装时 HAS_SPARSE 为 False。
+"""
+
+import difflib
+
+try:
+    import numpy as np
+    from scipy import sparse
+    HAS_SPARSE = True
+except ImportError:
+    np = None
+    sparse = None
+    HAS_SPARSE = False
+
+from sentence_matcher import NGRAM_SIZE
+
+METRICS = ("cosine", "jaccard")
+
+# 每次矩阵乘法处理的文档1句子数，控制中间结果的内存占用
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def _shingles(text, n=NGRAM_SIZE):
+    # 比 n 短的句子整体作为一个 shingle，避免出现零向量
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[k:k + n] for k in range(len(text) - n + 1)}
+
+
+def shingle_matrix(texts, vocabulary, n=NGRAM_SIZE):
+    """
+    将句子编码为二值 CSR 矩阵（行=句子，列=shingle）
+
+    Args:
+        texts (list): 句子文本
+        vocabulary (dict): shingle -> 列号，遇到新 shingle 时就地扩充
+        n (int): shingle 长度
+
+    Returns:
+        tuple: (CSR 矩阵, 每行的 shingle 数)
+    """
+    indptr = [0]
+    indices = []
+    for text in texts:
+        for gram in _shingles(text, n):
+            indices.append(vocabulary.setdefault(gram, len(vocabulary)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+                               shape=(len(texts), max(len(vocabulary), 1)))
+    sizes = np.diff(matrix.indptr).astype(np.float64)
+    return matrix, sizes
+
+
+def _scores(intersection, size1, size2, metric):
+    if metric == "cosine":
+        return intersection / np.sqrt(size1 * size2)
+    return intersection / (size1 + size2 - intersection)
+
+
+def iter_matches_vectorized(texts1, texts2, threshold=0.9, metric="cosine", rescore=True,
+                            top_n=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    批量计算 shingle 相似度，按 (i, j) 顺序生成候选句子对
+
+    Args:
+        texts1 (list): 文档1句子文本
+        texts2 (list): 文档2句子文本
+        threshold (float): 筛选阈值（同时用于重新打分后的 ratio）
+        metric (str): "cosine" 或 "jaccard"
+        rescore (bool): 是否用 SequenceMatcher.ratio() 作为报告的相似度
+        top_n (int): 可选，每个文档1句子最多保留的候选数（按 shingle 分数）
+        block_size (int): 每次矩阵乘法的文档1句子数
+
+    Yields:
+        tuple: (i, j, similarity)
+    """
+    if not HAS_SPARSE:
+        raise ImportError("shingle 打分需要安装 numpy 和 scipy")
+    if metric not in METRICS:
+        raise ValueError(f"未知的相似度指标: {metric}")
+    if not texts1 or not texts2:
+        return
+
+    vocabulary = {}
+    matrix2, sizes2 = shingle_matrix(texts2, vocabulary)
+    matrix1, sizes1 = shingle_matrix(texts1, vocabulary)
+    # 文档1可能引入新的 shingle，对齐两边的列数
+    matrix2.resize((matrix2.shape[0], matrix1.shape[1]))
+    matrix2_t = matrix2.T.tocsc()
+
+    matchers = {}
+    for start in range(0, len(texts1), block_size):
+        block = matrix1[start:start + block_size]
+        product = (block @ matrix2_t).tocoo()
+        rows, cols = product.row, product.col
+        scores = _scores(product.data.astype(np.float64), sizes1[start + rows], sizes2[cols], metric)
+        keep = scores >= threshold
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+
+        if top_n is not None:
+            # 同一行内按分数降序，只保留前 top_n 个
+            order = np.lexsort((-scores, rows))
+            rows, cols, scores = rows[order], cols[order], scores[order]
+            rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+            keep = rank < top_n
+            rows, cols, scores = rows[keep], cols[keep], scores[keep]
+
+        order = np.lexsort((cols, rows))
+        for row, col, score in zip(rows[order].tolist(), cols[order].tolist(), scores[order].tolist()):
+            i = start + row
+            if not rescore:
+                yield i, col, score
+                continue
+            m = matchers.get(col)
+            if m is None:
+                m = matchers[col] = difflib.SequenceMatcher(None, "", texts2[col])
+            m.set_seq1(texts1[i])
+            similarity = m.ratio()
+            if similarity >= threshold:
+                yield i, col, similarity
@@ -0,0 +1,33 @@
+// Poll a background job until it finishes.
+// Resolves with the job result when done, rejects with the error message when failed.
+function pollJob(statusUrl, onStatus, intervalMs = 1500) {
+    return new Promise((resolve, reject) => {
+        function check() {
+            fetch(statusUrl)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.error && !job.status) {
+                        reject(job.error);
+                        return;
+                    }
+                    if (onStatus) onStatus(job);
+                    if (job.status === 'done') {
+                        resolve(job.result);
+                    } else if (job.status === 'failed') {
+                        reject(job.error || 'Job failed');
+                    } else {
+                        setTimeout(check, intervalMs);
+                    }
+                })
+                .catch(reject);
+        }
+        check();
+    });
+}
+
+function jobStatusText(job, runningText) {
+    if (job.status === 'queued') {
+        return job.position ? `Queued (${job.position} ahead)...` : 'Queued...';
+    }
+    return runningText;
+}
@@ -0,0 +1,159 @@
+// Hash-first, resumable uploads.
+// The file is hashed in the page first; the server skips the transfer when it already
+// has the content, otherwise the file is sent in chunks that resume after a dropped connection.
+// The resolved promise value ({sha256, name}) is sent with the job form instead of the file.
+
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
+const SHA256_K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+// Incremental SHA-256 (crypto.subtle.digest needs the whole file in memory)
+class Sha256 {
+    constructor() {
+        this.h = new Uint32Array([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+        ]);
+        this.w = new Uint32Array(64);
+        this.buffer = new Uint8Array(64);
+        this.bufferLength = 0;
+        this.bytes = 0;
+    }
+
+    update(data) {
+        let pos = 0;
+        this.bytes += data.length;
+        if (this.bufferLength > 0) {
+            pos = Math.min(64 - this.bufferLength, data.length);
+            this.buffer.set(data.subarray(0, pos), this.bufferLength);
+            this.bufferLength += pos;
+            if (this.bufferLength < 64) return;
+            this.block(this.buffer, 0);
+            this.bufferLength = 0;
+        }
+        for (; pos + 64 <= data.length; pos += 64) {
+            this.block(data, pos);
+        }
+        this.buffer.set(data.subarray(pos), 0);
+        this.bufferLength = data.length - pos;
+    }
+
+    block(data, offset) {
+        const w = this.w;
+        const H = this.h;
+        for (let t = 0; t < 16; t++) {
+            const i = offset + t * 4;
+            w[t] = (data[i] << 24) | (data[i + 1] << 16) | (data[i + 2] << 8) | data[i + 3];
+        }
+        for (let t = 16; t < 64; t++) {
+            const x = w[t - 15];
+            const y = w[t - 2];
+            const s0 = ((x >>> 7) | (x << 25)) ^ ((x >>> 18) | (x << 14)) ^ (x >>> 3);
+            const s1 = ((y >>> 17) | (y << 15)) ^ ((y >>> 19) | (y << 13)) ^ (y >>> 10);
+            w[t] = w[t - 16] + s0 + w[t - 7] + s1;
+        }
+        let a = H[0] | 0, b = H[1] | 0, c = H[2] | 0, d = H[3] | 0;
+        let e = H[4] | 0, f = H[5] | 0, g = H[6] | 0, h = H[7] | 0;
+        for (let t = 0; t < 64; t++) {
+            const S1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+            const t1 = (h + S1 + ((e & f) ^ (~e & g)) + SHA256_K[t] + w[t]) | 0;
+            const S0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+            const t2 = (S0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+            h = g; g = f; f = e; e = (d + t1) | 0;
+            d = c; c = b; b = a; a = (t1 + t2) | 0;
+        }
+        H[0] += a; H[1] += b; H[2] += c; H[3] += d;
+        H[4] += e; H[5] += f; H[6] += g; H[7] += h;
+    }
+
+    hex() {
+        const padded = new Uint8Array(this.bufferLength < 56 ? 64 : 128);
+        padded.set(this.buffer.subarray(0, this.bufferLength));
+        padded[this.bufferLength] = 0x80;
+        // Message length in bits, big-endian 64-bit
+        const view = new DataView(padded.buffer);
+        view.setUint32(padded.length - 8, Math.floor(this.bytes / 0x20000000));
+        view.setUint32(padded.length - 4, (this.bytes * 8) >>> 0);
+        for (let offset = 0; offset < padded.length; offset += 64) this.block(padded, offset);
+        return Array.from(this.h, x => x.toString(16).padStart(8, '0')).join('');
+    }
+}
+
+async function hashFile(file, onProgress) {
+    const hasher = new Sha256();
+    for (let offset = 0; offset < file.size; offset += UPLOAD_CHUNK_SIZE) {
+        const chunk = await file.slice(offset, offset + UPLOAD_CHUNK_SIZE).arrayBuffer();
+        hasher.update(new Uint8Array(chunk));
+        if (onProgress) onProgress(Math.min(offset + UPLOAD_CHUNK_SIZE, file.size) / file.size);
+    }
+    return hasher.hex();
+}
+
+async function responseError(response) {
+    const body = await response.json().catch(() => ({}));
+    return body.detail || body.error || `HTTP ${response.status}`;
+}
+
+// Send the rest of the file from the server's offset, re-querying it after failures
+async function sendChunks(file, uploadUrl, offset, onProgress) {
+    let failures = 0;
+    while (offset < file.size) {
+        if (onProgress) onProgress(offset / file.size);
+        let response;
+        try {
+            response = await fetch(`${uploadUrl}?offset=${offset}&size=${file.size}`, {
+                method: 'PUT',
+                body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE)
+            });
+        } catch (error) {
+            // Connection dropped: wait, then ask the server how much it has
+            if (++failures > UPLOAD_RETRIES) throw 'Upload interrupted: ' + error;
+            await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** failures));
+            try {
+                const status = await fetch(uploadUrl);
+                if (status.ok) offset = (await status.json()).offset;
+            } catch (ignored) {
+                // Still offline; the next attempt retries from the same offset
+            }
+            continue;
+        }
+        if (response.status === 409) {
+            offset = (await response.json()).offset;
+        } else if (response.ok) {
+            offset = (await response.json()).offset;
+            failures = 0;
+        } else {
+            throw await responseError(response);
+        }
+    }
+}
+
+// Make sure the server stores the file; resolves with {sha256, name}.
+// onStatus receives a short progress text ("Hashing 40%", "Uploading 10%").
+async function uploadFile(file, onStatus) {
+    if (file.size === 0) throw 'Empty file: ' + file.name;
+    const percent = fraction => Math.floor(fraction * 100) + '%';
+    const sha256 = await hashFile(file, p => onStatus && onStatus('Hashing ' + percent(p)));
+
+    const form = new FormData();
+    form.append('sha256', sha256);
+    form.append('filename', file.name);
+    form.append('size', file.size);
+    const response = await fetch('/uploads/check', { method: 'POST', body: form });
+    if (!response.ok) throw await responseError(response);
+    const check = await response.json();
+    if (!check.exists) {
+        await sendChunks(file, check.upload_url, check.offset,
+            p => onStatus && onStatus('Uploading ' + percent(p)));
+    }
+    return { sha256: sha256, name: file.name };
+}
@@ -0,0 +1,255 @@
+"""
+内存受限的端到端流式比较
+End-to-end generator pipeline for doc comparison with bounded peak memory
+
+DOCX 提取 -> 分句 -> 匹配 -> 报告写出全程使用生成器：
+- 文档1 从未整体载入内存，而是流式读取两遍（第一遍只收集规范化句子的 8 字节摘要供精确匹配使用）
+- 文档2 建立候选索引；估算的内存占用超过上限时，索引转存到临时 SQLite 文件中，
+  内存中只保留每句的长度数组和少量缓存
+- 匹配结果逐条交给报告写出器（report_writer）
+
+结果与 doc_checker.iter_match_sentences 的 sequence 后端完全一致（顺序相同）。
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+from array import array
+from collections import OrderedDict
+
+import sentence_matcher
+
+# 内存索引的粗略估算：每个句子的固定开销和每个二元组倒排项的开销（字节）
+_BYTES_PER_SENTENCE = 400
+_BYTES_PER_POSTING = 100
+
+# 磁盘索引在内存中缓存的句子文本和 SequenceMatcher 数量
+DISK_CACHE_SIZE = 10000
+
+# 批量写入 SQLite 的行数
+_INSERT_BATCH = 10000
+
+
+def _sentence_key(text):
+    return hashlib.blake2b(sentence_matcher.normalize_sentence(text).encode("utf-8"), digest_size=8).digest()
+
+
+def estimate_index_bytes(text):
+    """估算一个句子在内存索引中的占用"""
+    return _BYTES_PER_SENTENCE + 4 * len(text) + _BYTES_PER_POSTING * max(len(text) - 1, 0)
+
+
+class _SqliteTexts:
+    """按下标读取磁盘索引中的句子文本（带 LRU 缓存），供 SentenceIndex 的逻辑复用"""
+
+    def __init__(self, conn, count, cache_size):
+        self.conn = conn
+        self.count = count
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def __len__(self):
+        return self.count
+
+    def row(self, j):
+        row = self.cache.get(j)
+        if row is not None:
+            self.cache.move_to_end(j)
+            return row
+        row = self.conn.execute("SELECT text, para FROM sentences WHERE j = ?", (j,)).fetchone()
+        self.cache[j] = row
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return row
+
+    def __getitem__(self, j):
+        return self.row(j)[0]
+
+
+class _SqlitePostings:
+    """二元组倒排表的磁盘版本，接口同 dict.get"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get(self, gram, default=()):
+        rows = self.conn.execute("SELECT j, count FROM postings WHERE gram = ?", (gram,)).fetchall()
+        return rows or default
+
+
+class DiskSentenceIndex(sentence_matcher.SentenceIndex):
+    """
+    转存到临时 SQLite 文件的文档2索引
+
+    与 SentenceIndex 的候选剪枝逻辑相同，只是句子文本和倒排表存放在磁盘上。
+    用法：逐句 add()，全部加入后调用 finish()，使用完毕调用 close() 删除临时文件。
+    """
+
+    def __init__(self, threshold, tmp_dir=None, cache_size=DISK_CACHE_SIZE):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite", dir=tmp_dir)
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("CREATE TABLE sentences (j INTEGER PRIMARY KEY, text TEXT, para INTEGER)")
+        self.conn.execute("CREATE TABLE postings (gram TEXT, j INTEGER, count INTEGER)")
+        self.threshold = threshold
+        self.use_ngrams = threshold > 2.0 / 3.0
+        self.lengths = array("I")
+        self.cache_size = cache_size
+        self._matchers = OrderedDict()
+        self._sentence_rows = []
+        self._posting_rows = []
+
+    def add(self, text, paragraph_index):
+        j = len(self.lengths)
+        self.lengths.append(len(text))
+        self._sentence_rows.append((j, text, paragraph_index))
+        if self.use_ngrams:
+            self._posting_rows.extend((gram, j, count)
+                                      for gram, count in sentence_matcher.ngram_counts(text).items())
+        if len(self._sentence_rows) >= _INSERT_BATCH:
+            self._flush()
+
+    def _flush(self):
+        self.conn.executemany("INSERT INTO sentences VALUES (?, ?, ?)", self._sentence_rows)
+        self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", self._posting_rows)
+        self._sentence_rows = []
+        self._posting_rows = []
+
+    def finish(self):
+        self._flush()
+        self.conn.execute("CREATE INDEX idx_postings_gram ON postings (gram)")
+        self.conn.commit()
+        self.texts = _SqliteTexts(self.conn, len(self.lengths), self.cache_size)
+        self.postings = _SqlitePostings(self.conn)
+        self.by_length = array("I", sorted(range(len(self.lengths)), key=self.lengths.__getitem__))
+        self.sorted_lengths = array("I", (self.lengths[j] for j in self.by_length))
+
+    def paragraph(self, j):
+        return self.texts.row(j)[1]
+
+    def matcher(self, j):
+        m = self._matchers.get(j)
+        if m is not None:
+            self._matchers.move_to_end(j)
+            return m
+        m = super().matcher(j)
+        if len(self._matchers) > self.cache_size:
+            self._matchers.popitem(last=False)
+        return m
+
+    def close(self):
+        self.conn.close()
+        os.remove(self.path)
+
+
+class _MemoryIndex(sentence_matcher.SentenceIndex):
+    def __init__(self, rows, threshold):
+        super().__init__([text for text, _ in rows], threshold)
+        self.paragraphs = [para for _, para in rows]
+
+    def paragraph(self, j):
+        return self.paragraphs[j]
+
+    def close(self):
+        pass
+
+
+def build_index(sentences2, threshold, memory_limit, keys1=None, tmp_dir=None):
+    """
+    流式读取文档2并建立候选索引，估算占用超过 memory_limit 字节时转存到磁盘
+
+    Args:
+        sentences2 (iterable): 文档2句子（{"sentence", "paragraph_index"}）
+        threshold (float): 相似度阈值
+        memory_limit (int): 内存索引的上限（字节）
+        keys1 (set): 可选，文档1规范化句子摘要；提供时同时记录文档2中完全相同的句子
+
+    Returns:
+        tuple: (索引, 摘要 -> 文档2下标列表)
+    """
+    exact2 = {}
+    rows = []
+    estimated = 0
+    index = None
+    for j, item in enumerate(sentences2):
+        text = item["sentence"]
+        if keys1 is not None:
+            key = _sentence_key(text)
+            if key in keys1:
+                exact2.setdefault(key, []).append(j)
+        if index is not None:
+            index.add(text, item["paragraph_index"])
+            continue
+        rows.append((text, item["paragraph_index"]))
+        estimated += estimate_index_bytes(text)
+        if estimated > memory_limit:
+            index = DiskSentenceIndex(threshold, tmp_dir=tmp_dir)
+            for row in rows:
+                index.add(*row)
+            rows = []
+    if index is None:
+        return _MemoryIndex(rows, threshold), exact2
+    index.finish()
+    return index, exact2
+
+
+def iter_streaming_matches(open_sentences1, sentences2, threshold=0.9, top_k=None, exact_first=True,
+                           memory_limit=512 * 1024 * 1024, stats=None, tmp_dir=None):
+    """
+    以有界内存逐条生成匹配项，结果与 iter_match_sentences(backend="sequence") 相同
+
+    Args:
+        open_sentences1 (callable): 每次调用返回文档1句子的新生成器（需要读取两遍）
+        sentences2 (iterable): 文档2句子
+        threshold (float): 相似度阈值
+        top_k (int): 可选，每个文档1句子最多保留的匹配数
+        exact_first (bool): 是否先做精确匹配
+        memory_limit (int): 文档2内存索引的上限（字节），超过则转存到临时文件
+        stats (dict): 可选，生成结束后写入统计
+        tmp_dir (str): 临时文件目录
+
+    Yields:
+        dict: 匹配项
+    """
+    keys1 = {_sentence_key(item["sentence"]) for item in open_sentences1()} if exact_first else None
+    index, exact2 = build_index(sentences2, threshold, memory_limit, keys1, tmp_dir)
+    keys1 = None
+    counts = {"exact": 0, "fuzzy": 0}
+    # 精确匹配时，重复出现的文档1句子复用最近算过的模糊结果
+    rows = OrderedDict()
+    try:
+        for i, s1 in enumerate(open_sentences1()):
+            text = s1["sentence"]
+            js = exact2.get(_sentence_key(text), ()) if exact_first else ()
+            row = rows.get(text) if exact_first else None
+            if row is None:
+                row = sentence_matcher.match_sentence(index, text, threshold, top_k)
+                if exact_first:
+                    rows[text] = row
+                    if len(rows) > DISK_CACHE_SIZE:
+                        rows.popitem(last=False)
+            else:
+                rows.move_to_end(text)
+            for j, similarity, stage in sentence_matcher.combine_exact(js, row, top_k):
+                counts[stage] += 1
+                yield {
+                    "sentence1": text,
+                    "sentence2": index.texts[j],
+                    "para1": s1["paragraph_index"],
+                    "para2": index.paragraph(j),
+                    "similarity": round(similarity, 3),
+                    "stage": stage
+                }
+    finally:
+        spilled = isinstance(index, DiskSentenceIndex)
+        index.close()
+    if stats is not None:
+        stats.update({
+            "exact_matches": counts["exact"],
+            "fuzzy_matches": counts["fuzzy"],
+            "index_spilled": spilled,
+            "memory_limit": memory_limit
+        })
@@ -0,0 +1,99 @@
+"""
+Test script for silence-aware chunking and timestamp stitching (no ffmpeg needed)
+"""
+
+import random
+import statistics
+
+import audio_chunking
+
+
+def make_words(start, end, length=0.4, gap=0.1):
+    words = []
+    position = start
+    while position + length <= end:
+        words.append({"start": position, "end": position + length, "text": f"w{len(words)}@{position:.1f}"})
+        position += length + gap
+    return words
+
+
+class TimelineTranscriber:
+    """按真实时间轴返回块内拼接后的各段讲话中的词（跨越块边界的词在两块中都会出现）"""
+
+    def __init__(self, words):
+        self.words = words
+        self.calls = 0
+
+    def transcribe(self, chunk_path):
+        self.calls += 1
+        with open(chunk_path) as f:
+            parts = [tuple(map(float, line.split())) for line in f]
+        segments = []
+        offset = 0.0
+        for start, end in parts:
+            segments.extend({"start": offset + max(w["start"], start) - start,
+                             "end": offset + min(w["end"], end) - start, "text": w["text"]}
+                            for w in self.words if w["end"] > start and w["start"] < end)
+            offset += end - start
+        return segments
+
+
+def test_plan_skips_long_silence_and_splits_at_pauses():
+    silences = [(0.0, 5.0), (100.0, 100.8), (200.0, 260.0), (330.0, 400.0)]
+    chunks = audio_chunking.plan_chunks(silences, 400.0, target=150.0, max_length=300.0, max_gap=2.0, padding=0.2)
+    spans = [(round(c["start"], 1), round(c["end"], 1)) for c in chunks]
+    # 100s 处的短停顿切块，200-260s 和结尾的长静音被跳过
+    assert spans == [(4.8, 100.2), (100.6, 200.2), (259.8, 330.2)]
+    assert all(c["keep_start"] is None and c["keep_end"] is None and len(c["parts"]) == 1 for c in chunks)
+
+
+def test_plan_merges_across_frequent_pauses():
+    # 3 小时会议：3-20s 的发言之间是 0.6-4s 的停顿，块长应接近 target 而不是由停顿决定
+    rng = random.Random(7)
+    silences = []
+    position = 0.0
+    while position < 3 * 3600:
+        position += rng.uniform(3, 20)
+        pause = rng.uniform(0.6, 4)
+        silences.append((position, position + pause))
+        position += pause
+    chunks = audio_chunking.plan_chunks(silences, position, target=300.0, max_length=600.0)
+    lengths = [sum(end - start for start, end in c["parts"]) for c in chunks]
+    assert len(chunks) <= 3 * 3600 / 300 + 1
+    assert statistics.median(lengths) > 280 and max(lengths) <= 300
+    # 块内超过 max_gap 的停顿被去掉，其余停顿保留在片段内
+    for chunk in chunks:
+        for (_, end), (start, _) in zip(chunk["parts"], chunk["parts"][1:]):
+            assert start - end > 2.0
+    assert abs(audio_chunking.covered_seconds(chunks) - sum(lengths)) < 1e-6
+
+
+def test_stitch_maps_times_through_parts():
+    chunk = {"start": 10.0, "end": 50.0, "parts": [(10.0, 20.0), (40.0, 50.0)], "keep_start": None, "keep_end": None}
+    items = [{"start": 1.0, "end": 2.0, "text": "a"}, {"start": 9.5, "end": 10.5, "text": "b"},
+             {"start": 12.0, "end": 25.0, "text": "c"}]
+    assert audio_chunking.stitch([chunk], [items]) == [
+        {"start": 11.0, "end": 12.0, "text": "a"}, {"start": 19.5, "end": 40.5, "text": "b"},
+        {"start": 42.0, "end": 50.0, "text": "c"}]
+
+
+def test_chunked_transcription_keeps_every_word_once(tmp_path, monkeypatch):
+    # 10-700s 连续讲话（需要硬切），中间 700-760s 静音，然后两段讲话之间隔着 10s 静音（同一块的两段）
+    words = make_words(10.0, 700.0) + make_words(760.0, 800.0) + make_words(810.0, 830.0)
+    silences = [(0.0, 10.0), (700.0, 760.0), (800.0, 810.0), (830.0, 840.0)]
+    monkeypatch.setattr(audio_chunking, "detect_silences", lambda path, **kwargs: (silences, 840.0))
+
+    def fake_extract(path, parts, output_path, ffmpeg="ffmpeg"):
+        with open(output_path, "w") as f:
+            f.write("".join(f"{start} {end}\n" for start, end in parts))
+
+    monkeypatch.setattr(audio_chunking, "extract_chunk", fake_extract)
+    transcribers = [TimelineTranscriber(words) for _ in range(3)]
+    stats = {}
+    segments = audio_chunking.transcribe_chunked("meeting.mp3", transcribers, tmp_dir=str(tmp_path), stats=stats,
+                                                 target=120.0, max_length=240.0, overlap=3.0)
+
+    assert [s["text"] for s in segments] == [w["text"] for w in words]
+    assert [s["start"] for s in segments] == [round(w["start"], 3) for w in words]
+    assert stats["chunks"] == sum(t.calls for t in transcribers) > 6
+    assert stats["skipped_seconds"] > 60
@@ -0,0 +1,93 @@
+"""
+Test script for the extracted-audio cache (ffmpeg stubbed, in-memory stand-in for the database)
+"""
+
+import os
+import time
+
+import pytest
+
+import audio_extract
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.entries = {}
+
+    def save_audio_cache(self, content_hash, audio_path, duration, size, source_size):
+        self.entries[content_hash] = {"content_hash": content_hash, "audio_path": audio_path, "duration": duration,
+                                      "size": size, "source_size": source_size}
+
+    def get_audio_cache(self, content_hash):
+        return self.entries.get(content_hash)
+
+    def touch_audio_cache(self, content_hash):
+        pass
+
+    def delete_audio_cache(self, content_hash):
+        self.entries.pop(content_hash, None)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_extract(file_path, output_path, ffmpeg="ffmpeg"):
+        calls.append(file_path)
+        with open(file_path, "rb") as src, open(output_path, "wb") as dst:
+            dst.write(src.read() * 10)
+
+    monkeypatch.setattr(audio_extract, "extract_audio", fake_extract)
+    monkeypatch.setattr(audio_extract, "probe_duration", lambda path, ffprobe="ffprobe": 1.5)
+    store = audio_extract.AudioStore(MemoryDatabase(), str(tmp_path / "audio"), max_bytes=250)
+    store.calls = calls
+    return store
+
+
+def upload(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(name.encode()[:1] * size)
+    return str(path)
+
+
+def age(entry, seconds):
+    stamp = time.time() - seconds
+    os.utime(entry["audio_path"], (stamp, stamp))
+
+
+def test_hit_and_miss(store, tmp_path):
+    first = store.prepare(upload(tmp_path, "a.mp4", 10), "a" * 64)
+    assert (first["size"], first["source_size"], first["duration"]) == (100, 10, 1.5)
+    again = store.prepare(str(tmp_path / "a.mp4"), "a" * 64)
+    assert again["audio_path"] == first["audio_path"]
+    assert store.calls == [str(tmp_path / "a.mp4")]
+    assert store.stats() == {"hits": 1, "misses": 1}
+
+
+def test_eviction_skips_pinned_and_new_entries(store, tmp_path):
+    a = store.prepare(upload(tmp_path, "a.mp4", 10), "a" * 64, pin=True)
+    b = store.prepare(upload(tmp_path, "b.mp4", 10), "b" * 64)
+    age(a, 300)
+    age(b, 200)
+    # 超出上限：最旧的 a 正在被任务使用，淘汰 b
+    c = store.prepare(upload(tmp_path, "c.mp4", 10), "c" * 64)
+    assert os.path.exists(a["audio_path"]) and os.path.exists(c["audio_path"])
+    assert not os.path.exists(b["audio_path"]) and "b" * 64 not in store.db.entries
+
+    store.release("a" * 64)
+    age(c, 100)
+    # 本身超过上限的新条目保留，其他条目全部淘汰
+    big = store.prepare(upload(tmp_path, "d.mp4", 30), "d" * 64)
+    assert os.path.exists(big["audio_path"])
+    assert sorted(store.db.entries) == ["d" * 64]
+
+
+def test_failed_extraction_is_not_pinned(store, monkeypatch, tmp_path):
+    def broken(file_path, output_path, ffmpeg="ffmpeg"):
+        raise audio_extract.AudioExtractionError("no audio stream")
+
+    monkeypatch.setattr(audio_extract, "extract_audio", broken)
+    with pytest.raises(audio_extract.AudioExtractionError):
+        store.prepare(upload(tmp_path, "e.mp4", 10), "e" * 64, pin=True)
+    assert store._pins == {}
+    assert [name for name in os.listdir(store.cache_dir)] == []
@@ -0,0 +1,26 @@
+"""
+Test script for batch comparison input expansion
+"""
+
+import zipfile
+
+import batch_compare
+
+
+def test_expand_inputs_keeps_same_named_members_of_different_archives(tmp_path):
+    for archive_name, content in (("a.zip", b"first"), ("b.zip", b"second")):
+        with zipfile.ZipFile(tmp_path / archive_name, "w") as archive:
+            archive.writestr("合同.docx", content)
+            archive.writestr("sub/合同.docx", content + b"-sub")
+            archive.writestr("~$合同.docx", b"lock")
+            archive.writestr("notes.txt", b"")
+    extract_dir = tmp_path / "out"
+    extract_dir.mkdir()
+
+    files = batch_compare.expand_inputs([str(tmp_path / "a.zip"), "plain.docx", str(tmp_path / "b.zip")],
+                                        str(extract_dir))
+
+    assert files[2] == "plain.docx"
+    extracted = [open(path, "rb").read() for path in files if path != "plain.docx"]
+    assert extracted == [b"first-sub", b"first", b"second-sub", b"second"]
+    assert len(set(files)) == 5
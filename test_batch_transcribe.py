@@ -0,0 +1,53 @@
+"""
+Test script for the resumable batch transcription runner (fake backend, no model needed)
+"""
+
+import json
+
+import pytest
+
+import batch_transcribe
+import video_transcription
+import whisper_server
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.setattr(video_transcription, "WHISPER_BACKEND", "fake")
+    monkeypatch.setattr(whisper_server, "_servers", whisper_server.OrderedDict())
+    yield
+    for slots in whisper_server._servers.values():
+        for server in slots.values():
+            server.close()
+
+
+def test_batch_resumes_and_never_touches_sources(tmp_path):
+    source = tmp_path / "in"
+    (source / "sub").mkdir(parents=True)
+    files = {"a.MP4": b"aaaa", "b.mp3": b"bb", "b.Wav": b"bbb", "sub/c.mp3": b"c", "crash.mp3": b"x", "notes.txt": b""}
+    for name, data in files.items():
+        (source / name).write_bytes(data)
+    output = tmp_path / "out"
+
+    summary = batch_transcribe.run_batch(str(source), str(output), workers=2, retries=1, retry_delay=0)
+
+    assert (summary["total"], summary["done"], summary["failed"]) == (5, 4, 1)
+    # 源文件保持原名和内容；只有扩展名不同的文件保留扩展名，避免输出互相覆盖
+    assert sorted(p.relative_to(source).as_posix() for p in source.rglob("*") if p.is_file()) == sorted(files)
+    assert (output / "a.txt").read_text(encoding="utf-8") == "a.MP4 4\n"
+    assert (output / "b.Wav.txt").exists() and (output / "b.mp3.txt").exists()
+    assert (output / "sub" / "c.txt").exists()
+    manifest = json.loads((output / batch_transcribe.MANIFEST_NAME).read_text(encoding="utf-8"))["files"]
+    assert manifest["crash.mp3"]["status"] == "failed" and manifest["crash.mp3"]["attempts"] == 2
+    assert manifest["a.MP4"]["status"] == "done"
+
+    # 再次运行：已完成的文件跳过，只重试失败的文件
+    summary = batch_transcribe.run_batch(str(source), str(output), workers=2, retries=0, retry_delay=0)
+    assert (summary["skipped"], summary["done"], summary["failed"]) == (4, 0, 1)
+
+    # 源文件变化后重新转录
+    (source / "sub" / "c.mp3").write_bytes(b"cccccc")
+    (source / "crash.mp3").unlink()
+    summary = batch_transcribe.run_batch(str(source), str(output), retries=0, retry_delay=0)
+    assert (summary["skipped"], summary["done"], summary["failed"]) == (3, 1, 0)
+    assert (output / "sub" / "c.txt").read_text(encoding="utf-8") == "c.mp3 6\n"
@@ -0,0 +1,114 @@
+"""
+Test script for the MinHash-LSH index of past uploads
+"""
+
+import difflib
+import random
+import sqlite3
+
+import corpus_index
+
+POOL = "甲乙方应于日内向支付合同价款货物交付验收违约责任争议解决本协议自双签字盖章之起生效一式两份各执具有同等法律效力"
+
+
+def make_sentences(rng, count):
+    return [{"sentence": "".join(rng.choice(POOL) for _ in range(rng.randint(12, 30))) + "。", "paragraph_index": k}
+            for k in range(count)]
+
+
+def perturb(rng, text):
+    chars = list(text)
+    for _ in range(max(1, len(chars) // 10)):
+        chars[rng.randrange(len(chars) - 1)] = rng.choice(POOL)
+    return "".join(chars)
+
+
+def test_add_document_dedup_and_sources(tmp_path):
+    index = corpus_index.CorpusIndex(str(tmp_path / "index.sqlite"))
+    sentences = make_sentences(random.Random(1), 5) + [{"sentence": "  ", "paragraph_index": 5}]
+    assert index.add_document("a.docx", sentences, comparison_id="c1", content_hash="h1")
+    # 相同内容只记录新的来源，不重复索引句子
+    assert not index.add_document("copy.docx", sentences, comparison_id="c2", content_hash="h1")
+    assert not index.add_document("a.docx", sentences, comparison_id="c1", content_hash="h1")
+    assert index.contains("h1") and not index.contains("h2")
+    assert index.stats() == {"documents": 1, "sentences": 5}
+
+    found = index.query(sentences[:2], threshold=0.9)
+    assert [(d["content_hash"], d["file_path"], d["matched_sentences"]) for d in found] == [("h1", "a.docx", 2)]
+    assert sorted(map(tuple, (s.values() for s in found[0]["sources"]))) == [("c1", "a.docx"), ("c2", "copy.docx")]
+
+
+def test_query_ranking_and_exclude_hash(tmp_path):
+    rng = random.Random(2)
+    index = corpus_index.CorpusIndex(str(tmp_path / "index.sqlite"))
+    new = make_sentences(rng, 10)
+    index.add_document("new.docx", new, content_hash="new")
+    index.add_document("most.docx", [dict(s, sentence=perturb(rng, s["sentence"])) for s in new[:7]]
+                       + make_sentences(rng, 3), content_hash="most")
+    index.add_document("some.docx", new[7:] + make_sentences(rng, 5), content_hash="some")
+    index.add_document("none.docx", make_sentences(rng, 8), content_hash="none")
+
+    found = index.query(new, threshold=0.8, exclude_hash="new")
+    assert [d["content_hash"] for d in found] == ["most", "some"]
+    assert found[0]["matched_sentences"] == 7 and found[0]["score"] == 0.7
+    assert found[1]["matches"][0] == {"sentence": new[7]["sentence"], "paragraph_index": 7,
+                                      "matched_sentence": new[7]["sentence"], "matched_paragraph_index": 7,
+                                      "similarity": 1.0}
+    assert [d["content_hash"] for d in index.query(new, limit=1)] == ["new"]
+    assert index.query([{"sentence": "", "paragraph_index": 0}]) == []
+
+
+def test_candidate_recall_at_default_threshold():
+    # ratio >= 0.8 的改写句子几乎都应与原句落入至少一个相同的桶
+    rng = random.Random(3)
+    pairs = []
+    while len(pairs) < 300:
+        a = make_sentences(rng, 1)[0]["sentence"]
+        b = perturb(rng, perturb(rng, a))
+        if difflib.SequenceMatcher(None, a, b).ratio() >= 0.8:
+            pairs.append((a, b))
+    shared = sum(bool(set(corpus_index.band_keys(corpus_index.minhash(a)))
+                      & set(corpus_index.band_keys(corpus_index.minhash(b)))) for a, b in pairs)
+    assert shared / len(pairs) >= 0.97
+
+
+def test_old_layout_rebucketed(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    sentences = make_sentences(random.Random(4), 3)
+    corpus_index.CorpusIndex(path).add_document("a.docx", sentences, content_hash="h1")
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE buckets SET bucket = 'stale'")
+    conn.execute("UPDATE meta SET value = '32x8x3'")
+    conn.commit()
+    conn.close()
+    index = corpus_index.CorpusIndex(path)
+    assert [d["matched_sentences"] for d in index.query(sentences)] == [3]
+
+
+class FakeDatabase:
+    def __init__(self, records):
+        self.records = records
+
+    def get_doc_comparisons(self):
+        return self.records
+
+
+def test_rebuild(tmp_path):
+    rng = random.Random(5)
+    files = {}
+    for name in ("a.docx", "b.docx", "c.docx"):
+        path = tmp_path / name
+        path.write_bytes(name.encode("utf-8"))
+        files[str(path)] = make_sentences(rng, 4)
+    a, b, c = files
+    index = corpus_index.CorpusIndex(str(tmp_path / "index.sqlite"))
+    index.add_document("stale.docx", make_sentences(rng, 2), content_hash="stale")
+    # 记录按时间倒序；已删除的上传文件跳过
+    db = FakeDatabase([{"id": "c2", "file1_path": a, "file2_path": str(tmp_path / "deleted.docx")},
+                       {"id": "c1", "file1_path": a, "file2_path": b},
+                       {"id": "c0", "file1_path": c, "file2_path": None}])
+    assert corpus_index.rebuild(index, db, files.__getitem__) == {"documents": 3, "sentences": 12}
+    assert not index.contains("stale")
+    found = index.query(files[a])
+    assert found[0]["file_path"] == a
+    assert sorted(s["comparison_id"] for s in found[0]["sources"]) == ["c1", "c2"]
@@ -0,0 +1,61 @@
+"""
+Test script for the order-aware alignment diff
+"""
+
+import itertools
+import random
+
+import doc_alignment
+import sentence_matcher
+
+
+def best_chain_score(texts1, texts2, threshold):
+    candidates = list(sentence_matcher.iter_matches(texts1, texts2, threshold))
+    best = 0.0
+    for r in range(1, len(candidates) + 1):
+        for chain in itertools.combinations(candidates, r):
+            if all(a[0] < b[0] and a[1] < b[1] for a, b in zip(chain, chain[1:])):
+                best = max(best, sum(similarity for _, _, similarity in chain))
+    return best
+
+
+def document(*paragraphs):
+    return [{"sentence": sentence, "paragraph_index": p}
+            for p, sentences in enumerate(paragraphs, 1) for sentence in sentences]
+
+
+def test_ordered_pairs_maximises_total_similarity():
+    # 贪心会让第 0 句配到最相似的第 2 句，从而丢掉第 1 句的匹配
+    texts1 = ["甲方应于五日内付款。", "乙方负责交付货物。", "双方协商解决争议。"]
+    texts2 = ["甲方应于七日内付款。", "乙方负责交付全部货物。", "甲方应于五日内付款。"]
+    assert [(i, j) for i, j, _ in doc_alignment._ordered_pairs(texts1, texts2, 0.5)] == [(0, 0), (1, 1)]
+
+    rng = random.Random(3)
+    for _ in range(30):
+        texts1 = ["".join(rng.choice("abc") for _ in range(6)) for _ in range(5)]
+        texts2 = ["".join(rng.choice("abc") for _ in range(6)) for _ in range(5)]
+        pairs = doc_alignment._ordered_pairs(texts1, texts2, 0.6)
+        assert all(a[0] < b[0] and a[1] < b[1] for a, b in zip(pairs, pairs[1:]))
+        assert abs(sum(s for _, _, s in pairs) - best_chain_score(texts1, texts2, 0.6)) < 1e-9
+
+
+def test_reordered_inserted_and_deleted_paragraphs():
+    doc1 = document(["第一条 甲方应于五日内付款。"], ["第二条 乙方负责交付货物。"], ["第三条 双方协商解决争议。"],
+                    ["第四条 本合同一式两份。"])
+    doc2 = document(["第一条 甲方应于七日内付款。"], ["第三条 双方协商解决争议。"], ["新增 保密条款适用于双方。"],
+                    ["第二条 乙方负责交付全部货物。"], ["第四条 本合同一式两份。"])
+    stats = {}
+    rows = doc_alignment.align_documents(doc1, doc2, threshold=0.6, stats=stats)
+    ops = [(row["op"], row["text1"], row["text2"]) for row in rows]
+
+    assert ("modified", "第一条 甲方应于五日内付款。", "第一条 甲方应于七日内付款。") in ops
+    assert ("inserted", "", "新增 保密条款适用于双方。") in ops
+    # 移动的段落表现为一处删除加一处插入，其余段落按顺序对齐
+    assert ("deleted", "第二条 乙方负责交付货物。", "") in ops
+    assert ("inserted", "", "第二条 乙方负责交付全部货物。") in ops
+    assert [row["op"] for row in rows][-1] == "unchanged"
+    assert (stats["modified"], stats["deleted"], stats["inserted"]) == (1, 1, 2)
+
+    rows = doc_alignment.align_documents(doc1, document(["第一条 甲方应于五日内付款。"], ["第四条 本合同一式两份。"]))
+    assert [(row["op"], row["text1"]) for row in rows if row["op"] != "unchanged"] == [
+        ("deleted", "第二条 乙方负责交付货物。"), ("deleted", "第三条 双方协商解决争议。")]
@@ -0,0 +1,70 @@
+"""
+Test script for the .doc conversion pool (fake LibreOffice workers, LibreOffice not needed)
+"""
+
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import doc_convert
+
+
+class FakeWorker(doc_convert.LibreOfficeWorker):
+    """常驻进程换成一个什么也不做的 Python 进程；hang 为 True 时转换卡住不返回"""
+
+    hang = threading.Event()
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.desktop = object()
+        self.processes = getattr(self, "processes", []) + [self.process]
+        self.started = len(self.processes)
+
+    def _convert_uno(self, src, dst, result):
+        if FakeWorker.hang.is_set():
+            FakeWorker.hang.clear()
+            threading.Event().wait(5)
+            return
+        with open(src, "rb") as f, open(dst, "wb") as out:
+            out.write(b"docx:" + f.read())
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(doc_convert, "HAS_UNO", True)
+    monkeypatch.setattr(doc_convert, "LibreOfficeWorker", FakeWorker)
+    FakeWorker.hang.clear()
+    pool = doc_convert.ConversionPool(size=2, timeout=0.5, cache_dir=str(tmp_path / "converted"))
+    yield pool
+    pool.close()
+
+
+def test_warm_up_starts_every_worker(pool):
+    stats = pool.warm_up()
+    assert stats["workers"] == 2
+    assert all(worker.process.poll() is None for worker in pool.workers)
+    # 预热后转换直接使用空闲进程，不再启动新进程
+    assert pool.warm_up()["workers"] == 2
+    assert sum(worker.started for worker in pool.workers) == 2
+
+
+def test_timeout_kills_and_restarts_worker(pool, tmp_path):
+    source = tmp_path / "old.doc"
+    source.write_bytes(b"content")
+    pool.warm_up()
+    FakeWorker.hang.set()
+
+    target = pool.convert(str(source))
+
+    with open(target, "rb") as f:
+        assert f.read() == b"docx:content"
+    assert pool.restarts == 1
+    restarted = [worker for worker in pool.workers if worker.started == 2]
+    assert len(restarted) == 1 and restarted[0].process.poll() is None
+    # 卡住的进程已被杀掉
+    assert restarted[0].processes[0].poll() is not None
+    # 同一内容第二次直接命中缓存
+    assert pool.convert(str(source)) == target
+    assert pool.stats()["hits"] == 1
@@ -0,0 +1,61 @@
+"""
+Test script for the streaming DOCX paragraph reader (output compared with python-docx)
+"""
+
+import pytest
+
+import docx_stream
+
+docx = pytest.importorskip("docx")
+from docx.oxml import parse_xml  # noqa: E402
+
+
+def make_sample(path):
+    document = docx.Document()
+    document.add_paragraph("第一条 甲方应于五日内付款。")
+    p = document.add_paragraph("带\t制表符")
+    run = p.add_run("换行")
+    run.add_break()
+    run.add_text("之后")
+    run.add_break(docx.enum.text.WD_BREAK.PAGE)
+    p.add_run("分页后")
+    document.add_paragraph("")
+    hyperlink = parse_xml(
+        f'<w:p xmlns:w="{docx_stream.W_NS}"><w:r><w:t xml:space="preserve">见 </w:t></w:r>'
+        f'<w:hyperlink><w:r><w:t>附件一</w:t></w:r></w:hyperlink><w:r><w:noBreakHyphen/><w:t>A</w:t></w:r></w:p>')
+    document.element.body.insert(len(document.element.body) - 1, hyperlink)
+    table = document.add_table(rows=2, cols=2)
+    for k, cell in enumerate(table._cells):
+        cell.text = f"单元格{k}"
+    document.add_paragraph("表格之后的段落")
+    section = document.sections[0]
+    section.header.paragraphs[0].text = "页眉"
+    section.footer.paragraphs[0].text = "页脚"
+    document.save(path)
+    return document
+
+
+def test_paragraphs_same_as_python_docx(tmp_path):
+    path = str(tmp_path / "sample.docx")
+    make_sample(path)
+    expected = [p.text for p in docx.Document(path).paragraphs]
+    assert list(docx_stream.iter_paragraphs(path)) == expected
+    assert list(docx_stream.iter_paragraphs_python_docx(path)) == expected
+    assert "见 附件一-A" in expected
+
+
+def test_tables_and_headers_footers(tmp_path):
+    path = str(tmp_path / "sample.docx")
+    make_sample(path)
+    document = docx.Document(path)
+    # 表格段落按文档顺序穿插在正文中，页眉页脚（按部件名排序）在最后
+    body = []
+    for child in document.element.body.iterchildren():
+        if child.tag == docx_stream._P:
+            body.append(docx.text.paragraph.Paragraph(child, document).text)
+        elif child.tag == docx_stream._TBL:
+            body.extend(docx.text.paragraph.Paragraph(p, document).text for p in child.iter(docx_stream._P))
+    assert list(docx_stream.iter_paragraphs(path, include_tables=True)) == body
+    assert body.index("单元格0") < body.index("表格之后的段落")
+    paragraphs = list(docx_stream.iter_paragraphs(path, include_tables=True, include_headers_footers=True))
+    assert sorted(paragraphs[len(body):]) == sorted(["页眉", "页脚"])
@@ -0,0 +1,146 @@
+"""
+Test script for incremental re-comparison (paragraph results kept in an in-memory stand-in for the database)
+"""
+
+import itertools
+import random
+
+import doc_checker
+import incremental_compare
+
+
+class MemoryDatabase:
+    """只实现段落结果相关方法的内存数据库"""
+
+    def __init__(self):
+        self.comparisons = []
+        self.results = {}
+        self.clock = itertools.count()
+
+    def save_paragraph_results(self, comparison_id, settings_key, paragraph_hashes1, paragraph_hashes2, results):
+        self.comparisons.append({"comparison_id": comparison_id, "settings_key": settings_key,
+                                 "paragraph_hashes1": paragraph_hashes1, "paragraph_hashes2": paragraph_hashes2,
+                                 "created_at": next(self.clock)})
+        self.results[comparison_id] = [{"para_hash1": h1, "para_hash2": h2, "matches": matches}
+                                       for h1, h2, matches in results]
+
+    def get_paragraph_hash_sets(self, settings_key, limit=20):
+        records = [r for r in self.comparisons if r["settings_key"] == settings_key]
+        return sorted(records, key=lambda r: r["created_at"], reverse=True)[:limit]
+
+    def get_paragraph_results(self, comparison_id):
+        for record in self.comparisons:
+            if record["comparison_id"] == comparison_id:
+                return dict(record, results=self.results[comparison_id])
+        return {}
+
+    def delete_old_paragraph_results(self, settings_key, keep):
+        stale = self.get_paragraph_hash_sets(settings_key, limit=len(self.comparisons))[keep:]
+        for record in stale:
+            self.comparisons.remove(record)
+            self.results.pop(record["comparison_id"], None)
+        return len(stale)
+
+
+def make_document(rng, paragraphs):
+    sentences = []
+    for p in range(paragraphs):
+        for _ in range(rng.randint(1, 4)):
+            sentences.append({"sentence": "".join(rng.choice("甲乙方付款合同") for _ in range(rng.randint(4, 12))) + "。",
+                              "paragraph_index": p})
+    return sentences
+
+
+def compare(sentences1, sentences2, store=None, **options):
+    stats = {}
+    matches = doc_checker.fuzzy_match_sentences(sentences1, sentences2, 0.6, reuse_store=store, stats=stats, **options)
+    return [(m["para1"], m["para2"], m["sentence1"], m["sentence2"], m["similarity"], m["stage"]) for m in matches], stats
+
+
+def edit_paragraph(sentences, paragraph, replace):
+    return [dict(s, sentence=replace(s["sentence"])) if s["paragraph_index"] == paragraph else s for s in sentences]
+
+
+def test_second_comparison_same_as_fresh_run():
+    rng = random.Random(5)
+    doc1 = make_document(rng, 12)
+    doc2 = make_document(rng, 10) + [dict(s, paragraph_index=s["paragraph_index"] + 10) for s in doc1[:6]]
+    for top_k in (None, 2):
+        db = MemoryDatabase()
+        first, stats = compare(doc1, doc2, incremental_compare.ParagraphResultStore(db, f"a{top_k}", "s"), top_k=top_k)
+        assert first == compare(doc1, doc2, top_k=top_k)[0]
+
+        # 改一个段落；另一段只改全角/半角（规范化后相同，原文相似度不同）
+        changed1 = edit_paragraph(doc1, 3, lambda text: text[:-1] + "变更。")
+        changed1 = edit_paragraph(changed1, 0, lambda text: text.replace("。", "．"))
+        changed2 = edit_paragraph(doc2, 11, lambda text: "乙" + text)
+        store = incremental_compare.ParagraphResultStore(db, f"b{top_k}", "s")
+        second, stats = compare(changed1, changed2, store, top_k=top_k)
+        assert stats["reuse"]["reused_from"] == f"a{top_k}"
+        assert 0 < stats["reuse"]["pairs_reused"] < stats["pairs_total"]
+        assert second == compare(changed1, changed2, top_k=top_k)[0]
+        # 不区分 exact/fuzzy 时与逐对比较的匹配集合相同
+        assert [m[:5] for m in second] == [m[:5] for m in compare(changed1, changed2, exact_first=False, top_k=top_k)[0]]
+
+
+def test_nfkc_only_change_is_not_reused():
+    doc1 = [{"sentence": "ABC合同甲方付款", "paragraph_index": 0}]
+    doc2 = [{"sentence": "ABC合同甲方付款", "paragraph_index": 0}]
+    db = MemoryDatabase()
+    compare(doc1, doc2, incremental_compare.ParagraphResultStore(db, "a", "s"))
+    doc1 = [{"sentence": "ＡＢＣ合同甲方付款", "paragraph_index": 0}]
+    second, stats = compare(doc1, doc2, incremental_compare.ParagraphResultStore(db, "b", "s"))
+    assert stats["reuse"]["pairs_reused"] == 0
+    assert second == compare(doc1, doc2)[0]
+
+
+class RacingDatabase(MemoryDatabase):
+    """列出候选之后、读取结果之前，另一个比较把指定的记录清理掉"""
+
+    def __init__(self):
+        super().__init__()
+        self.deleted_during_lookup = set()
+
+    def get_paragraph_hash_sets(self, settings_key, limit=20):
+        records = super().get_paragraph_hash_sets(settings_key, limit)
+        for record in list(self.comparisons):
+            if record["comparison_id"] in self.deleted_during_lookup:
+                self.comparisons.remove(record)
+                del self.results[record["comparison_id"]]
+        return records
+
+
+def test_prior_deleted_during_lookup():
+    rng = random.Random(6)
+    doc1, doc2 = make_document(rng, 8), make_document(rng, 8)
+    db = RacingDatabase()
+    compare(doc1[:len(doc1) // 2], doc2, incremental_compare.ParagraphResultStore(db, "partial", "s"))
+    compare(doc1, doc2, incremental_compare.ParagraphResultStore(db, "full", "s"))
+    changed = edit_paragraph(doc1, 7, lambda text: "乙" + text)
+
+    # 重合最多的记录已被删除时改用下一个候选，不会把它的段落当作"已知但没有匹配"
+    db.deleted_during_lookup = {"full"}
+    second, stats = compare(changed, doc2, incremental_compare.ParagraphResultStore(db, "b", "s"))
+    assert stats["reuse"]["reused_from"] == "partial"
+    assert second == compare(changed, doc2)[0]
+
+    db.deleted_during_lookup = {"partial", "b"}
+    third, stats = compare(changed, doc2, incremental_compare.ParagraphResultStore(db, "c", "s"))
+    assert stats["reuse"]["reused_from"] is None
+    assert third == compare(changed, doc2)[0]
+
+
+def test_old_results_pruned_and_large_results_not_stored(monkeypatch):
+    rng = random.Random(8)
+    doc1 = make_document(rng, 4)
+    db = MemoryDatabase()
+    for n in range(incremental_compare.RETAINED_COMPARISONS + 3):
+        compare(doc1, doc1, incremental_compare.ParagraphResultStore(db, f"c{n}", "s"))
+    compare(doc1, doc1, incremental_compare.ParagraphResultStore(db, "other", "t"))
+    assert len(db.get_paragraph_hash_sets("s", limit=100)) == incremental_compare.RETAINED_COMPARISONS
+    assert set(db.results) == {r["comparison_id"] for r in db.comparisons}
+
+    monkeypatch.setattr(incremental_compare, "MAX_STORED_MATCHES", 1)
+    _, stats = compare(doc1, doc1, incremental_compare.ParagraphResultStore(db, "big", "s"))
+    assert not stats["reuse"]["stored"]
+    assert "big" not in db.results
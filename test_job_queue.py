@@ -0,0 +1,108 @@
+"""
+Test script for the background job queue
+"""
+
+import threading
+import time
+
+import pytest
+
+import job_queue
+
+
+def wait_for(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        assert time.monotonic() < deadline, f"任务状态仍为 {job['status']}"
+        time.sleep(0.01)
+
+
+def test_states_and_results():
+    queue = job_queue.JobQueue({"compare": 1})
+    release = threading.Event()
+    first = queue.submit("compare", lambda: release.wait(5) and {"comparison_id": "c1"})
+    second = queue.submit("compare", lambda value: {"value": value}, value=2)
+
+    running = wait_for(queue, first, "running")
+    assert running["started_at"] is not None and running["finished_at"] is None
+    queued = queue.get(second)
+    assert queued["status"] == "queued" and queued["position"] == 0 and queued["started_at"] is None
+
+    release.set()
+    assert wait_for(queue, first, "done")["result"] == {"comparison_id": "c1"}
+    done = wait_for(queue, second, "done")
+    assert done["result"] == {"value": 2} and done["error"] is None
+    assert done["created_at"] <= done["started_at"] <= done["finished_at"]
+    assert queue.get("missing") is None
+    queue.shutdown()
+
+
+def test_failures(capsys):
+    queue = job_queue.JobQueue({"transcribe": 1})
+
+    def broken():
+        raise RuntimeError("模型加载失败")
+
+    raised = queue.submit("transcribe", broken)
+    reported = queue.submit("transcribe", lambda: {"error": "文件格式不支持"})
+    empty = queue.submit("transcribe", lambda: None)
+    queue.shutdown()
+
+    job = queue.get(raised)
+    assert (job["status"], job["error"], job["result"]) == ("failed", "模型加载失败", None)
+    # 异常的堆栈打印到日志
+    err = capsys.readouterr().err
+    assert "Traceback" in err and "in broken" in err and "RuntimeError: 模型加载失败" in err
+    assert (queue.get(reported)["status"], queue.get(reported)["error"]) == ("failed", "文件格式不支持")
+    assert (queue.get(empty)["status"], queue.get(empty)["error"]) == ("failed", "任务失败")
+
+    with pytest.raises(ValueError):
+        queue.submit("unknown", lambda: {})
+
+
+def test_pool_is_bounded():
+    queue = job_queue.JobQueue({"compare": 2, "maintenance": 1})
+    lock = threading.Lock()
+    running = []
+    peak = []
+    release = threading.Event()
+
+    def work():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        release.wait(5)
+        with lock:
+            running.pop()
+        return {}
+
+    jobs = [queue.submit("compare", work) for _ in range(5)]
+    wait_for(queue, jobs[1], "running")
+    # 另一类任务有自己的池，不会排在比较任务之后
+    assert wait_for(queue, queue.submit("maintenance", dict), "done")
+    statuses = [queue.get(job_id)["status"] for job_id in jobs]
+    assert statuses == ["running", "running", "queued", "queued", "queued"]
+    assert [queue.get(job_id)["position"] for job_id in jobs[2:]] == [0, 1, 2]
+    release.set()
+    queue.shutdown()
+    assert max(peak) == 2
+    assert all(queue.get(job_id)["status"] == "done" for job_id in jobs)
+
+
+def test_finished_jobs_pruned_after_retention():
+    queue = job_queue.JobQueue({"compare": 1})
+    release = threading.Event()
+    old = queue.submit("compare", dict)
+    pending = queue.submit("compare", lambda: release.wait(5) and {})
+    wait_for(queue, old, "done")
+    queue.jobs[old]["finished_at"] -= job_queue.JOB_RETENTION_SECONDS + 1
+
+    # 清理在提交新任务时进行；未结束的任务不清理
+    queue.submit("compare", dict)
+    assert queue.get(old) is None
+    assert queue.get(pending)["status"] in ("running", "queued")
+    release.set()
+    queue.shutdown()
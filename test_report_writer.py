@@ -0,0 +1,70 @@
+"""
+Test script for the streaming report writers
+"""
+
+import csv
+
+import pytest
+from openpyxl import load_workbook
+
+import report_writer
+
+
+def make_matches(count):
+    for k in range(count):
+        yield {"sentence1": f"句子{k}", "sentence2": f"句子{k}'", "para1": k, "para2": k + 1,
+               "similarity": round(0.9 + k / 1000, 3), "stage": "exact" if k % 2 else "fuzzy"}
+
+
+def test_excel_continues_on_new_sheet_at_row_limit(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    writer = report_writer.ExcelReportWriter(path, "a.docx", "b.docx", max_rows=10)
+    for match in make_matches(15):
+        writer.write(match)
+    writer.close()
+
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == ["匹配报告", "匹配报告 (2)", "匹配报告 (3)"]
+    first, second, third = (list(ws.values) for ws in workbook.worksheets)
+    # 首表：6 行表头区 + 4 条匹配；续表：表头 + 9 条匹配
+    assert first[1][:2] == ("文档 1:", "a.docx") and first[5] == tuple(report_writer.HEADERS)
+    assert len(first) == 10 and len(second) == 10 and len(third) == 1 + 15 - 4 - 9
+    assert second[0] == tuple(report_writer.HEADERS)
+    numbers = [row[0] for row in first[6:] + second[1:] + third[1:]]
+    assert numbers == list(range(8, 23))
+    assert third[-1] == (22, "句子14", "句子14'", 14, 15, 0.914, "模糊匹配")
+
+
+def test_csv_and_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    output = str(tmp_path / "report.xlsx")
+    count, paths = report_writer.write_reports("a.docx", "b.docx", make_matches(5), output,
+                                               formats=("xlsx", "csv", "parquet"))
+    assert count == 5
+    assert paths == {"xlsx": output, "csv": str(tmp_path / "report.csv"), "parquet": str(tmp_path / "report.parquet")}
+
+    with open(paths["csv"], encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == report_writer.HEADERS
+    assert rows[1:] == [[str(v) for v in report_writer.match_row(k + 1, m)] for k, m in enumerate(make_matches(5))]
+
+    import pyarrow.parquet as pq
+    table = pq.read_table(paths["parquet"]).to_pylist()
+    assert [row["number"] for row in table] == [1, 2, 3, 4, 5]
+    assert table[1] == {"number": 2, "sentence1": "句子1", "sentence2": "句子1'", "para1": 1, "para2": 2,
+                        "similarity": 0.901, "stage": "exact"}
+
+
+def test_parquet_batches_and_unknown_format(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    path = str(tmp_path / "report.parquet")
+    writer = report_writer.ParquetReportWriter(path, "a.docx", "b.docx", batch_rows=2)
+    for match in make_matches(5):
+        writer.write(match)
+    writer.close()
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_rows == 5 and parquet.metadata.num_row_groups == 3
+
+    with pytest.raises(ValueError):
+        report_writer.write_reports("a.docx", "b.docx", make_matches(1), str(tmp_path / "x.xlsx"), formats=("pdf",))
@@ -0,0 +1,33 @@
+"""
+Test script for the content-hash sentence cache
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from sentence_cache import SentenceCache
+
+
+def test_hit_counts_are_per_call(tmp_path):
+    cache = SentenceCache(str(tmp_path / "cache"))
+    files = []
+    for name in ("a.docx", "b.docx", "c.docx"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        files.append(str(path))
+
+    def parse(path):
+        return [{"sentence": path, "paragraph_index": 1}]
+
+    cache.get_or_parse(files[0], parse)
+
+    def compare(pair):
+        stats = {}
+        for path in pair:
+            assert cache.get_or_parse(path, parse, stats=stats) == parse(path)
+        return stats
+
+    # 两个比较同时进行时，各自只统计自己的命中数
+    with ThreadPoolExecutor(2) as executor:
+        results = list(executor.map(compare, [(files[0], files[0]), (files[1], files[2])]))
+    assert results == [{"cache_hits": 2}, {"cache_misses": 2}]
+    assert (cache.hits, cache.misses) == (2, 3)
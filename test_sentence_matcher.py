@@ -0,0 +1,158 @@
+"""
+Test script for the candidate-pruned sentence matcher
+"""
+
+import difflib
+import random
+import subprocess
+import sys
+
+import pytest
+
+import batch_compare
+import doc_checker
+import sentence_matcher
+import streaming_compare
+
+
+def brute_force(texts1, texts2, threshold):
+    matches = []
+    for i, s1 in enumerate(texts1):
+        for j, s2 in enumerate(texts2):
+            similarity = difflib.SequenceMatcher(None, s1, s2).ratio()
+            if similarity >= threshold:
+                matches.append((i, j, similarity))
+    return matches
+
+
+def make_sentences(rng, count, alphabet):
+    base = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 60))) for _ in range(count)]
+    sentences = []
+    for text in base:
+        sentences.append(text)
+        # 加入少量编辑后的近似句子
+        chars = list(text)
+        for _ in range(rng.randint(0, 3)):
+            if chars:
+                chars[rng.randrange(len(chars))] = rng.choice(alphabet)
+        sentences.append("".join(chars))
+    rng.shuffle(sentences)
+    return sentences
+
+
+def test_iter_matches_same_as_brute_force():
+    rng = random.Random(176)
+    for alphabet in ("ab", "abcdef", "合同甲乙方应当于日前支付款项。"):
+        texts1 = make_sentences(rng, 25, alphabet)
+        texts2 = make_sentences(rng, 25, alphabet) + texts1[:10]
+        for threshold in (0.0, 0.5, 0.7, 0.8, 0.9, 0.95, 1.0):
+            expected = brute_force(texts1, texts2, threshold)
+            actual = list(sentence_matcher.iter_matches(texts1, texts2, threshold))
+            assert actual == expected, (alphabet, threshold)
+
+
+def test_long_sentences_with_autojunk():
+    rng = random.Random(9)
+    texts1 = ["".join(rng.choice("abc ") for _ in range(rng.randint(150, 300))) for _ in range(8)]
+    texts2 = [t[:-5] + "xyz" for t in texts1] + texts1[::-1]
+    for threshold in (0.6, 0.8, 0.9):
+        expected = brute_force(texts1, texts2, threshold)
+        assert list(sentence_matcher.iter_matches(texts1, texts2, threshold)) == expected
+
+
+def test_parallel_same_as_single_process(monkeypatch):
+    rng = random.Random(2)
+    texts1 = make_sentences(rng, 30, "abcdef")
+    texts2 = make_sentences(rng, 30, "abcdef")
+    monkeypatch.setattr(sentence_matcher, "PARALLEL_MIN_PAIRS", 0)
+    expected = list(sentence_matcher.iter_matches(texts1, texts2, 0.8))
+    actual = list(sentence_matcher.iter_matches_parallel(texts1, texts2, 0.8, workers=3, chunk_size=7))
+    assert actual == expected
+
+
+def test_top_k_keeps_best_matches_per_sentence():
+    rng = random.Random(11)
+    texts1 = make_sentences(rng, 20, "abcd")
+    texts2 = make_sentences(rng, 20, "abcd")
+    for threshold in (0.5, 0.8):
+        full = brute_force(texts1, texts2, threshold)
+        for k in (1, 3):
+            expected = []
+            for i in range(len(texts1)):
+                row = [m for m in full if m[0] == i]
+                row.sort(key=lambda m: (-m[2], m[1]))
+                expected.extend(sorted(row[:k]))
+            assert list(sentence_matcher.iter_matches(texts1, texts2, threshold, top_k=k)) == expected
+
+
+def test_top_k_below_one_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        doc_checker.main("a.docx", "b.docx", str(tmp_path / "out.xlsx"), top_k=0)
+    with pytest.raises(ValueError):
+        batch_compare.main(["a.docx", "b.docx"], str(tmp_path / "out.xlsx"), top_k=-1)
+    result = subprocess.run([sys.executable, doc_checker.__file__, "a.docx", "b.docx", "--top-k", "0"],
+                            capture_output=True, text=True)
+    assert result.returncode == 2 and "--top-k" in result.stderr
+
+
+def test_exact_matches_join_on_normalized_text():
+    texts1 = ["甲方付款。", "ＡＢＣ  合同", "仅在文档1"]
+    texts2 = ["ABC 合同", "甲方付款。", "甲方付款。", "仅在文档2"]
+    pairs = sentence_matcher.exact_matches(texts1, texts2)
+    assert pairs == [(0, 1), (0, 2), (1, 0)]
+
+
+def test_exact_first_keeps_fuzzy_matches_of_exact_sentences(tmp_path):
+    # 文档1第0句在文档2中有完全相同的句子，同时与文档2第1句模糊匹配
+    sentences1 = [{"sentence": "甲方应于五日内付款。", "paragraph_index": 1}]
+    sentences2 = [{"sentence": "甲方应于五日内付款。", "paragraph_index": 1},
+                  {"sentence": "甲方应于十日内付款。", "paragraph_index": 2}]
+    matches = doc_checker.fuzzy_match_sentences(sentences1, sentences2, 0.6)
+    assert [(m["para2"], m["stage"]) for m in matches] == [(1, "exact"), (2, "fuzzy")]
+
+    rng = random.Random(7)
+    texts1 = make_sentences(rng, 30, "abcd")
+    texts1 += texts1[:8]
+    texts2 = make_sentences(rng, 30, "abcd") + texts1[:12] + texts1[:3]
+    sentences1 = [{"sentence": t, "paragraph_index": i} for i, t in enumerate(texts1)]
+    sentences2 = [{"sentence": t, "paragraph_index": j} for j, t in enumerate(texts2)]
+    for threshold in (0.6, 0.9):
+        for top_k in (None, 1, 3):
+            def run(exact_first):
+                return [(m["para1"], m["para2"], m["similarity"]) for m in doc_checker.fuzzy_match_sentences(
+                    sentences1, sentences2, threshold, exact_first=exact_first, top_k=top_k)]
+
+            expected = run(False)
+            assert run(True) == expected, (threshold, top_k)
+            streamed = streaming_compare.iter_streaming_matches(
+                lambda: iter(sentences1), iter(sentences2), threshold, top_k=top_k, exact_first=True,
+                tmp_dir=str(tmp_path))
+            assert [(m["para1"], m["para2"], m["similarity"]) for m in streamed] == expected
+            index2 = sentence_matcher.SentenceIndex(texts2, threshold)
+            batch = batch_compare.iter_pair_matches(sentences1, sentences2, index2, threshold, top_k, True)
+            assert [(i, j, m["similarity"]) for i, j, m in batch] == expected
+
+
+def test_streaming_disk_index_same_as_brute_force(tmp_path):
+    rng = random.Random(12)
+    texts1 = make_sentences(rng, 20, "abcdef")
+    texts2 = make_sentences(rng, 20, "abcdef")
+    sentences1 = [{"sentence": t, "paragraph_index": i} for i, t in enumerate(texts1)]
+    sentences2 = [{"sentence": t, "paragraph_index": j} for j, t in enumerate(texts2)]
+    stats = {}
+    # 内存上限为 0 时文档2索引立即转存到磁盘
+    matches = list(streaming_compare.iter_streaming_matches(
+        lambda: iter(sentences1), iter(sentences2), 0.8, exact_first=False,
+        memory_limit=0, stats=stats, tmp_dir=str(tmp_path)))
+    assert stats["index_spilled"]
+    assert [(m["para1"], m["para2"], m["similarity"]) for m in matches] == \
+        [(i, j, round(similarity, 3)) for i, j, similarity in brute_force(texts1, texts2, 0.8)]
+    assert list(tmp_path.iterdir()) == []
+
+
+if __name__ == "__main__":
+    test_top_k_keeps_best_matches_per_sentence()
+    test_exact_matches_join_on_normalized_text()
+    test_iter_matches_same_as_brute_force()
+    test_long_sentences_with_autojunk()
+    print("OK")
@@ -0,0 +1,44 @@
+"""
+Test script for the pluggable sentence segmenters
+"""
+
+import time
+
+import pytest
+
+import sentence_segmenter
+
+
+def test_cjk_splits_on_terminators_and_keeps_closers():
+    text = "甲方应付款。乙方交货！是否同意？“条款一；”条款二……最后一句"
+    assert sentence_segmenter.split_cjk(text) == ["甲方应付款。", "乙方交货！", "是否同意？", "“条款一；”", "条款二……",
+                                                  "最后一句"]
+
+
+def test_cjk_english_periods_and_line_breaks():
+    text = "Price is 3.5 USD. See www.example.com now! Done\n\n第二行。  \n"
+    assert sentence_segmenter.split_cjk(text) == ["Price is 3.5 USD.", " See www.example.com now!", " Done",
+                                                  "第二行。"]
+    assert sentence_segmenter.split_cjk("") == []
+    assert sentence_segmenter.split_cjk("   \n\t") == []
+
+
+def test_long_dot_runs_are_linear():
+    # 上传内容中的长串句点（目录引导线等）不能引起回溯
+    text = "目录" + "." * 20000 + "第一章"
+    start = time.perf_counter()
+    assert sentence_segmenter.split_cjk(text) == [text]
+    assert sentence_segmenter.split_cjk(text + "." * 20000) == [text + "." * 20000]
+    assert sentence_segmenter.split_cjk("." * 20000 + " 后文") == ["." * 20000, " 后文"]
+    assert time.perf_counter() - start < 0.5
+
+
+def test_registry():
+    assert sentence_segmenter.get_segmenter() is sentence_segmenter.split_cjk
+    with pytest.raises(ValueError):
+        sentence_segmenter.get_segmenter("missing")
+    sentence_segmenter.register_segmenter("lines", str.splitlines)
+    try:
+        assert sentence_segmenter.get_segmenter("lines")("a\nb") == ["a", "b"]
+    finally:
+        del sentence_segmenter.SEGMENTERS["lines"]
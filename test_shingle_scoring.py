@@ -0,0 +1,71 @@
+"""
+Test script for vectorized shingle scoring
+"""
+
+import difflib
+import math
+import random
+
+import pytest
+
+import shingle_scoring
+
+pytest.importorskip("scipy")
+
+
+def brute_force(texts1, texts2, threshold, metric):
+    matches = []
+    for i, s1 in enumerate(texts1):
+        for j, s2 in enumerate(texts2):
+            a, b = shingle_scoring._shingles(s1), shingle_scoring._shingles(s2)
+            if not a or not b:
+                continue
+            common = len(a & b)
+            score = common / math.sqrt(len(a) * len(b)) if metric == "cosine" else common / len(a | b)
+            if score >= threshold - 1e-9:
+                matches.append((i, j, score))
+    return matches
+
+
+def make_texts(rng, count):
+    base = ["".join(rng.choice("甲乙方付款合同条") for _ in range(rng.randint(1, 20))) for _ in range(count)]
+    return base + [t[:-1] + "款" for t in base[:count // 2]]
+
+
+def test_scores_same_as_brute_force():
+    rng = random.Random(4)
+    texts1, texts2 = make_texts(rng, 30), make_texts(rng, 30)
+    for metric in shingle_scoring.METRICS:
+        for threshold in (0.3, 0.6, 0.9):
+            expected = brute_force(texts1, texts2, threshold, metric)
+            for block_size in (7, shingle_scoring.DEFAULT_BLOCK_SIZE):
+                actual = list(shingle_scoring.iter_matches_vectorized(
+                    texts1, texts2, threshold, metric=metric, rescore=False, block_size=block_size))
+                assert [(i, j) for i, j, _ in actual] == [(i, j) for i, j, _ in expected], (metric, threshold)
+                assert all(abs(a[2] - e[2]) < 1e-6 for a, e in zip(actual, expected))
+
+
+def test_rescore_and_top_n():
+    rng = random.Random(5)
+    texts1, texts2 = make_texts(rng, 20), make_texts(rng, 20)
+    candidates = brute_force(texts1, texts2, 0.5, "cosine")
+    rescored = list(shingle_scoring.iter_matches_vectorized(texts1, texts2, 0.5))
+    expected = []
+    for i, j, _ in candidates:
+        ratio = difflib.SequenceMatcher(None, texts1[i], texts2[j]).ratio()
+        if ratio >= 0.5:
+            expected.append((i, j, ratio))
+    assert rescored == expected
+
+    limited = list(shingle_scoring.iter_matches_vectorized(texts1, texts2, 0.5, rescore=False, top_n=2))
+    for i in range(len(texts1)):
+        row = sorted((score for ci, _, score in candidates if ci == i), reverse=True)[:2]
+        assert sorted((score for li, _, score in limited if li == i), reverse=True) == pytest.approx(row)
+
+
+def test_edge_cases():
+    assert list(shingle_scoring.iter_matches_vectorized([], ["甲方"], 0.5)) == []
+    # 比 shingle 短的句子整体作为一个 shingle
+    assert list(shingle_scoring.iter_matches_vectorized(["甲"], ["甲", "乙"], 0.5, rescore=False)) == [(0, 0, 1.0)]
+    with pytest.raises(ValueError):
+        list(shingle_scoring.iter_matches_vectorized(["甲方"], ["甲方"], 0.5, metric="dice"))
@@ -0,0 +1,87 @@
+"""
+Test script for the transcription result cache (in-memory stand-in for the database)
+"""
+
+import transcription_cache
+
+SETTINGS = {"model": "large-v3", "language": "zh", "device": "cuda"}
+
+
+class MemoryDatabase:
+    """只实现转录缓存相关方法的内存数据库"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def save_transcription_cache(self, cache_key, media_hash, settings, raw_text_path, processed_text_path):
+        self.entries[cache_key] = {"cache_key": cache_key, "media_hash": media_hash, "settings": settings,
+                                   "raw_text_path": raw_text_path, "processed_text_path": processed_text_path,
+                                   "hit_count": 0}
+
+    def get_transcription_cache(self, cache_key):
+        return self.entries.get(cache_key)
+
+    def record_transcription_cache_hit(self, cache_key):
+        self.entries[cache_key]["hit_count"] += 1
+
+    def delete_transcription_cache(self, cache_key=None, media_hash=None, raw_text_path=None):
+        fields = {"cache_key": cache_key, "media_hash": media_hash, "raw_text_path": raw_text_path}
+        matched = [key for key, entry in self.entries.items()
+                   if all(value is None or entry[column] == value for column, value in fields.items())]
+        for key in matched:
+            del self.entries[key]
+        return len(matched)
+
+    def get_transcription_cache_stats(self):
+        return {"entries": len(self.entries),
+                "total_hits": sum(entry["hit_count"] for entry in self.entries.values())}
+
+
+def make_outputs(tmp_path, name):
+    raw, processed = tmp_path / f"{name}_raw.txt", tmp_path / f"{name}.docx"
+    raw.write_text("原始文本", encoding="utf-8")
+    processed.write_bytes(b"docx")
+    return str(raw), str(processed)
+
+
+def test_cache_key():
+    key = transcription_cache.cache_key("a" * 64, SETTINGS)
+    # 设置的键顺序不影响缓存键，录音或任一设置不同则键不同
+    assert key == transcription_cache.cache_key("a" * 64, dict(reversed(list(SETTINGS.items()))))
+    assert key != transcription_cache.cache_key("b" * 64, SETTINGS)
+    assert key != transcription_cache.cache_key("a" * 64, {**SETTINGS, "language": "en"})
+
+
+def test_hit_miss_and_stale_entry(tmp_path):
+    db = MemoryDatabase()
+    cache = transcription_cache.TranscriptionCache(db)
+    raw, processed = make_outputs(tmp_path, "meeting")
+    assert cache.get("a" * 64, SETTINGS) is None
+    cache.put("a" * 64, SETTINGS, raw, processed)
+
+    entry = cache.get("a" * 64, SETTINGS)
+    assert (entry["raw_text_path"], entry["processed_text_path"]) == (raw, processed)
+    assert cache.get("a" * 64, {**SETTINGS, "model": "small"}) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 0.333, "entries": 1, "total_hits": 1}
+
+    # 输出文件被删除后条目作废并从数据库移除
+    (tmp_path / "meeting_raw.txt").unlink()
+    assert cache.get("a" * 64, SETTINGS) is None
+    assert db.entries == {}
+
+
+def test_invalidate(tmp_path):
+    db = MemoryDatabase()
+    cache = transcription_cache.TranscriptionCache(db)
+    first, second = make_outputs(tmp_path, "first"), make_outputs(tmp_path, "second")
+    cache.put("a" * 64, SETTINGS, *first)
+    cache.put("a" * 64, {**SETTINGS, "language": "en"}, *first)
+    cache.put("b" * 64, SETTINGS, *second)
+
+    assert cache.invalidate(media_hash="c" * 64) == 0
+    assert cache.invalidate(raw_text_path=second[0]) == 1
+    assert cache.get("b" * 64, SETTINGS) is None
+    assert cache.invalidate(media_hash="a" * 64) == 2
+    cache.put("b" * 64, SETTINGS, *second)
+    assert cache.invalidate() == 1
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,170 @@
+"""
+Test script for the content-addressed upload store (in-memory stand-in for the database)
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+import upload_store
+
+
+class MemoryDatabase:
+    """只实现上传存储相关方法的内存数据库"""
+
+    def __init__(self):
+        self.blobs = {}
+        self.files = {}
+
+    def save_upload_blob(self, blob_path, content_hash, size):
+        self.blobs[blob_path] = {"blob_path": blob_path, "content_hash": content_hash, "size": size,
+                                 "last_uploaded_at": upload_store.datetime.now()}
+
+    def save_upload_file(self, file_id, blob_path, original_filename, owner_type, owner_id):
+        self.files[file_id] = {"id": file_id, "blob_path": blob_path, "original_filename": original_filename,
+                               "owner_type": owner_type, "owner_id": owner_id,
+                               "created_at": upload_store.datetime.now()}
+
+    def get_upload_files(self, owner_ids):
+        return [row for row in self.files.values() if row["owner_id"] in owner_ids]
+
+    def delete_upload_files_before(self, cutoff):
+        expired = [file_id for file_id, row in self.files.items() if row["created_at"] < cutoff]
+        for file_id in expired:
+            del self.files[file_id]
+        return len(expired)
+
+    def get_unreferenced_blobs(self, uploaded_before):
+        referenced = {row["blob_path"] for row in self.files.values()}
+        return [blob for path, blob in self.blobs.items()
+                if path not in referenced and blob["last_uploaded_at"] < uploaded_before]
+
+    def delete_upload_blob(self, blob_path):
+        self.blobs.pop(blob_path, None)
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_old(path, hours):
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
+
+
+def test_sessions_do_not_block_each_other(tmp_path):
+    store = upload_store.UploadStore(MemoryDatabase(), str(tmp_path))
+    first = store.start_session(sha256(b"first"), ".docx")
+    second = store.start_session(sha256(b"second"), ".docx")
+    done = threading.Event()
+    with store._session_lock(first):
+        # 另一个会话正在写入（例如重启后重新计算大文件的哈希）时，本会话照常追加
+        thread = threading.Thread(target=lambda: (store.append_chunk(second, 0, b"second", 6), done.set()))
+        thread.start()
+        assert done.wait(5)
+    thread.join()
+    assert store.append_chunk(first, 0, b"first", 5)[1] is not None
+
+
+def test_gc_drops_abandoned_sessions(tmp_path):
+    store = upload_store.UploadStore(MemoryDatabase(), str(tmp_path))
+    abandoned = store.start_session(sha256(b"abandoned upload"), ".mp3")
+    store.append_chunk(abandoned, 0, b"abandoned", 16)
+    active = store.start_session(sha256(b"active upload"), ".mp3")
+    store.append_chunk(active, 0, b"active", 13)
+    finished = store.start_session(sha256(b"done"), ".mp3")
+    store.append_chunk(finished, 0, b"done", 4)
+    make_old(store._session_path(abandoned), 48)
+
+    store.gc(grace_hours=24)
+
+    assert not os.path.exists(store._session_path(abandoned))
+    assert set(store._hashers) == {active}
+    assert set(store._session_locks) == {active}
+    assert store.append_chunk(active, 6, b" upload", 13)[1] is not None
+
+
+def write_temp(store, data):
+    path = store.temp_path()
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_commit_deduplicates_and_find(tmp_path):
+    db = MemoryDatabase()
+    store = upload_store.UploadStore(db, str(tmp_path))
+    data = b"contract"
+    first = store.commit(write_temp(store, data), sha256(data), len(data), "合同.DOCX")
+    second = store.commit(write_temp(store, data), sha256(data), len(data), "副本.docx")
+    assert first == second == store.blob_path(sha256(data), ".docx")
+    assert os.listdir(store.tmp_dir) == []
+    with open(first, "rb") as f:
+        assert f.read() == data
+
+    assert store.find(sha256(data), ".docx") == first
+    assert store.find(sha256(data), ".doc") is None
+    assert store.find(sha256(b"other"), ".docx") is None
+    assert store.find("../etc/passwd", ".docx") is None
+
+    store.add_reference(first, "合同.DOCX", "comparison", "c1")
+    store.add_reference(second, "副本.docx", "comparison", "c2")
+    names = store.original_names(["c1", "c2"])
+    assert store.display_name(names, "c2", first) == "副本.docx"
+    legacy = "uploads/0f8fad5b-d9cb-469f-a165-70867728950e_会议.mp3"
+    assert store.display_name(names, "c3", legacy) == "会议.mp3"
+
+
+def test_gc_releases_expired_references_after_grace_period(tmp_path):
+    db = MemoryDatabase()
+    store = upload_store.UploadStore(db, str(tmp_path))
+    kept = store.commit(write_temp(store, b"kept"), sha256(b"kept"), 4, "a.docx")
+    expired = store.commit(write_temp(store, b"expired"), sha256(b"expired"), 7, "b.docx")
+    recent = store.commit(write_temp(store, b"recent"), sha256(b"recent"), 6, "c.docx")
+    store.add_reference(kept, "a.docx", "comparison", "c1")
+    old_id = store.add_reference(expired, "b.docx", "comparison", "c2")
+    long_ago = upload_store.datetime.now() - upload_store.timedelta(days=200)
+    db.files[old_id]["created_at"] = long_ago
+    db.blobs[expired]["last_uploaded_at"] = long_ago
+    # recent 没有引用，但仍在宽限期内
+
+    result = store.gc(retention_days=90, grace_hours=24)
+
+    assert result == {"references_released": 1, "blobs_deleted": 1, "bytes_freed": 7}
+    assert os.path.exists(kept) and os.path.exists(recent) and not os.path.exists(expired)
+    assert set(db.blobs) == {kept, recent}
+
+
+def test_session_resume_and_errors(tmp_path):
+    store = upload_store.UploadStore(MemoryDatabase(), str(tmp_path))
+    data = b"0123456789" * 3
+    session = store.start_session(sha256(data), ".MP3")
+    assert session == sha256(data) + ".mp3"
+    assert store.append_chunk(session, 0, data[:10], len(data)) == (10, None)
+
+    # 重复发送的块：返回已收到的字节数
+    with pytest.raises(upload_store.OffsetMismatch) as excinfo:
+        store.append_chunk(session, 0, data[:10], len(data))
+    assert excinfo.value.offset == 10
+    # 服务重启后（新的存储对象、没有增量哈希）从已收到的字节继续
+    store = upload_store.UploadStore(store.db, str(tmp_path))
+    assert store.start_session(sha256(data), ".mp3") == session
+    assert store.session_offset(session) == 10
+    assert store.append_chunk(session, 10, data[10:20], len(data)) == (20, None)
+    received, path = store.append_chunk(session, 20, data[20:], len(data))
+    assert (received, path) == (30, store.blob_path(sha256(data), ".mp3"))
+    assert store.session_offset(session) is None
+
+    bad = store.start_session(sha256(b"expected"), ".mp3")
+    with pytest.raises(upload_store.UploadSessionError, match="哈希"):
+        store.append_chunk(bad, 0, b"tampered", 8)
+    assert store.session_offset(bad) is None
+    with pytest.raises(upload_store.UploadSessionError):
+        store.append_chunk(bad, 0, b"x", 1)
+    with pytest.raises(upload_store.UploadSessionError):
+        store.append_chunk(store.start_session(sha256(b"ab"), ".mp3"), 0, b"abc", 2)
+    with pytest.raises(upload_store.UploadSessionError):
+        store.start_session("not-a-hash", ".mp3")
@@ -0,0 +1,131 @@
+"""
+Test script for the persistent transcription worker (fake backend, no model needed)
+"""
+
+import pytest
+
+import whisper_server
+
+
+@pytest.fixture
+def server():
+    server = whisper_server.WhisperServer("fake", startup_timeout=30, health_interval=0.2)
+    yield server
+    server.close()
+
+
+def test_worker_serves_jobs_without_reloading(server, tmp_path):
+    media = tmp_path / "meeting.mp3"
+    media.write_bytes(b"x" * 10)
+    output = tmp_path / "out" / "raw.txt"
+
+    segments = server.transcribe(str(media), str(output))
+    pid = server.process.pid
+    server.transcribe(str(media))
+
+    assert segments == [{"start": 0.0, "end": 1.0, "text": "meeting.mp3 10"}]
+    assert output.read_text(encoding="utf-8") == "meeting.mp3 10\n"
+    assert server.process.pid == pid
+    health = server.health()
+    assert health["status"] == "ok"
+    assert health["jobs_served"] == 2
+    assert health["restarts"] == 0
+
+
+def test_worker_restarts_after_crash(server, tmp_path):
+    crash = tmp_path / "crash.mp3"
+    crash.write_bytes(b"x")
+    media = tmp_path / "meeting.mp3"
+    media.write_bytes(b"x")
+
+    # 每次尝试都崩溃：重启并重试一次后放弃
+    with pytest.raises(whisper_server.WorkerCrashed):
+        server.transcribe(str(crash))
+    assert server.restarts == 2
+
+    assert server.transcribe(str(media))[0]["text"] == "meeting.mp3 1"
+    assert server.health()["status"] == "ok"
+
+
+def test_health_check_restarts_idle_worker(server, tmp_path):
+    server.start()
+    pid = server.process.pid
+    server.process.kill()
+    server.process.wait()
+
+    # 后台检查发现进程已退出，在下一个请求之前重新启动
+    for _ in range(50):
+        if server.process is not None and server.process.pid != pid and server.health()["status"] == "ok":
+            break
+        server._closed.wait(0.2)
+    assert server.process.pid != pid
+    assert server.restarts == 1
+
+
+def test_job_timeout(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_WHISPER_SECONDS", "5")
+    server = whisper_server.WhisperServer("fake", job_timeout=0.5)
+    media = tmp_path / "meeting.mp3"
+    media.write_bytes(b"x")
+    try:
+        with pytest.raises(whisper_server.WorkerTimeout):
+            server.transcribe(str(media))
+        assert server.restarts == 2
+    finally:
+        server.close()
+
+
+def test_per_job_configs_are_capped(monkeypatch):
+    monkeypatch.setattr(whisper_server, "_servers", whisper_server.OrderedDict())
+    monkeypatch.setenv("WHISPER_MAX_CONFIGS", "2")
+    small = whisper_server.get_server("fake", "small", device="cpu", compute_type="int8", threads=2)
+    assert small.compute_type == "int8"
+    # default 在 CPU 上解析为 int8，与上面是同一组进程
+    assert whisper_server.get_server("fake", "small", device="cpu", threads=2) is small
+    whisper_server.get_server("fake", "base", device="cpu")
+    whisper_server.get_server("fake", "small", device="cpu", threads=2)
+    turbo = whisper_server.get_server("fake", "turbo", device="cpu", compute_type="float32")
+
+    # 超出上限时关闭最久未使用的设置（base），最近用过的 small 保留
+    assert [config[1] for config in whisper_server._servers] == ["small", "turbo"]
+    assert not small._closed.is_set()
+    small.close()
+    turbo.close()
+
+
+def test_leased_servers_are_not_evicted(monkeypatch, tmp_path):
+    monkeypatch.setattr(whisper_server, "_servers", whisper_server.OrderedDict())
+    monkeypatch.setenv("WHISPER_MAX_CONFIGS", "1")
+    media = tmp_path / "meeting.mp3"
+    media.write_bytes(b"x")
+    with whisper_server.leased_server("fake", "small", device="cpu") as small:
+        # 租用期间空闲的 small 不会因切换到其他设置而被关闭
+        base = whisper_server.get_server("fake", "base", device="cpu")
+        assert not small._closed.is_set()
+        assert small.transcribe(str(media))[0]["text"] == "meeting.mp3 1"
+    assert small.leases == 0
+    # 归还后超出上限的旧设置被关闭，关闭后的进程不再自动重启
+    whisper_server.get_server("fake", "turbo", device="cpu")
+    assert small._closed.is_set() and base._closed.is_set()
+    with pytest.raises(whisper_server.WorkerClosed):
+        small.transcribe(str(media))
+    assert small.process is None
+    for slots in whisper_server._servers.values():
+        for server in slots.values():
+            server.close()
+
+
+def test_peek_server_has_no_side_effects(monkeypatch):
+    monkeypatch.setattr(whisper_server, "_servers", whisper_server.OrderedDict())
+    monkeypatch.setenv("WHISPER_MAX_CONFIGS", "1")
+    small = whisper_server.get_server("fake", "small", device="cpu")
+    # 查询其他设置不会创建进程，也不会淘汰已有的 small
+    assert whisper_server.peek_server("fake", "turbo", device="cpu") is None
+    assert whisper_server.peek_server("fake", "small", device="cpu", compute_type="int8") is small
+    assert whisper_server.peek_server("cli") is None
+    assert list(whisper_server._servers) == [whisper_server._server_config("fake", "small", "Chinese", "cpu",
+                                                                           "default", 0)]
+    assert not small._closed.is_set()
+
+    whisper_server.close_all()
+    assert small._closed.is_set() and not whisper_server._servers
@@ -0,0 +1,115 @@
+"""
+转录结果缓存
+Transcription result cache keyed by media content hash
+
+同一段录音再次上传时不重新运行 Whisper：缓存键为媒体文件字节的 SHA-256 加上转录设置
+（模型、语言、设备），命中时直接返回上次生成的原始文本和整理后文档的路径，
+新的 meeting_transcriptions 记录指向这些已有的输出。
+
+条目保存在数据库（transcription_cache）中；输出文件已被删除的条目视为未命中并自动移除。
+命中率：进程内累计的命中/未命中次数，以及每个条目被命中的总次数。
+
+命令行：
+    python transcription_cache.py stats
+    python transcription_cache.py invalidate (--media-hash HASH | --all)
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+def cache_key(media_hash, settings):
+    """媒体内容哈希 + 转录设置的摘要"""
+    text = json.dumps({"media": media_hash, "settings": settings}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranscriptionCache:
+    def __init__(self, db):
+        self.db = db
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, media_hash: str, settings: dict):
+        """
+        查找相同录音、相同设置的转录结果
+
+        Returns:
+            dict: {"raw_text_path", "processed_text_path", ...}，未命中返回 None
+        """
+        key = cache_key(media_hash, settings)
+        entry = self.db.get_transcription_cache(key)
+        if entry and not os.path.exists(entry["raw_text_path"]):
+            # 输出文件已不存在，条目作废
+            self.db.delete_transcription_cache(cache_key=key)
+            entry = None
+        self._count(bool(entry))
+        if not entry:
+            return None
+        self.db.record_transcription_cache_hit(key)
+        return entry
+
+    def put(self, media_hash: str, settings: dict, raw_text_path: str, processed_text_path: str):
+        """记录一次转录的输出（同一键已存在时覆盖）"""
+        self.db.save_transcription_cache(cache_key(media_hash, settings), media_hash,
+                                         json.dumps(settings, sort_keys=True, ensure_ascii=False),
+                                         raw_text_path, processed_text_path)
+
+    def invalidate(self, media_hash=None, raw_text_path=None):
+        """
+        删除缓存条目（不删除输出文件，已有记录仍指向它们）
+
+        Args:
+            media_hash (str): 可选，只删除这段录音的条目
+            raw_text_path (str): 可选，只删除输出为该文件的条目（即某次转录的结果）
+
+        两者都不指定时清空缓存。
+
+        Returns:
+            int: 删除的条目数
+        """
+        return self.db.delete_transcription_cache(media_hash=media_hash, raw_text_path=raw_text_path)
+
+    def stats(self):
+        """进程内命中/未命中次数和命中率，以及数据库中的条目数和累计命中次数"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        stats = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None
+        }
+        stats.update(self.db.get_transcription_cache_stats())
+        return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="转录结果缓存维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="显示缓存条目数和累计命中次数")
+    invalidate_parser = subparsers.add_parser("invalidate", help="删除缓存条目")
+    target = invalidate_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--media-hash", help="只删除这段录音（SHA-256）的条目")
+    target.add_argument("--all", action="store_true", help="清空缓存")
+    args = parser.parse_args()
+
+    cache = TranscriptionCache(Database())
+    if args.command == "stats":
+        print(cache.stats())
+    else:
+        print(f"已删除 {cache.invalidate(media_hash=args.media_hash)} 个条目")
@@ -0,0 +1,290 @@
+"""
+按内容寻址的上传文件存储
+Content-addressed upload store with deduplication and retention GC
+
+上传文件按 SHA-256 只保存一份：uploads/store/{哈希前两位}/{哈希}{扩展名}。
+扩展名保留在文件名中，后续的 .doc 转换、zip 展开和转录都依赖它。
+每次上传在数据库中记录一条引用（upload_files：原始文件名、所属的比较/转录 ID），
+比较和转录记录中的路径指向这个 blob。
+
+垃圾回收（gc）：
+1. 早于保留期（UPLOAD_RETENTION_DAYS）的引用被释放
+2. 没有任何引用、且最近 UPLOAD_GC_GRACE_HOURS 小时内没有被上传过的 blob 被删除
+   （宽限期保护刚上传、尚未写入引用的文件，以及只用于查询的上传）
+
+先哈希后上传（浏览器端计算 SHA-256）：
+1. find：服务器已有相同内容时直接引用，不再传输文件
+2. 否则按内容哈希开启可续传的上传会话，分块按偏移量追加；连接中断后查询已收到的字节数继续上传。
+   会话以 "哈希+扩展名" 命名，保存在 tmp 目录中（服务重启后仍可续传），
+   收齐后校验哈希并存为 blob。同一内容的并发上传共用一个会话（偏移量不符时返回当前偏移量）。
+
+命令行：
+    python upload_store.py gc [--retention-days N] [--grace-hours N]
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+DEFAULT_ROOT = "uploads/store"
+
+# 旧版上传路径 uploads/{uuid}_{原始文件名} 中的前缀
+_LEGACY_PREFIX = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_", re.IGNORECASE)
+
+
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+# 读取已上传部分重新计算哈希时的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadSessionError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadSessionError):
+    """分块的偏移量与会话已收到的字节数不一致"""
+
+    def __init__(self, offset):
+        super().__init__(f"偏移量不一致，已收到 {offset} 字节")
+        self.offset = offset
+
+
+def valid_content_hash(content_hash):
+    return bool(content_hash) and _CONTENT_HASH.match(content_hash) is not None
+
+
+def legacy_original_name(file_path):
+    """从旧版上传路径中恢复原始文件名（没有 uuid 前缀时返回文件名本身）"""
+    return _LEGACY_PREFIX.sub("", os.path.basename(file_path or ""), count=1)
+
+
+class UploadStore:
+    def __init__(self, db, root: str = DEFAULT_ROOT):
+        self.db = db
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        # 只保护下面两个字典和会话文件的创建；各会话的写入和哈希在各自的锁内进行
+        self._sessions_lock = threading.Lock()
+        # 会话 ID -> 该会话的锁
+        self._session_locks = {}
+        # 会话 ID -> (已写入部分的增量哈希, 对应的字节数)；重启后丢失时从磁盘重新计算
+        self._hashers = {}
+
+    def temp_path(self):
+        """返回一个用于流式写入上传内容的临时文件路径（与 blob 在同一文件系统，便于原子移动）"""
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        os.close(fd)
+        return path
+
+    def blob_path(self, content_hash: str, extension: str) -> str:
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}{extension.lower()}")
+
+    def commit(self, tmp_path: str, content_hash: str, size: int, original_filename: str) -> str:
+        """
+        将写好的临时文件存为 blob；内容已存在时丢弃临时文件
+
+        Returns:
+            str: blob 路径
+        """
+        path = self.blob_path(content_hash, os.path.splitext(original_filename)[1])
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        # 同时刷新最近上传时间，防止 GC 在引用写入前删除刚复用的 blob
+        self.db.save_upload_blob(path, content_hash, size)
+        return path
+
+    def find(self, content_hash: str, extension: str):
+        """
+        返回已存储的相同内容的 blob 路径，不存在时返回 None
+
+        找到时刷新最近上传时间，相当于一次不传输内容的上传。
+        """
+        if not valid_content_hash(content_hash):
+            return None
+        path = self.blob_path(content_hash, extension)
+        if not os.path.exists(path):
+            return None
+        self.db.save_upload_blob(path, content_hash, os.path.getsize(path))
+        return path
+
+    def _session_path(self, session_id):
+        return os.path.join(self.tmp_dir, f"{session_id}.part")
+
+    def _session_lock(self, session_id):
+        with self._sessions_lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def _check_session_id(self, session_id):
+        content_hash, extension = os.path.splitext(session_id)
+        if not valid_content_hash(content_hash) or not re.match(r"^\.[0-9a-z]{1,8}$", extension):
+            raise UploadSessionError(f"无效的上传会话: {session_id}")
+        return content_hash, extension
+
+    def start_session(self, content_hash: str, extension: str) -> str:
+        """
+        开启（或继续）内容为 content_hash 的上传会话
+
+        Returns:
+            str: 会话 ID，用 session_offset 查询已收到的字节数
+        """
+        session_id = f"{content_hash}{extension.lower()}"
+        self._check_session_id(session_id)
+        with self._sessions_lock:
+            path = self._session_path(session_id)
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        return session_id
+
+    def session_offset(self, session_id: str):
+        """会话已收到的字节数，会话不存在时返回 None"""
+        self._check_session_id(session_id)
+        path = self._session_path(session_id)
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def append_chunk(self, session_id: str, offset: int, data: bytes, size: int):
+        """
+        在 offset 处追加一块数据；收齐 size 字节后校验哈希并存为 blob
+
+        Args:
+            session_id (str): 会话 ID
+            offset (int): 这一块在文件中的起始位置，必须等于已收到的字节数
+            data (bytes): 数据
+            size (int): 文件总大小
+
+        Returns:
+            tuple: (已收到的字节数, 完成时的 blob 路径，未完成时为 None)
+
+        Raises:
+            OffsetMismatch: 偏移量与已收到的字节数不一致（例如重复发送的块）
+            UploadSessionError: 会话不存在、超出文件大小或内容与哈希不符
+        """
+        content_hash, extension = self._check_session_id(session_id)
+        path = self._session_path(session_id)
+        # 每个会话一把锁：不同会话的写入互不阻塞，服务重启后重新读取大文件计算哈希也只阻塞本会话
+        with self._session_lock(session_id):
+            if not os.path.exists(path):
+                raise UploadSessionError(f"上传会话不存在: {session_id}")
+            received = os.path.getsize(path)
+            if offset != received:
+                raise OffsetMismatch(received)
+            if received + len(data) > size:
+                raise UploadSessionError("数据超出文件大小")
+            hasher, hashed = self._hashers.get(session_id, (None, 0))
+            if hasher is None or hashed != received:
+                hasher, hashed = self._hash_file(path)
+            with open(path, "ab") as f:
+                f.write(data)
+            hasher.update(data)
+            received += len(data)
+            if received < size:
+                self._hashers[session_id] = (hasher, received)
+                return received, None
+            self._hashers.pop(session_id, None)
+            if hasher.hexdigest() != content_hash:
+                os.remove(path)
+                raise UploadSessionError("上传内容与哈希不符")
+            tmp_path = self.temp_path()
+            os.replace(path, tmp_path)
+        return received, self.commit(tmp_path, content_hash, size, session_id)
+
+    @staticmethod
+    def _hash_file(path):
+        hasher = hashlib.sha256()
+        hashed = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                hashed += len(chunk)
+        return hasher, hashed
+
+    def add_reference(self, blob_path: str, original_filename: str, owner_type: str, owner_id: str) -> str:
+        """记录一次上传（原始文件名 + 所属记录），返回上传文件 ID"""
+        file_id = str(uuid.uuid4())
+        self.db.save_upload_file(file_id, blob_path, original_filename, owner_type, owner_id)
+        return file_id
+
+    def original_names(self, owner_ids):
+        """返回 {(所属记录 ID, blob 路径): 原始文件名}"""
+        return {(row["owner_id"], row["blob_path"]): row["original_filename"]
+                for row in self.db.get_upload_files(list(owner_ids))}
+
+    def display_name(self, names, owner_id, file_path):
+        """记录中某个上传文件的显示名称：优先取存储的原始文件名，旧记录从路径中恢复"""
+        if not file_path:
+            return None
+        return names.get((owner_id, file_path)) or legacy_original_name(file_path)
+
+    def gc(self, retention_days: int = 90, grace_hours: int = 24):
+        """
+        释放过期引用并删除没有引用的 blob
+
+        Returns:
+            dict: {"references_released", "blobs_deleted", "bytes_freed"}
+        """
+        now = datetime.now()
+        released = self.db.delete_upload_files_before(now - timedelta(days=retention_days))
+        deleted = 0
+        freed = 0
+        for blob in self.db.get_unreferenced_blobs(now - timedelta(hours=grace_hours)):
+            try:
+                os.remove(blob["blob_path"])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Warning: failed to delete {blob['blob_path']}: {e}")
+                continue
+            self.db.delete_upload_blob(blob["blob_path"])
+            deleted += 1
+            freed += blob["size"] or 0
+        # 清理中断的上传留下的临时文件，以及这些会话的增量哈希；正在写入的会话跳过
+        cutoff = (now - timedelta(hours=grace_hours)).timestamp()
+        with os.scandir(self.tmp_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".part") or entry.stat().st_mtime >= cutoff:
+                    continue
+                session_id = entry.name[:-len(".part")]
+                with self._sessions_lock:
+                    lock = self._session_locks.get(session_id)
+                    if lock is not None and not lock.acquire(blocking=False):
+                        continue
+                    try:
+                        os.remove(entry.path)
+                        self._hashers.pop(session_id, None)
+                        self._session_locks.pop(session_id, None)
+                    finally:
+                        if lock is not None:
+                            lock.release()
+        with self._sessions_lock:
+            # 已完成的会话不再需要它的锁
+            for session_id in list(self._session_locks):
+                if not os.path.exists(self._session_path(session_id)) and not self._session_locks[session_id].locked():
+                    del self._session_locks[session_id]
+                    self._hashers.pop(session_id, None)
+        return {"references_released": released, "blobs_deleted": deleted, "bytes_freed": freed}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="上传文件存储维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    gc_parser = subparsers.add_parser("gc", help="释放过期引用并删除没有引用的文件")
+    gc_parser.add_argument("--retention-days", type=int, default=int(os.getenv("UPLOAD_RETENTION_DAYS", "90")),
+                           help="上传引用的保留天数")
+    gc_parser.add_argument("--grace-hours", type=int, default=int(os.getenv("UPLOAD_GC_GRACE_HOURS", "24")),
+                           help="没有引用的文件在最近一次上传后至少保留的小时数")
+    args = parser.parse_args()
+
+    store = UploadStore(Database(), os.getenv("UPLOAD_STORE_DIR", DEFAULT_ROOT))
+    print(store.gc(args.retention_days, args.grace_hours))
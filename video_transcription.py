@@ -5,15 +5,106 @@ Video transcription module for converting audio/video to text and processing wit
 """
 
 import os
-import sys
 import subprocess
-import argparse
-from pathlib import Path
+from contextlib import ExitStack
 
 from regex import F
 
+import audio_chunking
+import whisper_server
+
+# Whisper 设置（环境变量可覆盖；同时是转录结果缓存键的一部分，修改后旧的缓存结果不再使用）
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "")  # 为空时使用 whisper 命令的默认模型
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "Chinese")
+# auto：启动时检测，有 CUDA GPU 时用 cuda，否则用 cpu
+WHISPER_DEVICE = whisper_server.resolve_device(os.getenv("WHISPER_DEVICE", "auto"))
+# default：GPU 上 float16，CPU 上 int8 量化推理（openai-whisper / whisper 命令没有 int8，使用 float32）
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "default")
+# 每个转录进程的 CPU 线程数，0 为库的默认值（不影响转录结果，不属于缓存键）
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "0"))
+# auto：安装了 faster-whisper / openai-whisper 时使用常驻转录进程，否则每次调用 whisper 命令（cli）
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "auto")
+WHISPER_CLI = os.getenv("WHISPER_CLI", "whisper.exe" if os.name == "nt" else "whisper")
+# 转录任务可以选择的模型
+WHISPER_MODELS = [m for m in os.getenv("WHISPER_MODELS", "tiny,base,small,medium,large-v3,turbo").split(",") if m]
+
+
+def transcription_settings(model=None, compute_type=None):
+    """
+    影响转录结果的设置
+
+    model / compute_type 为单个任务选择的模型和计算精度，为空时使用 WHISPER_MODEL / WHISPER_COMPUTE_TYPE。
+    """
+    backend = whisper_server.resolve_backend(WHISPER_BACKEND)
+    return {"backend": backend, "model": model or WHISPER_MODEL or "default",
+            "language": WHISPER_LANGUAGE, "device": WHISPER_DEVICE,
+            "compute_type": whisper_server.resolve_compute_type(backend, compute_type or WHISPER_COMPUTE_TYPE,
+                                                                WHISPER_DEVICE)}
+
+
+# 长录音按静音切块并行转录：超过 CHUNK_MIN_SECONDS 秒的录音切成约 CHUNK_SECONDS 秒的块，
+# 分给 CHUNK_WORKERS 个转录进程（每个进程各加载一份模型；GPU 上默认 1 个）
+CHUNK_MIN_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_MIN_SECONDS", "600"))
+CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "300"))
+CHUNK_WORKERS = int(os.getenv("TRANSCRIBE_CHUNK_WORKERS",
+                              "1" if WHISPER_DEVICE.startswith("cuda") else str(min(4, max(1, (os.cpu_count() or 2) // 2)))))
+SILENCE_DB = float(os.getenv("TRANSCRIBE_SILENCE_DB", "-35"))
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+FFPROBE_PATH = os.getenv("FFPROBE_PATH", "ffprobe")
+
+
+def peek_server(slot=0, model=None, compute_type=None):
+    """当前设置（或任务选择的模型和精度）对应的、已创建的常驻转录进程；尚未创建或使用 whisper 命令时返回 None"""
+    return whisper_server.peek_server(whisper_server.resolve_backend(WHISPER_BACKEND), model or WHISPER_MODEL,
+                                      WHISPER_LANGUAGE, WHISPER_DEVICE, slot,
+                                      compute_type or WHISPER_COMPUTE_TYPE, WHISPER_THREADS)
 
-# def process(input_file, raw_text_output, processed_text_output):
+
+def leased_server(slot=0, model=None, compute_type=None):
+    """with 块内租用 get_server 返回的进程，期间不会因切换模型被关闭"""
+    return whisper_server.leased_server(whisper_server.resolve_backend(WHISPER_BACKEND), model or WHISPER_MODEL,
+                                        WHISPER_LANGUAGE, WHISPER_DEVICE, slot,
+                                        compute_type or WHISPER_COMPUTE_TYPE, WHISPER_THREADS)
+
+
+def transcribe_segments(input_file, stats=None, duration=None, model=None, compute_type=None):
+    """
+    用常驻转录进程转录，返回带时间戳的片段
+
+    长录音按静音切块并行转录后拼接；短录音或 ffmpeg 不可用时整段转录。
+    duration 为已知的录音时长（秒），未知时用 ffprobe 获取。
+    """
+    if duration is None:
+        duration = audio_chunking.probe_duration(input_file, FFPROBE_PATH)
+    if duration is None or duration < CHUNK_MIN_SECONDS:
+        with leased_server(0, model, compute_type) as server:
+            return server.transcribe(input_file)
+    # 切块（静音检测）期间也持有各个进程，避免被其他任务切换模型时关闭
+    with ExitStack() as stack:
+        servers = [stack.enter_context(leased_server(slot, model, compute_type)) for slot in range(CHUNK_WORKERS)]
+        try:
+            return audio_chunking.transcribe_chunked(
+                input_file, servers, tmp_dir=os.getenv("TRANSCRIBE_CHUNK_DIR"), stats=stats, ffmpeg=FFMPEG_PATH,
+                noise_db=SILENCE_DB, target=CHUNK_SECONDS, max_length=CHUNK_SECONDS * 2
+            )
+        except audio_chunking.ChunkingError as e:
+            print(f"切块失败，整段转录: {e}")
+            return servers[0].transcribe(input_file)
+
+
+def whisper_command(output_dir, input_files, model=None, compute_type=None):
+    """构建 whisper 命令行（设备为启动时检测的结果，CPU 上不使用 fp16）"""
+    settings = transcription_settings(model, compute_type)
+    cmd = [WHISPER_CLI, "--language", WHISPER_LANGUAGE, f"--device={WHISPER_DEVICE}",
+           "--fp16", str(settings["compute_type"] == "float16")]
+    if model or WHISPER_MODEL:
+        cmd += ["--model", model or WHISPER_MODEL]
+    if WHISPER_THREADS:
+        cmd += ["--threads", str(WHISPER_THREADS)]
+    return cmd + ["--output_dir", output_dir, "--output_format", "txt"] + list(input_files)
+
+
+# def process(input_file, raw_text_output, processed_text_output, duration=None):
 #     """
 #     Transcribe audio/video file and process the text
     
@@ -65,112 +156,7 @@ from regex import F
 
 
 
-def find_mp4_files(input_dir):
-    """
-    遍历输入目录，查找所有MP4文件
-    
-    Args:
-        input_dir (str): 输入目录路径
-        
-    Returns:
-        list: MP4文件路径列表
-    """
-    mp4_files = []
-    input_path = Path(input_dir)
-    
-    if not input_path.exists():
-        print(f"错误: 输入目录不存在: {input_dir}")
-        return mp4_files
-    
-    # 递归查找所有mp4文件
-    for file_path in input_path.rglob("*.mp4"):
-        mp4_files.append(str(file_path.absolute()))
-    
-    # 也查找MP4大写扩展名
-    # for file_path in input_path.rglob("*.MP4"):
-    #     mp4_files.append(str(file_path.absolute()))
-    
-    return mp4_files
-
-
-def prepare_video_files(video_paths):
-    """
-    准备视频文件：重命名为简化名称
-    
-    Args:
-        video_paths (list): 视频文件路径列表
-        
-    Returns:
-        list: 包含(原始路径, 临时路径, 原始文件名, 简化文件名)的元组列表
-    """
-    file_info_list = []
-    
-    for video_path in video_paths:
-        # 获取原始文件信息
-        video_dir = os.path.dirname(video_path)
-        original_filename = os.path.basename(video_path)
-        filename_without_ext = os.path.splitext(original_filename)[0]
-        file_extension = os.path.splitext(original_filename)[1]
-        
-        # 提取_之前的字符串作为字符串1
-        if '_' in filename_without_ext:
-            string1 = filename_without_ext.split('_')[0]
-        else:
-            string1 = filename_without_ext
-        
-        # 构建临时文件名
-        temp_filename = string1 + file_extension
-        temp_video_path = os.path.join(video_dir, temp_filename)
-        
-        file_info_list.append((video_path, temp_video_path, original_filename, temp_filename, filename_without_ext, string1))
-    
-    return file_info_list
-
-
-def rename_files_for_processing(file_info_list):
-    """
-    将文件重命名为简化名称以便处理
-    
-    Args:
-        file_info_list (list): 文件信息列表
-        
-    Returns:
-        list: 成功重命名的文件信息列表
-    """
-    renamed_files = []
-    
-    for original_path, temp_path, original_name, temp_name, _, _ in file_info_list:
-        try:
-            if original_path != temp_path:
-                # 如果临时文件已存在，先删除
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                os.rename(original_path, temp_path)
-                print(f"文件已重命名: {original_name} -> {temp_name}")
-            renamed_files.append((original_path, temp_path, original_name, temp_name))
-        except Exception as e:
-            print(f"重命名失败: {original_name} - {str(e)}")
-    
-    return renamed_files
-
-
-def restore_original_names(renamed_files):
-    """
-    恢复文件的原始名称
-    
-    Args:
-        renamed_files (list): 已重命名的文件信息列表
-    """
-    for original_path, temp_path, original_name, temp_name in renamed_files:
-        try:
-            if os.path.exists(temp_path) and temp_path != original_path:
-                os.rename(temp_path, original_path)
-                print(f"文件名已恢复: {temp_name} -> {original_name}")
-        except Exception as e:
-            print(f"恢复文件名失败: {temp_name} - {str(e)}")
-
-
-def process(input_file, raw_text_output, processed_text_output):
+def process(input_file, raw_text_output, processed_text_output, duration=None, model=None, compute_type=None):
     #     """
     #     Transcribe audio/video file and process the text
         
@@ -190,12 +176,26 @@ def process(input_file, raw_text_output, processed_text_output):
     # 将input_filename按. 进行拆分为文件名称和扩展名
     input_name, input_extension = os.path.splitext(input_filename)
 
+    # 常驻转录进程不再为每个文件加载一次模型；文本写入 raw_text_output，带时间戳的片段写入同名 .srt
+    if whisper_server.resolve_backend(WHISPER_BACKEND) != "cli":
+        stats = {}
+        try:
+            segments = transcribe_segments(input_file, stats, duration, model, compute_type)
+        except whisper_server.WorkerError as e:
+            print(f"✗ 转录失败: {e}")
+            return None
+        whisper_server.write_transcript(segments, raw_text_output)
+        audio_chunking.write_srt(segments, os.path.splitext(raw_text_output)[0] + ".srt")
+        if stats:
+            print(f"✓ 分 {stats['chunks']} 块转录，跳过静音 {stats['skipped_seconds']}s / {stats['duration']}s")
+        return True
+
     # 将raw_text_output拆分为路径和文件名
     raw_text_path, raw_text_filename = os.path.split(raw_text_output)
 
-    if transcribe_video(input_file, raw_text_path) == True:
+    if transcribe_video(input_file, raw_text_path, model, compute_type) == True:
         # 将结果写入raw_text_output
-        write_text_to_file(raw_text_path + "\\" + input_name + ".txt", raw_text_output)
+        write_text_to_file(os.path.join(raw_text_path, input_name + ".txt"), raw_text_output)
 
         # process_text(raw_text_path, processed_text_path)
 
@@ -235,21 +235,15 @@ def write_text_to_file(source_path, destination_path):
         return False
 
 
-def transcribe_video(input_file, output_dir):
+def transcribe_video(input_file, output_dir, model=None, compute_type=None):
     try:
         # 构建whisper命令，包含所有临时文件路径
         temp_paths = [input_file]
         
-        cmd = [
-            "whisper.exe",
-            "--language", "Chinese",
-            "--device=cuda",
-            "--output_dir", output_dir,
-            "--output_format", "txt"
-        ] + temp_paths
+        cmd = whisper_command(output_dir, temp_paths, model, compute_type)
         
         print(f"执行批量转录命令，包含 {len(temp_paths)} 个文件")
-        print(f"命令: whisper.exe --language Chinese --device=cuda --output_dir {output_dir} --output_format txt [{input_file}]")
+        print(f"命令: {' '.join(cmd)}")
         
         # 执行whisper命令
         result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
@@ -264,162 +258,17 @@ def transcribe_video(input_file, output_dir):
         return True
         
     except FileNotFoundError:
-        print("错误: 找不到whisper.exe，请确保Whisper已正确安装并在PATH中")
+        print(f"错误: 找不到{WHISPER_CLI}，请确保Whisper已正确安装并在PATH中（或设置 WHISPER_CLI）")
         return False
     except Exception as e:
         print(f"批量转录过程中发生错误: {str(e)}")
         return False
-    finally:
-        # 恢复所有文件的原始名称
-        return True
-
-
-def transcribe_video_batch(video_paths, output_dir):
-    """
-    批量转录视频文件（一次处理多个文件）
-    
-    Args:
-        video_paths (list): 视频文件路径列表
-        output_dir (str): 输出目录路径
-        
-    Returns:
-        tuple: (成功数量, 失败数量)
-    """
-    if not video_paths:
-        return 0, 0
-    
-    print(f"\n开始批量处理 {len(video_paths)} 个文件...")
-    
-    # 准备文件信息
-    file_info_list = prepare_video_files(video_paths)
-    
-    # 重命名文件
-    renamed_files = rename_files_for_processing(file_info_list)
-    
-    try:
-        # 构建whisper命令，包含所有临时文件路径
-        temp_paths = [temp_path for _, temp_path, _, _ in renamed_files]
-        
-        cmd = [
-            "whisper.exe",
-            "--language", "Chinese",
-            "--device=cuda",
-            "--output_dir", output_dir,
-            "--output_format", "txt"
-        ] + temp_paths
-        
-        print(f"执行批量转录命令，包含 {len(temp_paths)} 个文件")
-        print(f"命令: whisper.exe --language Chinese --device=cuda --output_dir {output_dir} --output_format txt [文件列表]")
-        
-        # 执行whisper命令
-        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-        
-        if result.returncode != 0:
-            print(f"✗ 批量转录失败")
-            print(f"错误信息: {result.stderr}")
-            return 0, len(video_paths)
-        
-        print(f"✓ 批量转录成功")
-        
-        # 重命名输出的txt文件
-        success_count = 0
-        for original_path, temp_path, original_name, temp_name in renamed_files:
-            try:
-                # 获取文件信息
-                filename_without_ext = os.path.splitext(original_name)[0]
-                temp_name_without_ext = os.path.splitext(temp_name)[0]
-                
-                whisper_output_txt = os.path.join(output_dir, temp_name_without_ext + ".txt")
-                final_output_txt = os.path.join(output_dir, filename_without_ext + ".txt")
-                
-                if os.path.exists(whisper_output_txt):
-                    if whisper_output_txt != final_output_txt:
-                        # 如果目标文件已存在，先删除
-                        if os.path.exists(final_output_txt):
-                            os.remove(final_output_txt)
-                        os.rename(whisper_output_txt, final_output_txt)
-                        print(f"输出文件已重命名: {temp_name_without_ext}.txt -> {filename_without_ext}.txt")
-                    success_count += 1
-                else:
-                    print(f"警告: 未找到预期的输出文件: {whisper_output_txt}")
-            except Exception as e:
-                print(f"重命名输出文件失败: {original_name} - {str(e)}")
-        
-        return success_count, len(video_paths) - success_count
-        
-    except FileNotFoundError:
-        print("错误: 找不到whisper.exe，请确保Whisper已正确安装并在PATH中")
-        return 0, len(video_paths)
-    except Exception as e:
-        print(f"批量转录过程中发生错误: {str(e)}")
-        return 0, len(video_paths)
-    finally:
-        # 恢复所有文件的原始名称
-        restore_original_names(renamed_files)
 
 
 def main():
-    """主函数"""
-    parser = argparse.ArgumentParser(description="批量转录MP4视频文件中的音频为文本")
-    parser.add_argument("input_dir", help="输入视频文件所在的文件夹")
-    parser.add_argument("output_dir", help="输出文本文件的文件夹")
-    parser.add_argument("--verbose", "-v", action="store_true", help="显示详细信息")
-    
-    args = parser.parse_args()
-    
-    input_dir = args.input_dir
-    output_dir = args.output_dir
-    
-    # 检查输入目录
-    if not os.path.exists(input_dir):
-        print(f"错误: 输入目录不存在: {input_dir}")
-        sys.exit(1)
-    
-    # 创建输出目录
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 查找所有MP4文件
-    print(f"正在扫描目录: {input_dir}")
-    mp4_files = find_mp4_files(input_dir)
-    
-    if not mp4_files:
-        print("未找到任何MP4文件")
-        sys.exit(0)
-    
-    print(f"找到 {len(mp4_files)} 个MP4文件")
-    
-    if args.verbose:
-        for file_path in mp4_files:
-            print(f"  - {file_path}")
-    
-    # 批量转录 - 每50个文件为一组
-    success_count = 0
-    total_count = len(mp4_files)
-    batch_size = 50
-    
-    # 将文件分组处理
-    for i in range(0, total_count, batch_size):
-        batch_files = mp4_files[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (total_count + batch_size - 1) // batch_size
-        
-        print(f"\n=== 处理第 {batch_num}/{total_batches} 批次 ({len(batch_files)} 个文件) ===")
-        
-        if args.verbose:
-            for j, file_path in enumerate(batch_files):
-                print(f"  [{i+j+1}/{total_count}] {os.path.basename(file_path)}")
-        
-        # 批量处理当前组的文件
-        batch_success, batch_failed = transcribe_video_batch(batch_files, output_dir)
-        success_count += batch_success
-        
-        print(f"第 {batch_num} 批次完成: 成功 {batch_success}/{len(batch_files)}, 失败 {batch_failed}/{len(batch_files)}")
-    
-    # 显示结果统计
-    print(f"\n转录完成!")
-    print(f"成功: {success_count}/{total_count}")
-    print(f"失败: {total_count - success_count}/{total_count}")
-    print(f"输出目录: {output_dir}")
+    """主函数：批量转录文件夹中的音视频文件（见 batch_transcribe.py，可中断后继续）"""
+    import batch_transcribe
+    batch_transcribe.main()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,645 @@
+"""
+常驻的 Whisper 转录进程
+Persistent Whisper model server for transcription jobs
+
+每次上传都启动一次 whisper.exe 时，模型加载占了短会议转录的大部分时间。
+这里启动一个长期运行的子进程，只加载一次模型，之后通过 stdin/stdout 上的 JSON 行协议逐个处理转录请求：
+- 健康检查：空闲时发送 ping，检查进程是否存活、能否应答
+- 自动重启：进程崩溃或请求超时后杀掉并重新启动（重新加载模型），然后重试一次；
+  后台线程定期检查，空闲时崩溃的进程也会被重启，下一次请求不用等待模型加载
+- 后端：faster-whisper、openai-whisper，或测试用的 fake（不加载模型）
+- 设备：auto 在启动时检测是否有可用的 CUDA GPU，没有时使用 CPU；
+  CPU 上默认 int8 量化推理（faster-whisper），并可设置每个进程的线程数
+
+子进程：python whisper_server.py serve --backend NAME [--model M] [--language L] [--device D]
+        [--compute-type T] [--threads N]
+性能测试：python whisper_server.py benchmark FILE --configs small:int8 small:float32 turbo:int8
+"""
+
+import atexit
+import importlib.util
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+# 模型库只在子进程中导入（torch 等依赖很大），这里只检查是否安装
+HAS_FASTER_WHISPER = importlib.util.find_spec("faster_whisper") is not None
+HAS_WHISPER = importlib.util.find_spec("whisper") is not None
+
+BACKENDS = ("faster-whisper", "whisper", "fake")
+
+DEFAULT_MODEL = "turbo"
+
+# 计算精度（faster-whisper 的 compute_type）；default 按设备选择：GPU 上 float16，CPU 上 int8
+COMPUTE_TYPES = ("default", "int8", "int8_float16", "int8_float32", "float16", "float32")
+
+# faster-whisper 只接受语言代码
+LANGUAGE_CODES = {"chinese": "zh", "english": "en", "japanese": "ja", "korean": "ko"}
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerCrashed(WorkerError):
+    pass
+
+
+class WorkerTimeout(WorkerError):
+    pass
+
+
+class WorkerClosed(WorkerError):
+    pass
+
+
+def resolve_backend(name):
+    """auto 依次选择 faster-whisper、openai-whisper；都未安装时返回 "cli"（每次调用 whisper.exe）"""
+    if name != "auto":
+        return name
+    if HAS_FASTER_WHISPER:
+        return "faster-whisper"
+    if HAS_WHISPER:
+        return "whisper"
+    return "cli"
+
+
+_detected_device = None
+
+
+def _cuda_available():
+    # faster-whisper 依赖的 ctranslate2 能直接报告 GPU 数量（导入很快）
+    if importlib.util.find_spec("ctranslate2") is not None:
+        try:
+            import ctranslate2
+            return ctranslate2.get_cuda_device_count() > 0
+        except (ImportError, RuntimeError, OSError):
+            return False
+    # 不在主进程里导入 torch（很慢、占内存）；nvidia-smi 能列出 GPU 即认为 CUDA 可用
+    try:
+        result = subprocess.run(["nvidia-smi", "-L"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0 and "GPU" in result.stdout
+
+
+def detect_device():
+    """检测可用的推理设备：有 CUDA GPU 时返回 "cuda"，否则 "cpu"（只检测一次）"""
+    global _detected_device
+    if _detected_device is None:
+        _detected_device = "cuda" if _cuda_available() else "cpu"
+    return _detected_device
+
+
+def resolve_device(device):
+    """auto（或空）解析为检测到的设备"""
+    return detect_device() if device in ("", "auto", None) else device
+
+
+def resolve_compute_type(backend, compute_type, device):
+    """
+    把 default 解析为设备对应的计算精度
+
+    openai-whisper（以及 whisper 命令）没有量化推理，只有 float16 / float32；
+    GPU 上使用 float16，CPU 上使用 float32。
+    """
+    if compute_type not in COMPUTE_TYPES:
+        raise ValueError(f"未知的计算精度: {compute_type}")
+    gpu = device.startswith("cuda")
+    if backend in ("whisper", "cli"):
+        if compute_type in ("float16", "float32"):
+            return compute_type
+        return "float16" if gpu and compute_type in ("default", "int8_float16") else "float32"
+    if compute_type == "default":
+        return "float16" if gpu else "int8"
+    return compute_type
+
+
+def language_code(language):
+    return LANGUAGE_CODES.get(language.lower(), language.lower()) if language else None
+
+
+class FasterWhisperBackend:
+    def __init__(self, model, language, device, compute_type="default", threads=0):
+        from faster_whisper import WhisperModel
+        # cpu_threads 为 0 时使用 ctranslate2 的默认线程数
+        self.model = WhisperModel(model or DEFAULT_MODEL, device=device, compute_type=compute_type,
+                                  cpu_threads=threads)
+        self.language = language_code(language)
+
+    def transcribe(self, input_file):
+        segments, _ = self.model.transcribe(input_file, language=self.language)
+        return [{"start": s.start, "end": s.end, "text": s.text.strip()} for s in segments]
+
+
+class OpenAIWhisperBackend:
+    def __init__(self, model, language, device, compute_type="float32", threads=0):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model or DEFAULT_MODEL, device=device)
+        self.language = language
+        self.fp16 = compute_type == "float16"
+
+    def transcribe(self, input_file):
+        result = self.model.transcribe(input_file, language=self.language, fp16=self.fp16)
+        return [{"start": s["start"], "end": s["end"], "text": s["text"].strip()} for s in result["segments"]]
+
+
+class FakeBackend:
+    """
+    测试用后端：不加载模型，按文件名和大小生成确定的转录结果
+
+    FAKE_WHISPER_LOAD_SECONDS / FAKE_WHISPER_SECONDS 模拟模型加载和转录耗时；
+    文件名包含 "crash" 时模拟进程崩溃。
+    """
+
+    def __init__(self, model, language, device, compute_type="default", threads=0):
+        time.sleep(float(os.getenv("FAKE_WHISPER_LOAD_SECONDS", "0")))
+
+    def transcribe(self, input_file):
+        name = os.path.basename(input_file)
+        if "crash" in name:
+            os._exit(3)
+        time.sleep(float(os.getenv("FAKE_WHISPER_SECONDS", "0")))
+        return [{"start": 0.0, "end": 1.0, "text": f"{name} {os.path.getsize(input_file)}"}]
+
+
+_BACKEND_CLASSES = {
+    "faster-whisper": FasterWhisperBackend,
+    "whisper": OpenAIWhisperBackend,
+    "fake": FakeBackend,
+}
+
+
+def write_transcript(segments, output_path):
+    """按 whisper 的 txt 输出格式写入：每个片段一行"""
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for segment in segments:
+            f.write(segment["text"] + "\n")
+
+
+def serve(backend, model, language, device, compute_type="default", threads=0):
+    """子进程主循环：加载模型，然后逐行读取请求并应答"""
+    # 协议使用原来的 stdout；模型库的输出（包括 C 层的输出）改写到 stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdin.reconfigure(encoding="utf-8")
+
+    def reply(message):
+        protocol.write(json.dumps(message, ensure_ascii=False) + "\n")
+        protocol.flush()
+
+    started = time.monotonic()
+    try:
+        engine = _BACKEND_CLASSES[backend](model, language, device, compute_type, threads)
+    except Exception as e:
+        reply({"op": "ready", "ok": False, "error": f"{type(e).__name__}: {e}"})
+        return
+    reply({"op": "ready", "ok": True, "load_seconds": round(time.monotonic() - started, 3)})
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request["op"] == "ping":
+            reply({"id": request["id"], "ok": True})
+            continue
+        started = time.monotonic()
+        try:
+            segments = engine.transcribe(request["input"])
+            if request.get("output"):
+                write_transcript(segments, request["output"])
+        except Exception as e:
+            reply({"id": request["id"], "ok": False, "error": f"{type(e).__name__}: {e}"})
+            continue
+        reply({"id": request["id"], "ok": True, "segments": segments,
+               "seconds": round(time.monotonic() - started, 3)})
+
+
+class WhisperServer:
+    def __init__(self, backend: str = "fake", model: str = "", language: str = "Chinese", device: str = "auto",
+                 compute_type: str = "default", threads: int = 0, startup_timeout: float = 600,
+                 job_timeout: Optional[float] = None, health_interval: float = 30):
+        """
+        Args:
+            backend (str): faster-whisper / whisper / fake
+            model (str): 模型名（为空使用 DEFAULT_MODEL）
+            language (str): 转录语言
+            device (str): cuda / cpu / auto（检测可用的设备）
+            compute_type (str): COMPUTE_TYPES 之一，default 按设备选择
+            threads (int): 子进程推理使用的 CPU 线程数，0 为库的默认值
+            startup_timeout (float): 等待模型加载的最长时间（秒）
+            job_timeout (float): 单个转录请求的最长时间（秒），None 表示不限
+            health_interval (float): 后台检查进程是否存活的间隔（秒）
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的转录后端: {backend}")
+        self.backend = backend
+        self.model = model
+        self.language = language
+        self.device = resolve_device(device)
+        self.compute_type = resolve_compute_type(backend, compute_type, self.device)
+        self.threads = threads
+        self.startup_timeout = startup_timeout
+        self.job_timeout = job_timeout
+        self.health_interval = health_interval
+        self.process = None
+        self.responses = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._closed = threading.Event()
+        # 正在使用该进程的调用方数（由 _servers_lock 保护），大于 0 时 get_server 不会关闭它
+        self.leases = 0
+        self.started_at = None
+        self.load_seconds = None
+        self.jobs_served = 0
+        self.restarts = 0
+        self.last_error = None
+        self._monitor = threading.Thread(target=self._watch, name="whisper-health", daemon=True)
+        self._monitor.start()
+
+    # ---- 进程管理（调用方持有 self._lock） ----
+
+    def _start(self):
+        cmd = [sys.executable, os.path.abspath(__file__), "serve", "--backend", self.backend,
+               "--model", self.model, "--language", self.language, "--device", self.device,
+               "--compute-type", self.compute_type, "--threads", str(self.threads)]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, encoding="utf-8", bufsize=1)
+        # 读取线程把应答放进队列，等待应答时可以同时检查超时和进程是否存活
+        self.responses = queue.Queue()
+        threading.Thread(target=self._read, args=(self.process, self.responses), daemon=True).start()
+        message = self._receive("ready", self.startup_timeout)
+        if not message["ok"]:
+            self._stop()
+            raise WorkerError(f"模型加载失败: {message['error']}")
+        self.started_at = time.time()
+        self.load_seconds = message["load_seconds"]
+
+    @staticmethod
+    def _read(process, responses):
+        try:
+            for line in process.stdout:
+                responses.put(json.loads(line))
+        except (OSError, ValueError):
+            # 进程被杀掉、管道已关闭
+            pass
+
+    def _stop(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdin.close()
+            self.process.stdout.close()
+        self.process = None
+        self.started_at = None
+
+    def _alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def _receive(self, request_id, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                message = self.responses.get(timeout=0.2)
+            except queue.Empty:
+                if not self._alive():
+                    raise WorkerCrashed(f"转录进程已退出（返回码 {self.process.poll()}）")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise WorkerTimeout(f"转录进程超过 {timeout}s 未应答")
+                continue
+            # 忽略超时后才到达的旧应答
+            if message.get("id", message.get("op")) == request_id:
+                return message
+
+    def _call(self, request, timeout):
+        # 已关闭（例如被 get_server 淘汰）的进程不再重启，否则会留下没有健康检查、也不在 _servers 中的进程
+        if self._closed.is_set():
+            raise WorkerClosed("转录进程已关闭")
+        if not self._alive():
+            if self.process is not None:
+                self.restarts += 1
+            self._stop()
+            self._start()
+        self._next_id += 1
+        request["id"] = self._next_id
+        try:
+            self.process.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            raise WorkerCrashed("转录进程已退出")
+        return self._receive(self._next_id, timeout)
+
+    # ---- 对外接口 ----
+
+    def start(self):
+        """启动进程并加载模型（已在运行时直接返回）"""
+        with self._lock:
+            if self._closed.is_set():
+                raise WorkerClosed("转录进程已关闭")
+            if not self._alive():
+                self._stop()
+                self._start()
+
+    def transcribe(self, input_file: str, output_path: Optional[str] = None):
+        """
+        转录一个文件
+
+        Args:
+            input_file (str): 音频/视频文件路径
+            output_path (str): 可选，写入转录文本（每个片段一行）
+
+        Returns:
+            list: 片段 [{"start", "end", "text"}]
+
+        Raises:
+            WorkerError: 模型加载失败、转录出错，或进程崩溃/超时且重启后重试仍失败
+            WorkerClosed: 进程已关闭
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    response = self._call({"op": "transcribe", "input": os.path.abspath(input_file),
+                                           "output": os.path.abspath(output_path) if output_path else None},
+                                          self.job_timeout)
+                    break
+                except (WorkerCrashed, WorkerTimeout) as e:
+                    # 崩溃或卡住的进程被杀掉，下次调用时重新启动；重试一次
+                    self.last_error = str(e)
+                    self.restarts += 1
+                    self._stop()
+                    if attempt == 1:
+                        raise
+            if not response["ok"]:
+                self.last_error = response["error"]
+                raise WorkerError(f"转录失败: {input_file}: {response['error']}")
+            self.jobs_served += 1
+            return response["segments"]
+
+    def health(self, timeout: float = 5):
+        """
+        Returns:
+            dict: status 为 ok（空闲且能应答 ping）、busy（正在转录）、stopped（未启动）或 unhealthy
+        """
+        status = "busy"
+        if self._lock.acquire(blocking=False):
+            try:
+                if not self._alive():
+                    status = "stopped"
+                else:
+                    try:
+                        self._call({"op": "ping"}, timeout)
+                        status = "ok"
+                    except WorkerError as e:
+                        self.last_error = str(e)
+                        status = "unhealthy"
+            finally:
+                self._lock.release()
+        return {
+            "status": status,
+            "backend": self.backend,
+            "model": self.model or DEFAULT_MODEL,
+            "device": self.device,
+            "compute_type": self.compute_type,
+            "threads": self.threads,
+            "pid": self.process.pid if self.process is not None else None,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else None,
+            "load_seconds": self.load_seconds,
+            "jobs_served": self.jobs_served,
+            "restarts": self.restarts,
+            "last_error": self.last_error
+        }
+
+    def _watch(self):
+        # 空闲时崩溃的进程立即重启，让模型在下一个请求到来之前加载好
+        while not self._closed.wait(self.health_interval):
+            if not self._lock.acquire(blocking=False):
+                continue
+            try:
+                if self.process is not None and not self._alive():
+                    self.last_error = f"转录进程已退出（返回码 {self.process.poll()}）"
+                    self.restarts += 1
+                    self._stop()
+                    self._start()
+            except WorkerError as e:
+                self.last_error = str(e)
+            finally:
+                self._lock.release()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._stop()
+
+
+# 设置 -> {slot: WhisperServer}，按最近使用排序；每种设置各自加载一份模型
+_servers = OrderedDict()
+_servers_lock = threading.Lock()
+
+
+def _server_config(backend, model, language, device, compute_type, threads):
+    device = resolve_device(device)
+    return backend, model, language, device, resolve_compute_type(backend, compute_type, device), threads
+
+
+def get_server(backend, model="", language="Chinese", device="auto", slot=0, compute_type="default", threads=0,
+               lease=False):
+    """
+    返回进程内共享的转录进程（按设置区分，首次使用时创建，尚未启动）
+
+    slot 区分同一设置下的多个进程（并行转录长录音的各块）。
+    backend 为 "cli" 时返回 None，调用方使用 whisper.exe。
+    按任务选择模型和精度时，同时保留的设置数不超过 WHISPER_MAX_CONFIGS，
+    超出时关闭最久未使用、且没有被租用或正在转录的那组进程，释放模型占用的内存。
+    lease 为 True 时租用返回的进程，使用完后必须调用 release_server；持有进程较长时间的调用方应使用 leased_server。
+    """
+    if backend == "cli":
+        return None
+    config = _server_config(backend, model, language, device, compute_type, threads)
+    evicted = []
+    with _servers_lock:
+        slots = _servers.setdefault(config, {})
+        _servers.move_to_end(config)
+        server = slots.get(slot)
+        if server is None:
+            server = WhisperServer(*config,
+                                   startup_timeout=float(os.getenv("WHISPER_STARTUP_TIMEOUT", "600")),
+                                   job_timeout=float(os.getenv("WHISPER_JOB_TIMEOUT", "0")) or None,
+                                   health_interval=float(os.getenv("WHISPER_HEALTH_INTERVAL", "30")))
+            slots[slot] = server
+        if lease:
+            server.leases += 1
+        max_configs = max(1, int(os.getenv("WHISPER_MAX_CONFIGS", "2")))
+        for old_config in list(_servers)[:-1]:
+            if len(_servers) <= max_configs:
+                break
+            if any(old.leases or old._lock.locked() for old in _servers[old_config].values()):
+                continue
+            evicted.extend(_servers.pop(old_config).values())
+    for old in evicted:
+        old.close()
+    return server
+
+
+def peek_server(backend, model="", language="Chinese", device="auto", slot=0, compute_type="default", threads=0):
+    """
+    返回已创建的转录进程，不存在时返回 None
+
+    与 get_server 不同，不创建进程、不改变最近使用顺序，也不会淘汰其他设置的进程，
+    用于健康检查等只读查询。
+    """
+    if backend == "cli":
+        return None
+    config = _server_config(backend, model, language, device, compute_type, threads)
+    with _servers_lock:
+        return _servers.get(config, {}).get(slot)
+
+
+def close_all():
+    """关闭全部转录进程（进程退出时调用）"""
+    with _servers_lock:
+        servers = [server for slots in _servers.values() for server in slots.values()]
+        _servers.clear()
+    for server in servers:
+        server.close()
+
+
+# 只注册一次；被淘汰的进程在淘汰时已关闭，不再被 atexit 引用
+atexit.register(close_all)
+
+
+def release_server(server):
+    """归还 get_server(lease=True) 租用的进程"""
+    if server is not None:
+        with _servers_lock:
+            server.leases -= 1
+
+
+@contextmanager
+def leased_server(*args, **kwargs):
+    """在 with 块内租用 get_server 返回的进程（参数同 get_server），期间不会被淘汰关闭"""
+    server = get_server(*args, lease=True, **kwargs)
+    try:
+        yield server
+    finally:
+        release_server(server)
+
+
+def benchmark(file_path, configs, backend="auto", language="Chinese", device="auto", threads=0, duration=None):
+    """
+    用每种 模型:精度 设置转录同一个文件，返回实时率（RTF = 转录耗时 / 录音时长，越小越快）
+
+    Args:
+        file_path (str): 音频/视频文件
+        configs (list): [(模型, 计算精度)]
+        duration (float): 录音时长（秒），未知时用 ffprobe 获取，失败时取最后一个片段的结束时间
+
+    Returns:
+        list: 每种设置一个 dict：model, compute_type, device, threads, load_seconds, seconds, rtf, segments
+    """
+    backend = resolve_backend(backend)
+    if backend == "cli":
+        raise WorkerError("未安装 faster-whisper 或 openai-whisper")
+    if duration is None:
+        from audio_chunking import probe_duration
+        duration = probe_duration(file_path, os.getenv("FFPROBE_PATH", "ffprobe"))
+    results = []
+    for model, compute_type in configs:
+        server = WhisperServer(backend, model, language, device, compute_type, threads)
+        try:
+            server.start()
+            started = time.monotonic()
+            segments = server.transcribe(file_path)
+            seconds = time.monotonic() - started
+        finally:
+            server.close()
+        audio_seconds = duration or (segments[-1]["end"] if segments else 0)
+        results.append({
+            "model": model or DEFAULT_MODEL,
+            "compute_type": server.compute_type,
+            "device": server.device,
+            "threads": threads,
+            "load_seconds": server.load_seconds,
+            "seconds": round(seconds, 2),
+            "rtf": round(seconds / audio_seconds, 3) if audio_seconds else None,
+            "segments": len(segments)
+        })
+    return results
+
+
+def _parse_config(value):
+    model, _, compute_type = value.partition(":")
+    return model, compute_type or "default"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="常驻的 Whisper 转录进程")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="加载模型并处理 stdin 上的请求（由 WhisperServer 启动）")
+    serve_parser.add_argument("--backend", choices=BACKENDS, required=True)
+    serve_parser.add_argument("--model", default="")
+    serve_parser.add_argument("--language", default="Chinese")
+    serve_parser.add_argument("--device", default="cpu")
+    serve_parser.add_argument("--compute-type", choices=COMPUTE_TYPES, default="default")
+    serve_parser.add_argument("--threads", type=int, default=0)
+    transcribe_parser = subparsers.add_parser("transcribe", help="启动一个转录进程并转录文件（调试用）")
+    transcribe_parser.add_argument("files", nargs="+")
+    transcribe_parser.add_argument("--backend", default="auto")
+    transcribe_parser.add_argument("--model", default="")
+    transcribe_parser.add_argument("--language", default="Chinese")
+    transcribe_parser.add_argument("--device", default="auto")
+    transcribe_parser.add_argument("--compute-type", choices=COMPUTE_TYPES, default="default")
+    transcribe_parser.add_argument("--threads", type=int, default=0)
+    benchmark_parser = subparsers.add_parser("benchmark", help="比较不同模型和精度的实时率（RTF）")
+    benchmark_parser.add_argument("file")
+    benchmark_parser.add_argument("--configs", nargs="+", type=_parse_config, default=[(DEFAULT_MODEL, "default")],
+                                  help="模型:精度，例如 small:int8 turbo:float32（精度省略时按设备选择）")
+    benchmark_parser.add_argument("--backend", default="auto")
+    benchmark_parser.add_argument("--language", default="Chinese")
+    benchmark_parser.add_argument("--device", default="auto")
+    benchmark_parser.add_argument("--threads", type=int, default=0)
+    benchmark_parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.backend, args.model, args.language, args.device, args.compute_type, args.threads)
+    elif args.command == "benchmark":
+        try:
+            results = benchmark(args.file, args.configs, args.backend, args.language, args.device, args.threads)
+        except WorkerError as e:
+            sys.exit(str(e))
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            print(f"{'model':<12}{'compute_type':<14}{'device':<8}{'threads':>8}{'load(s)':>9}{'run(s)':>9}{'RTF':>8}")
+            for r in results:
+                rtf = f"{r['rtf']:.3f}" if r["rtf"] is not None else "-"
+                print(f"{r['model']:<12}{r['compute_type']:<14}{r['device']:<8}{r['threads']:>8}"
+                      f"{r['load_seconds']:>9.1f}{r['seconds']:>9.1f}{rtf:>8}")
+    else:
+        backend = resolve_backend(args.backend)
+        if backend == "cli":
+            sys.exit("未安装 faster-whisper 或 openai-whisper")
+        server = WhisperServer(backend, args.model, args.language, args.device, args.compute_type, args.threads)
+        try:
+            for file in args.files:
+                started = time.monotonic()
+                segments = server.transcribe(file)
+                print(f"{file}: {len(segments)} 个片段，{time.monotonic() - started:.1f}s")
+                for segment in segments:
+                    print(f"  [{segment['start']:.1f}-{segment['end']:.1f}] {segment['text']}")
+        finally:
+            server.close()